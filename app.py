@@ -14,12 +14,15 @@ import base64
 
 # Importar modulos propios
 from config import (
-    MONTH_NAMES_FULL, formatear_fecha, obtener_ultimo_dia_habil, get_config_by_year
+    MONTH_NAMES_FULL, formatear_fecha, obtener_ultimo_dia_habil, get_config_by_year,
+    nombre_archivo_excel, nombre_paquete_urs
 )
-from map_processor import procesar_map
-from sicop_processor import procesar_sicop
 from excel_map import generar_excel_map
 from excel_sicop import generar_excel_sicop
+from excel_ur import generar_paquete_urs
+from cache_resultados import CACHE, clave_archivo, buscar_entrada, nueva_entrada
+from procesamiento_lote import procesar_bytes
+from sicop_processor import TOP_PARTIDAS, partidas_por_ur_desde_cubo
 
 # ============================================================================
 # CONSTANTES DE COLORES
@@ -31,6 +34,10 @@ COLOR_BEIGE = '#E6D194'
 COLOR_GRIS = '#98989A'
 COLOR_VERDE = '#002F2A'
 
+# Partidas con mayor disponible que se pueden mostrar por UR
+OPCIONES_TOP_PARTIDAS = [5, 10, 20]
+NOMBRES_TOP_PARTIDAS = {5: 'Cinco', 10: 'Diez', 20: 'Veinte'}
+
 # ============================================================================
 # CONFIGURACION DE PAGINA
 # ============================================================================
@@ -138,6 +145,166 @@ def create_kpi_card(label, value, subtitle="", bg_color=None):
         </div>
         """
 
+# ============================================================================
+# DASHBOARD PRESUPUESTO (SICOP)
+# ============================================================================
+
+# Fragmento: al cambiar de UR solo se vuelve a ejecutar este tablero y no
+# toda la app (st.fragment existe desde Streamlit 1.37)
+fragmento = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda funcion: funcion)
+
+@fragmento
+def mostrar_dashboard_presupuesto(resultados, config, urs_con_nombre, entrada, clave):
+    resumen = resultados['resumen']
+    denominaciones = config['denominaciones']
+    
+    ur_seleccionada = st.selectbox("Selecciona una Unidad Responsable:", options=urs_con_nombre, index=0, key="ur_pres")
+    ur_codigo = ur_seleccionada.split(" - ")[0]
+    datos_ur = resumen[resumen['UR'] == ur_codigo].iloc[0]
+    
+    st.markdown(f"### Dashboard Presupuesto - {denominaciones.get(ur_codigo, ur_codigo)}")
+    
+    # KPIs Fila 1
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.markdown(create_kpi_card("Original", format_currency(datos_ur['Original']), ""), unsafe_allow_html=True)
+    with col2:
+        st.markdown(create_kpi_card("Modificado Anual", format_currency(datos_ur['Modificado_anual']), "", COLOR_VINO), unsafe_allow_html=True)
+    with col3:
+        st.markdown(create_kpi_card("Modificado Periodo", format_currency(datos_ur['Modificado_periodo']), "", COLOR_BEIGE), unsafe_allow_html=True)
+    with col4:
+        st.markdown(create_kpi_card("Ejercido", format_currency(datos_ur['Ejercido_acumulado']), "", COLOR_NARANJA), unsafe_allow_html=True)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # KPIs Fila 2
+    col5, col6, col7, col8 = st.columns(4)
+    with col5:
+        st.markdown(create_kpi_card("Disponible Anual", format_currency(datos_ur['Disponible_anual']), "", COLOR_AZUL), unsafe_allow_html=True)
+    with col6:
+        st.markdown(create_kpi_card("Disponible Periodo", format_currency(datos_ur['Disponible_periodo']), "", COLOR_AZUL), unsafe_allow_html=True)
+    with col7:
+        st.markdown(create_kpi_card("Congelado Anual", "-", "", COLOR_GRIS), unsafe_allow_html=True)
+    with col8:
+        st.markdown(create_kpi_card("Congelado Periodo", "-", "", COLOR_GRIS), unsafe_allow_html=True)
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    # Graficas y Pasivos
+    col_izq, col_der = st.columns([1, 1])
+    
+    with col_izq:
+        # Graficas de avance
+        col_g1, col_g2 = st.columns(2)
+        pct_anual = datos_ur['Pct_avance_anual'] * 100 if datos_ur['Pct_avance_anual'] else 0
+        pct_periodo = datos_ur['Pct_avance_periodo'] * 100 if datos_ur['Pct_avance_periodo'] else 0
+        
+        with col_g1:
+            st.markdown("**Avance ejercicio anual**")
+            fig1 = go.Figure(go.Pie(values=[datos_ur['Ejercido_acumulado'], max(0, datos_ur['Disponible_anual'])],
+                labels=['Ejercido', 'Disponible'], hole=0.6, marker_colors=[COLOR_NARANJA, COLOR_AZUL], textinfo='none'))
+            fig1.add_annotation(text=f"{pct_anual:.2f}%", x=0.5, y=0.5, font_size=18, font_color=COLOR_VINO, showarrow=False)
+            fig1.update_layout(showlegend=True, legend=dict(orientation="h", y=-0.2), margin=dict(t=10, b=30, l=10, r=10), height=200)
+            st.plotly_chart(fig1, use_container_width=True, key="fig_anual")
+        
+        with col_g2:
+            st.markdown("**Avance ejercicio periodo**")
+            fig2 = go.Figure(go.Pie(values=[datos_ur['Ejercido_acumulado'], max(0, datos_ur['Disponible_periodo'])],
+                labels=['Ejercido', 'Disponible'], hole=0.6, marker_colors=[COLOR_NARANJA, COLOR_AZUL], textinfo='none'))
+            fig2.add_annotation(text=f"{pct_periodo:.2f}%", x=0.5, y=0.5, font_size=18, font_color=COLOR_VINO, showarrow=False)
+            fig2.update_layout(showlegend=True, legend=dict(orientation="h", y=-0.2), margin=dict(t=10, b=30, l=10, r=10), height=200)
+            st.plotly_chart(fig2, use_container_width=True, key="fig_periodo")
+        
+        # Seccion Pasivos
+        st.markdown("#### Pasivos con cargo al presupuesto")
+        col_p1, col_p2 = st.columns(2)
+        with col_p1:
+            st.markdown('<div style="border:1px solid #ddd; border-radius:8px; padding:1rem; text-align:center;"><div style="font-size:0.8rem; color:#666;">Pasivos reportados a la SHCP</div><div style="font-size:1.2rem; font-weight:bold;"></div></div>', unsafe_allow_html=True)
+        with col_p2:
+            st.markdown('<div style="border:1px solid #ddd; border-radius:8px; padding:1rem; text-align:center;"><div style="font-size:0.8rem; color:#666;">Pasivos pagados en COP 10</div><div style="font-size:1.2rem; font-weight:bold;"></div></div>', unsafe_allow_html=True)
+        
+        st.markdown("**Avance de pago de pasivos**")
+        fig3 = go.Figure(go.Pie(values=[1], labels=['Sin pasivos'], hole=0.6, marker_colors=['#e0e0e0'], textinfo='none'))
+        fig3.add_annotation(text="-", x=0.5, y=0.5, font_size=16, font_color=COLOR_VINO, showarrow=False)
+        fig3.update_layout(showlegend=True, legend=dict(orientation="h", y=-0.2), margin=dict(t=10, b=30, l=10, r=10), height=180)
+        st.plotly_chart(fig3, use_container_width=True, key="fig_pasivos")
+    
+    with col_der:
+        # Tabla por capitulo
+        st.markdown("#### Estado del ejercicio por capitulo de gasto")
+        
+        caps_ur = resultados.get('capitulos_por_ur', {}).get(ur_codigo, {})
+        
+        cap_data = []
+        total_orig, total_mod_a, total_mod_p, total_eje = 0, 0, 0, 0
+        
+        for cap_num, cap_name in [('2', 'Materiales y suministros'), ('3', 'Servicios generales'), ('4', 'Transferencias, asignaciones, subsidios y otras ayudas')]:
+            cap_info = caps_ur.get(cap_num, {})
+            orig = cap_info.get('Original', 0)
+            mod_a = cap_info.get('Modificado_anual', 0)
+            mod_p = cap_info.get('Modificado_periodo', 0)
+            eje = cap_info.get('Ejercido_acumulado', 0)
+            disp = mod_p - eje
+            pct = eje / mod_p * 100 if mod_p > 0 else 0
+            
+            total_orig += orig
+            total_mod_a += mod_a
+            total_mod_p += mod_p
+            total_eje += eje
+            
+            cap_data.append({'Capitulo': f'{cap_num}000', 'Denominacion': cap_name, 'Original': orig, 'Mod. Anual': mod_a, 'Mod. Periodo': mod_p, 'Ejercido': eje, 'Disponible': disp, '% Avance': pct})
+        
+        # Fila total
+        total_disp = total_mod_p - total_eje
+        total_pct = total_eje / total_mod_p * 100 if total_mod_p > 0 else 0
+        cap_data.insert(0, {'Capitulo': 'Total', 'Denominacion': '', 'Original': total_orig, 'Mod. Anual': total_mod_a, 'Mod. Periodo': total_mod_p, 'Ejercido': total_eje, 'Disponible': total_disp, '% Avance': total_pct})
+        
+        df_cap = pd.DataFrame(cap_data)
+        st.dataframe(df_cap.style.format({
+            'Original': '${:,.2f}', 'Mod. Anual': '${:,.2f}', 'Mod. Periodo': '${:,.2f}',
+            'Ejercido': '${:,.2f}', 'Disponible': '${:,.2f}', '% Avance': '{:.2f}%'
+        }), use_container_width=True, hide_index=True)
+        
+        # Partidas con mayor disponible (5 por omisión; más desde el cubo)
+        top = st.selectbox("Partidas a mostrar", OPCIONES_TOP_PARTIDAS, key="top_partidas")
+        st.markdown(f"#### {NOMBRES_TOP_PARTIDAS[top]} partidas con el mayor monto de disponible")
+        
+        if top > TOP_PARTIDAS and 'cubo' in resultados:
+            partidas_ur = partidas_por_ur_desde_cubo(resultados['cubo'], config, top).get(ur_codigo, [])
+        else:
+            partidas_ur = resultados.get('partidas_por_ur', {}).get(ur_codigo, [])
+        if partidas_ur:
+            total_disp_ur = datos_ur['Disponible_periodo']
+            part_data = []
+            for p in partidas_ur[:top]:
+                pct_resp = p['Disponible'] / total_disp_ur * 100 if total_disp_ur > 0 else 0
+                part_data.append({
+                    'Partida': p['Partida'], 'Denominacion': p['Denominacion'],
+                    'Programa': p['Programa'], 'Denom. Programa': p['Denom_Programa'],
+                    'Disponible': p['Disponible'], '% del Total': pct_resp
+                })
+            df_part = pd.DataFrame(part_data)
+            st.dataframe(df_part.style.format({'Disponible': '${:,.2f}', '% del Total': '{:.2f}%'}), use_container_width=True, hide_index=True)
+        else:
+            st.info("No hay partidas con disponible para esta UR")
+    
+    # Paquete con un Dashboard Presupuesto por UR: dentro del fragmento para
+    # usar siempre las partidas elegidas arriba (top)
+    paquetes = entrada.setdefault('paquetes_ur', {})
+    if top not in paquetes:
+        if st.button(f"Generar paquete por UR ({top} partidas)", key="generar_paquete_ur"):
+            with st.spinner("Generando un Excel por UR..."):
+                paquetes[top] = generar_paquete_urs(resultados, top=top)
+            CACHE.actualizar_tamaño(clave)
+    if top in paquetes:
+        st.download_button(
+            label=f"Descargar paquete por UR ({top} partidas, ZIP)",
+            data=paquetes[top],
+            file_name=nombre_paquete_urs(config, date.today()),
+            mime="application/zip",
+            key="descargar_paquete_ur"
+        )
+
 # ============================================================================
 # SIDEBAR
 # ============================================================================
@@ -205,16 +372,25 @@ with col_instrucciones:
 
 if uploaded_file is not None:
     try:
-        df = pd.read_csv(uploaded_file, encoding='latin-1', low_memory=False)
         filename = uploaded_file.name
+        contenido = uploaded_file.getvalue()
+        
+        # Reutilizar lectura, resultados y Excel si el archivo ya se procesó
+        # (en esta sesión, en otra o en el vigilante de carpeta)
+        clave = clave_archivo(contenido, 'MAP' if es_map else 'SICOP', filename)
+        entrada = buscar_entrada(clave)
         
-        st.success(f"Archivo cargado: **{filename}** ({len(df):,} registros)")
+        if entrada is None:
+            with st.spinner("Procesando datos..."):
+                resultados, registros = procesar_bytes(contenido, filename, 'MAP' if es_map else 'SICOP')
+            
+            entrada = nueva_entrada(resultados, registros)
+            CACHE.guardar(clave, entrada)
+        
+        resultados = entrada['resultados']
+        registros = entrada['registros']
         
-        with st.spinner("Procesando datos..."):
-            if es_map:
-                resultados = procesar_map(df, filename)
-            else:
-                resultados = procesar_sicop(df, filename)
+        st.success(f"Archivo cargado: **{filename}** ({registros:,} registros)")
         
         metadata = resultados['metadata']
         config = metadata['config']
@@ -363,138 +539,10 @@ if uploaded_file is not None:
             # ================================================================
             # TAB 2: DASHBOARD PRESUPUESTO
             # ================================================================
+            urs_con_nombre = [f"{ur} - {config['denominaciones'].get(ur, 'Sin nombre')[:40]}" for ur in resultados['resumen']['UR'].tolist()]
+            
             with tab2:
-                resumen = resultados['resumen']
-                denominaciones = config['denominaciones']
-                
-                urs_disponibles = resumen['UR'].tolist()
-                urs_con_nombre = [f"{ur} - {denominaciones.get(ur, 'Sin nombre')[:40]}" for ur in urs_disponibles]
-                
-                ur_seleccionada = st.selectbox("Selecciona una Unidad Responsable:", options=urs_con_nombre, index=0, key="ur_pres")
-                ur_codigo = ur_seleccionada.split(" - ")[0]
-                datos_ur = resumen[resumen['UR'] == ur_codigo].iloc[0]
-                
-                st.markdown(f"### Dashboard Presupuesto - {denominaciones.get(ur_codigo, ur_codigo)}")
-                
-                # KPIs Fila 1
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.markdown(create_kpi_card("Original", format_currency(datos_ur['Original']), ""), unsafe_allow_html=True)
-                with col2:
-                    st.markdown(create_kpi_card("Modificado Anual", format_currency(datos_ur['Modificado_anual']), "", COLOR_VINO), unsafe_allow_html=True)
-                with col3:
-                    st.markdown(create_kpi_card("Modificado Periodo", format_currency(datos_ur['Modificado_periodo']), "", COLOR_BEIGE), unsafe_allow_html=True)
-                with col4:
-                    st.markdown(create_kpi_card("Ejercido", format_currency(datos_ur['Ejercido_acumulado']), "", COLOR_NARANJA), unsafe_allow_html=True)
-                
-                st.markdown("<br>", unsafe_allow_html=True)
-                
-                # KPIs Fila 2
-                col5, col6, col7, col8 = st.columns(4)
-                with col5:
-                    st.markdown(create_kpi_card("Disponible Anual", format_currency(datos_ur['Disponible_anual']), "", COLOR_AZUL), unsafe_allow_html=True)
-                with col6:
-                    st.markdown(create_kpi_card("Disponible Periodo", format_currency(datos_ur['Disponible_periodo']), "", COLOR_AZUL), unsafe_allow_html=True)
-                with col7:
-                    st.markdown(create_kpi_card("Congelado Anual", "-", "", COLOR_GRIS), unsafe_allow_html=True)
-                with col8:
-                    st.markdown(create_kpi_card("Congelado Periodo", "-", "", COLOR_GRIS), unsafe_allow_html=True)
-                
-                st.markdown("<br>", unsafe_allow_html=True)
-                
-                # Graficas y Pasivos
-                col_izq, col_der = st.columns([1, 1])
-                
-                with col_izq:
-                    # Graficas de avance
-                    col_g1, col_g2 = st.columns(2)
-                    pct_anual = datos_ur['Pct_avance_anual'] * 100 if datos_ur['Pct_avance_anual'] else 0
-                    pct_periodo = datos_ur['Pct_avance_periodo'] * 100 if datos_ur['Pct_avance_periodo'] else 0
-                    
-                    with col_g1:
-                        st.markdown("**Avance ejercicio anual**")
-                        fig1 = go.Figure(go.Pie(values=[datos_ur['Ejercido_acumulado'], max(0, datos_ur['Disponible_anual'])],
-                            labels=['Ejercido', 'Disponible'], hole=0.6, marker_colors=[COLOR_NARANJA, COLOR_AZUL], textinfo='none'))
-                        fig1.add_annotation(text=f"{pct_anual:.2f}%", x=0.5, y=0.5, font_size=18, font_color=COLOR_VINO, showarrow=False)
-                        fig1.update_layout(showlegend=True, legend=dict(orientation="h", y=-0.2), margin=dict(t=10, b=30, l=10, r=10), height=200)
-                        st.plotly_chart(fig1, use_container_width=True, key="fig_anual")
-                    
-                    with col_g2:
-                        st.markdown("**Avance ejercicio periodo**")
-                        fig2 = go.Figure(go.Pie(values=[datos_ur['Ejercido_acumulado'], max(0, datos_ur['Disponible_periodo'])],
-                            labels=['Ejercido', 'Disponible'], hole=0.6, marker_colors=[COLOR_NARANJA, COLOR_AZUL], textinfo='none'))
-                        fig2.add_annotation(text=f"{pct_periodo:.2f}%", x=0.5, y=0.5, font_size=18, font_color=COLOR_VINO, showarrow=False)
-                        fig2.update_layout(showlegend=True, legend=dict(orientation="h", y=-0.2), margin=dict(t=10, b=30, l=10, r=10), height=200)
-                        st.plotly_chart(fig2, use_container_width=True, key="fig_periodo")
-                    
-                    # Seccion Pasivos
-                    st.markdown("#### Pasivos con cargo al presupuesto")
-                    col_p1, col_p2 = st.columns(2)
-                    with col_p1:
-                        st.markdown('<div style="border:1px solid #ddd; border-radius:8px; padding:1rem; text-align:center;"><div style="font-size:0.8rem; color:#666;">Pasivos reportados a la SHCP</div><div style="font-size:1.2rem; font-weight:bold;"></div></div>', unsafe_allow_html=True)
-                    with col_p2:
-                        st.markdown('<div style="border:1px solid #ddd; border-radius:8px; padding:1rem; text-align:center;"><div style="font-size:0.8rem; color:#666;">Pasivos pagados en COP 10</div><div style="font-size:1.2rem; font-weight:bold;"></div></div>', unsafe_allow_html=True)
-                    
-                    st.markdown("**Avance de pago de pasivos**")
-                    fig3 = go.Figure(go.Pie(values=[1], labels=['Sin pasivos'], hole=0.6, marker_colors=['#e0e0e0'], textinfo='none'))
-                    fig3.add_annotation(text="-", x=0.5, y=0.5, font_size=16, font_color=COLOR_VINO, showarrow=False)
-                    fig3.update_layout(showlegend=True, legend=dict(orientation="h", y=-0.2), margin=dict(t=10, b=30, l=10, r=10), height=180)
-                    st.plotly_chart(fig3, use_container_width=True, key="fig_pasivos")
-                
-                with col_der:
-                    # Tabla por capitulo
-                    st.markdown("#### Estado del ejercicio por capitulo de gasto")
-                    
-                    caps_ur = resultados.get('capitulos_por_ur', {}).get(ur_codigo, {})
-                    
-                    cap_data = []
-                    total_orig, total_mod_a, total_mod_p, total_eje = 0, 0, 0, 0
-                    
-                    for cap_num, cap_name in [('2', 'Materiales y suministros'), ('3', 'Servicios generales'), ('4', 'Transferencias, asignaciones, subsidios y otras ayudas')]:
-                        cap_info = caps_ur.get(cap_num, {})
-                        orig = cap_info.get('Original', 0)
-                        mod_a = cap_info.get('Modificado_anual', 0)
-                        mod_p = cap_info.get('Modificado_periodo', 0)
-                        eje = cap_info.get('Ejercido_acumulado', 0)
-                        disp = mod_p - eje
-                        pct = eje / mod_p * 100 if mod_p > 0 else 0
-                        
-                        total_orig += orig
-                        total_mod_a += mod_a
-                        total_mod_p += mod_p
-                        total_eje += eje
-                        
-                        cap_data.append({'Capitulo': f'{cap_num}000', 'Denominacion': cap_name, 'Original': orig, 'Mod. Anual': mod_a, 'Mod. Periodo': mod_p, 'Ejercido': eje, 'Disponible': disp, '% Avance': pct})
-                    
-                    # Fila total
-                    total_disp = total_mod_p - total_eje
-                    total_pct = total_eje / total_mod_p * 100 if total_mod_p > 0 else 0
-                    cap_data.insert(0, {'Capitulo': 'Total', 'Denominacion': '', 'Original': total_orig, 'Mod. Anual': total_mod_a, 'Mod. Periodo': total_mod_p, 'Ejercido': total_eje, 'Disponible': total_disp, '% Avance': total_pct})
-                    
-                    df_cap = pd.DataFrame(cap_data)
-                    st.dataframe(df_cap.style.format({
-                        'Original': '${:,.2f}', 'Mod. Anual': '${:,.2f}', 'Mod. Periodo': '${:,.2f}',
-                        'Ejercido': '${:,.2f}', 'Disponible': '${:,.2f}', '% Avance': '{:.2f}%'
-                    }), use_container_width=True, hide_index=True)
-                    
-                    # Top 5 partidas
-                    st.markdown("#### Cinco partidas con el mayor monto de disponible")
-                    
-                    partidas_ur = resultados.get('partidas_por_ur', {}).get(ur_codigo, [])
-                    if partidas_ur:
-                        total_disp_ur = datos_ur['Disponible_periodo']
-                        part_data = []
-                        for p in partidas_ur[:5]:
-                            pct_resp = p['Disponible'] / total_disp_ur * 100 if total_disp_ur > 0 else 0
-                            part_data.append({
-                                'Partida': p['Partida'], 'Denominacion': p['Denominacion'],
-                                'Programa': p['Programa'], 'Denom. Programa': p['Denom_Programa'],
-                                'Disponible': p['Disponible'], '% del Total': pct_resp
-                            })
-                        df_part = pd.DataFrame(part_data)
-                        st.dataframe(df_part.style.format({'Disponible': '${:,.2f}', '% del Total': '{:.2f}%'}), use_container_width=True, hide_index=True)
-                    else:
-                        st.info("No hay partidas con disponible para esta UR")
+                mostrar_dashboard_presupuesto(resultados, config, urs_con_nombre, entrada, clave)
             
             # ================================================================
             # TAB 3: DASHBOARD AUSTERIDAD (Pendiente)
@@ -540,23 +588,26 @@ if uploaded_file is not None:
         
         st.markdown("---")
         
-        if es_map:
-            excel_bytes = generar_excel_map(resultados)
-            fecha_str = date.today().strftime('%d%b%Y').upper()
-            config_str = "Prog2026" if config['usar_2026'] else "Prog2025"
-            filename_excel = f'Cuadro_Presupuesto_{config_str}_{fecha_str}.xlsx'
-        else:
-            excel_bytes = generar_excel_sicop(resultados)
-            fecha_str = date.today().strftime('%d%b%Y').upper()
-            config_str = "URs2026" if config['usar_2026'] else "URs2025"
-            filename_excel = f'Estado_Ejercicio_SICOP_{config_str}_{fecha_str}.xlsx'
+        filename_excel = nombre_archivo_excel('MAP' if es_map else 'SICOP', config, date.today())
         
-        st.download_button(
-            label="Descargar Excel",
-            data=excel_bytes,
-            file_name=filename_excel,
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        # El Excel se genera solo cuando el usuario lo pide y queda
+        # memorizado en la entrada del caché para este mismo archivo
+        if entrada['excel'] is None:
+            if st.button("Generar Excel", key="generar_excel"):
+                with st.spinner("Generando Excel..."):
+                    if es_map:
+                        entrada['excel'] = generar_excel_map(resultados)
+                    else:
+                        entrada['excel'] = generar_excel_sicop(resultados)
+                CACHE.actualizar_tamaño(clave)
+        
+        if entrada['excel'] is not None:
+            st.download_button(
+                label="Descargar Excel",
+                data=entrada['excel'],
+                file_name=filename_excel,
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
         
     except Exception as e:
         st.error(f"Error al procesar el archivo: {str(e)}")
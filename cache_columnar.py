@@ -0,0 +1,209 @@
+# ============================================================================
+# CACHÉ EN DISCO DE ARCHIVOS LEÍDOS (ARROW IPC POR HASH DE CONTENIDO)
+# ============================================================================
+
+import io
+import os
+import tempfile
+import threading
+
+from cache_resultados import hash_contenido
+from esquemas import obtener_esquema, leer_csv, CATEGORIA
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = None
+
+# Directorio y tamaño máximo por omisión de las copias columnares
+DIRECTORIO_SNAPSHOTS = os.path.join(tempfile.gettempdir(), 'sader_snapshots')
+MAX_BYTES_DISCO = 2 * 1024 * 1024 * 1024
+
+# Cambiar si se modifican los esquemas para no reutilizar copias anteriores
+VERSION_ESQUEMA = 3
+
+
+def _sin_diccionarios(tabla):
+    """
+    Convierte las columnas categóricas a texto plano: el formato de archivo
+    IPC no admite diccionarios distintos entre bloques.
+    """
+    campos = [
+        pa.field(campo.name, campo.type.value_type if pa.types.is_dictionary(campo.type) else campo.type)
+        for campo in tabla.schema
+    ]
+    return tabla.cast(pa.schema(campos))
+
+
+class AlmacenSnapshots:
+    """
+    Guarda cada archivo cargado, ya tipado según su esquema, como un
+    archivo Arrow IPC nombrado por el hash del contenido. Las lecturas
+    posteriores del mismo archivo mapean en memoria esa copia en lugar de
+    volver a interpretar el CSV. El directorio se limita a max_bytes y se
+    descartan primero las copias usadas hace más tiempo.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_SNAPSHOTS, max_bytes=MAX_BYTES_DISCO):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def disponible(self):
+        return pa is not None
+
+    def ruta(self, hash_archivo, sistema, año):
+        nombre = f'{hash_archivo}_{sistema}_{año}_v{VERSION_ESQUEMA}.arrow'
+        return os.path.join(self.directorio, nombre)
+
+    def leer(self, contenido, sistema, año):
+        """DataFrame completo del archivo (desde la copia columnar si existe)"""
+        if not self.disponible:
+            return leer_csv(_buffer(contenido), sistema, año)
+        ruta = self.ruta(hash_contenido(contenido), sistema, año)
+        copia = self._abrir(ruta)
+        if copia is not None:
+            origen, lector = copia
+            with origen:
+                return _a_pandas(lector.read_all(), sistema, año)
+
+        df = leer_csv(_buffer(contenido), sistema, año)
+        self._escribir(ruta, _sin_diccionarios(pa.Table.from_pandas(df, preserve_index=False)))
+        return df
+
+    def leer_bloques(self, contenido, sistema, año, tamaño_bloque):
+        """
+        Itera el archivo por bloques de filas. En la primera lectura los
+        bloques del CSV se van escribiendo en la copia columnar.
+        """
+        if not self.disponible:
+            yield from leer_csv(_buffer(contenido), sistema, año, chunksize=tamaño_bloque)
+            return
+        ruta = self.ruta(hash_contenido(contenido), sistema, año)
+        copia = self._abrir(ruta)
+        if copia is not None:
+            origen, lector = copia
+            with origen:
+                for i in range(lector.num_record_batches):
+                    yield _a_pandas(pa.Table.from_batches([lector.get_batch(i)]), sistema, año)
+            return
+
+        # Cada bloque se agrega a la copia conforme se lee: la memoria sigue
+        # acotada por el tamaño del bloque
+        temporal = self._ruta_temporal(ruta)
+        escritor = None
+        try:
+            for bloque in leer_csv(_buffer(contenido), sistema, año, chunksize=tamaño_bloque):
+                tabla = _sin_diccionarios(pa.Table.from_pandas(bloque, preserve_index=False))
+                if escritor is None:
+                    os.makedirs(self.directorio, exist_ok=True)
+                    esquema = tabla.schema
+                    escritor = ipc.new_file(temporal, esquema)
+                escritor.write_table(tabla.cast(esquema))
+                yield bloque
+            escritor.close()
+            escritor = None
+            self._publicar(temporal, ruta)
+        finally:
+            if escritor is not None:
+                escritor.close()
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+    def _abrir(self, ruta):
+        """
+        (origen mapeado, lector) de la copia columnar, o None si no existe.
+        Otro proceso puede desalojar la copia entre que se busca y se abre:
+        se trata como ausente y el archivo se vuelve a leer del CSV. Una vez
+        mapeada, borrar el archivo ya no afecta la lectura.
+        """
+        try:
+            origen = pa.memory_map(ruta)
+        except OSError:
+            return None
+        try:
+            lector = ipc.open_file(origen)
+        except (OSError, pa.ArrowInvalid):
+            origen.close()
+            return None
+        self._marcar_uso(ruta)
+        return origen, lector
+
+    def tamaño_total(self):
+        return sum(tamaño for _, tamaño, _ in self._archivos())
+
+    def _ruta_temporal(self, ruta):
+        return f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+    def _escribir(self, ruta, tabla):
+        """Escribe la copia en un archivo temporal y la publica"""
+        os.makedirs(self.directorio, exist_ok=True)
+        temporal = self._ruta_temporal(ruta)
+        try:
+            with ipc.new_file(temporal, tabla.schema) as escritor:
+                escritor.write_table(tabla)
+            self._publicar(temporal, ruta)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+    def _publicar(self, temporal, ruta):
+        """Reemplaza la copia de forma atómica y aplica el límite de disco"""
+        with self._lock:
+            os.replace(temporal, ruta)
+            self._desalojar(conservar=ruta)
+
+    def _marcar_uso(self, ruta):
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+
+    def _archivos(self):
+        """(ruta, tamaño, último uso) de cada copia del directorio"""
+        if not os.path.isdir(self.directorio):
+            return []
+        archivos = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith('.arrow'):
+                continue
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                info = os.stat(ruta)
+            except OSError:
+                continue
+            archivos.append((ruta, info.st_size, info.st_mtime))
+        return archivos
+
+    def _desalojar(self, conservar=None):
+        archivos = sorted(self._archivos(), key=lambda archivo: archivo[2])
+        total = sum(tamaño for _, tamaño, _ in archivos)
+        for ruta, tamaño, _ in archivos:
+            if total <= self.max_bytes:
+                break
+            if ruta == conservar:
+                continue
+            try:
+                os.remove(ruta)
+            except OSError:
+                continue
+            total -= tamaño
+
+
+def _buffer(contenido):
+    return io.BytesIO(contenido)
+
+
+def _a_pandas(tabla, sistema, año):
+    """Tabla Arrow a DataFrame con los tipos del esquema"""
+    df = tabla.replace_schema_metadata(None).to_pandas()
+    obligatorias, opcionales = obtener_esquema(sistema, año)
+    tipos = {**obligatorias, **opcionales}
+    categoricas = {col: CATEGORIA for col in df.columns if tipos.get(col) == CATEGORIA}
+    return df.astype(categoricas) if categoricas else df
+
+
+# Almacén compartido por todas las sesiones del proceso
+SNAPSHOTS = AlmacenSnapshots()
@@ -0,0 +1,319 @@
+# ============================================================================
+# CACHÉ DE ARCHIVOS PROCESADOS (LRU POR HASH DE CONTENIDO)
+# ============================================================================
+
+import os
+import sys
+import json
+import hashlib
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from config import detectar_fecha_archivo, es_cierre_año_anterior, get_config_by_year
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = None
+
+# Límites por omisión del caché compartido del proceso
+MAX_ENTRADAS = 8
+MAX_BYTES = 512 * 1024 * 1024
+
+# Carpeta con resultados precalculados (p. ej. por vigilante_carpeta.py);
+# si no se define, solo se usa el caché en memoria
+DIRECTORIO_RESULTADOS = os.environ.get('SADER_RESULTADOS')
+
+# Tamaño máximo en disco de los resultados precalculados
+MAX_BYTES_DISCO = 1024 * 1024 * 1024
+
+# Cambiar si se modifica el formato de las entradas guardadas en disco
+VERSION_ENTRADA = 1
+
+
+def hash_contenido(contenido):
+    """Hash SHA-256 del contenido de un archivo"""
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def clave_archivo(contenido, tipo_reporte, filename):
+    """
+    Clave de caché de un archivo cargado: hash del contenido, tipo de
+    reporte y fecha detectada en el nombre (que define el mes y el año de
+    configuración). No incluye la fecha de hoy: las partes que dependen de
+    ella se revisan al usar la entrada (ver entrada_vigente).
+    """
+    fecha_archivo, _, _ = detectar_fecha_archivo(filename)
+    return (hash_contenido(contenido), tipo_reporte, fecha_archivo.isoformat())
+
+
+def nueva_entrada(resultados, registros, excel=None):
+    """Entrada del caché; fecha_excel es el día con que se generan los Excel"""
+    return {'resultados': resultados, 'registros': registros, 'excel': excel, 'fecha_excel': date.today()}
+
+
+def entrada_vigente(entrada):
+    """
+    Revisa una entrada contra la fecha de hoy. Los resultados solo dependen
+    de ella por el cierre del año anterior: si cambió desde que se
+    calcularon, la entrada ya no sirve (False). Los Excel llevan la fecha en
+    los encabezados: si se generaron otro día se descartan para volver a
+    generarlos.
+    """
+    metadata = entrada['resultados']['metadata']
+    if metadata['es_cierre'] != es_cierre_año_anterior(metadata['mes'], metadata['año']):
+        return False
+    hoy = date.today()
+    if entrada.get('fecha_excel') != hoy:
+        entrada['excel'] = None
+        entrada.pop('paquetes_ur', None)
+        entrada['fecha_excel'] = hoy
+    return True
+
+
+def estimar_bytes(valor, vistos=None):
+    """Estima la memoria ocupada por una entrada (DataFrames, bytes, dicts y listas)"""
+    if vistos is None:
+        vistos = set()
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(estimar_bytes(v, vistos) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(estimar_bytes(v, vistos) for v in valor)
+    return sys.getsizeof(valor)
+
+
+def ruta_entrada(directorio, clave):
+    """Archivo de una entrada precalculada dentro de directorio"""
+    hash_archivo, tipo_reporte, fecha_archivo = clave
+    return os.path.join(directorio, f'{hash_archivo}_{tipo_reporte}_{fecha_archivo}_v{VERSION_ENTRADA}.zip')
+
+
+def guardar_entrada(directorio, clave, entrada, max_bytes=MAX_BYTES_DISCO):
+    """
+    Guarda una entrada en disco (escritura atómica) y descarta las entradas
+    usadas hace más tiempo si el directorio excede max_bytes.
+
+    El archivo es un ZIP sin código ejecutable: los datos en JSON, cada
+    DataFrame como tabla Arrow IPC y el Excel tal cual. La configuración
+    del año no se guarda; se vuelve a obtener al cargar.
+
+    Returns:
+        ruta del archivo, o None si no está disponible pyarrow
+    """
+    if pa is None:
+        return None
+    resultados = dict(entrada['resultados'])
+    resultados['metadata'] = {k: v for k, v in resultados['metadata'].items() if k != 'config'}
+    tablas = {}
+    datos = _a_json({
+        'registros': entrada['registros'],
+        'fecha_excel': entrada.get('fecha_excel'),
+        'resultados': resultados,
+    }, tablas)
+
+    os.makedirs(directorio, exist_ok=True)
+    ruta = ruta_entrada(directorio, clave)
+    temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with zipfile.ZipFile(temporal, 'w', zipfile.ZIP_DEFLATED) as archivo:
+            archivo.writestr('entrada.json', json.dumps(datos, ensure_ascii=False))
+            for nombre, df in tablas.items():
+                archivo.writestr(nombre, _tabla_ipc(df))
+            if entrada['excel'] is not None:
+                archivo.writestr('reporte.xlsx', entrada['excel'], zipfile.ZIP_STORED)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    _desalojar_disco(directorio, max_bytes, conservar=ruta)
+    return ruta
+
+
+def cargar_entrada(directorio, clave):
+    """
+    Entrada precalculada guardada con guardar_entrada, o None si no existe,
+    se desalojó mientras se leía o no se puede leer.
+    """
+    if pa is None:
+        return None
+    ruta = ruta_entrada(directorio, clave)
+    try:
+        with zipfile.ZipFile(ruta) as archivo:
+            datos = json.loads(
+                archivo.read('entrada.json'),
+                object_hook=lambda objeto: _desde_json(objeto, archivo)
+            )
+            excel = archivo.read('reporte.xlsx') if 'reporte.xlsx' in archivo.namelist() else None
+    except (OSError, zipfile.BadZipFile, KeyError, ValueError):
+        return None
+    try:
+        # La fecha de modificación marca el último uso para el desalojo
+        os.utime(ruta)
+    except OSError:
+        pass
+
+    metadata = datos['resultados']['metadata']
+    metadata['config'] = get_config_by_year(metadata['año'])
+    return {
+        'resultados': datos['resultados'],
+        'registros': datos['registros'],
+        'excel': excel,
+        'fecha_excel': datos['fecha_excel'],
+    }
+
+
+def _a_json(valor, tablas):
+    """
+    Valor en tipos de JSON. Cada DataFrame se agrega a tablas (nombre de
+    archivo -> DataFrame) y en su lugar queda una referencia.
+    """
+    if isinstance(valor, pd.DataFrame):
+        nombre = f'tablas/{len(tablas)}.arrow'
+        tablas[nombre] = valor
+        return {'__tabla__': nombre}
+    if isinstance(valor, date):
+        return {'__fecha__': valor.isoformat()}
+    if isinstance(valor, dict):
+        if not all(isinstance(k, str) for k in valor):
+            raise TypeError("Solo se pueden guardar diccionarios con claves de texto")
+        return {k: _a_json(v, tablas) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_a_json(v, tablas) for v in valor]
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    raise TypeError(f"No se puede guardar un valor de tipo {type(valor).__name__}")
+
+
+def _desde_json(objeto, archivo):
+    """Inverso de _a_json para un objeto de JSON (tablas y fechas)"""
+    if '__tabla__' in objeto:
+        return ipc.open_file(pa.BufferReader(archivo.read(objeto['__tabla__']))).read_all().to_pandas()
+    if '__fecha__' in objeto:
+        return date.fromisoformat(objeto['__fecha__'])
+    return objeto
+
+
+def _tabla_ipc(df):
+    """DataFrame como archivo Arrow IPC (conserva índice y tipos)"""
+    tabla = pa.Table.from_pandas(df)
+    salida = pa.BufferOutputStream()
+    with ipc.new_file(salida, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return salida.getvalue().to_pybytes()
+
+
+def _desalojar_disco(directorio, max_bytes, conservar=None):
+    """Borra las entradas usadas hace más tiempo hasta quedar en max_bytes"""
+    archivos = []
+    for nombre in os.listdir(directorio):
+        if not nombre.endswith('.zip'):
+            continue
+        ruta = os.path.join(directorio, nombre)
+        try:
+            info = os.stat(ruta)
+        except OSError:
+            continue
+        archivos.append((info.st_mtime, info.st_size, ruta))
+    total = sum(tamaño for _, tamaño, _ in archivos)
+    for _, tamaño, ruta in sorted(archivos):
+        if total <= max_bytes:
+            break
+        if ruta == conservar:
+            continue
+        try:
+            os.remove(ruta)
+        except OSError:
+            continue
+        total -= tamaño
+
+
+class CacheResultados:
+    """
+    Caché LRU acotado por número de entradas y por memoria estimada.
+    Es seguro entre hilos (Streamlit atiende cada sesión en un hilo).
+    """
+
+    def __init__(self, max_entradas=MAX_ENTRADAS, max_bytes=MAX_BYTES):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._tamaños = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        """Devuelve la entrada (y la marca como reciente) o None si no existe"""
+        with self._lock:
+            if clave not in self._entradas:
+                return None
+            self._entradas.move_to_end(clave)
+            return self._entradas[clave]
+
+    def guardar(self, clave, entrada, tamaño=None):
+        """Guarda una entrada y descarta las menos recientes si se exceden los límites"""
+        if tamaño is None:
+            tamaño = estimar_bytes(entrada)
+        with self._lock:
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            self._tamaños[clave] = tamaño
+            self._desalojar()
+
+    def actualizar_tamaño(self, clave):
+        """Recalcula el tamaño de una entrada que cambió (p. ej. al agregar el Excel)"""
+        with self._lock:
+            if clave not in self._entradas:
+                return
+            self._tamaños[clave] = estimar_bytes(self._entradas[clave])
+            self._desalojar()
+
+    def tamaño_total(self):
+        with self._lock:
+            return sum(self._tamaños.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entradas)
+
+    def _desalojar(self):
+        # Siempre se conserva la entrada más reciente, aunque exceda el límite
+        while len(self._entradas) > 1 and (
+            len(self._entradas) > self.max_entradas or sum(self._tamaños.values()) > self.max_bytes
+        ):
+            clave, _ = self._entradas.popitem(last=False)
+            del self._tamaños[clave]
+
+
+# Caché compartido por todas las sesiones del proceso
+CACHE = CacheResultados()
+
+
+def buscar_entrada(clave, directorio=DIRECTORIO_RESULTADOS):
+    """
+    Entrada vigente para la clave: del caché en memoria o, si no está, de
+    los resultados precalculados en directorio (p. ej. por el vigilante de
+    carpeta). None si hay que procesar el archivo.
+    """
+    entrada = CACHE.obtener(clave)
+    if entrada is None and directorio:
+        entrada = cargar_entrada(directorio, clave)
+        if entrada is not None:
+            CACHE.guardar(clave, entrada)
+    if entrada is None or not entrada_vigente(entrada):
+        return None
+    return entrada
@@ -2,7 +2,13 @@
 # CONFIGURACIÓN GLOBAL PARA SADER REPORTES
 # ============================================================================
 
+from bisect import bisect_right
+from dataclasses import dataclass, fields
 from datetime import date, timedelta
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
 from dateutil.relativedelta import relativedelta, MO
 from decimal import Decimal, ROUND_HALF_UP
 try:
@@ -431,35 +437,212 @@ def detectar_fecha_archivo(filename):
     return date.today(), date.today().month, date.today().year
 
 
+def es_cierre_año_anterior(mes, año):
+    """Indica si un corte de enero o febrero corresponde al cierre del año anterior"""
+    return (mes in [1, 2]) and (año < date.today().year)
+
+
+def fecha_corte_mes(fecha_archivo, mes):
+    """Fecha equivalente del archivo si su corte fuera en otro mes del mismo año"""
+    import calendar
+    ultimo_dia = calendar.monthrange(fecha_archivo.year, mes)[1]
+    return date(fecha_archivo.year, mes, min(fecha_archivo.day, ultimo_dia))
+
+
+def obtener_columnas_hasta_mes(mes_numero):
+    """Obtiene las columnas de modificaciones y reservas hasta el mes indicado"""
+    todos_los_meses = [
+        ('EN', 'ENE'), ('FE', 'FEB'), ('MR', 'MZO'), ('AB', 'ABR'),
+        ('MY', 'MAY'), ('JN', 'JUN'), ('JL', 'JUL'), ('AG', 'AGO'),
+        ('SE', 'SEP'), ('OC', 'OCT'), ('NO', 'NOV'), ('DI', 'DIC')
+    ]
+    meses_usar = todos_los_meses[:mes_numero]
+    return {
+        'modificaciones': [f'MO{abrev}' for abrev, _ in meses_usar],
+        'reservas': [f'RESERVA_{completo}' for _, completo in meses_usar],
+    }
+
+
+def nombre_archivo_excel(sistema, config, fecha):
+    """Nombre del Excel de un reporte ('MAP' o 'SICOP') con la fecha indicada"""
+    fecha_str = fecha.strftime('%d%b%Y').upper()
+    if sistema == 'MAP':
+        config_str = "Prog2026" if config['usar_2026'] else "Prog2025"
+        return f'Cuadro_Presupuesto_{config_str}_{fecha_str}.xlsx'
+    config_str = "URs2026" if config['usar_2026'] else "URs2025"
+    return f'Estado_Ejercicio_SICOP_{config_str}_{fecha_str}.xlsx'
+
+
+def nombre_archivo_ur(ur, fecha):
+    """Nombre del Excel de Dashboard Presupuesto de una UR con la fecha indicada"""
+    return f'Dashboard_Presupuesto_UR{ur}_{fecha.strftime("%d%b%Y").upper()}.xlsx'
+
+
+def nombre_paquete_urs(config, fecha):
+    """Nombre del ZIP con los Dashboard Presupuesto de todas las URs"""
+    config_str = "URs2026" if config['usar_2026'] else "URs2025"
+    return f'Dashboard_Presupuesto_{config_str}_{fecha.strftime("%d%b%Y").upper()}.zip'
+
+
+# ============================================================================
+# CONFIGURACIÓN COMPILADA POR AÑO
+# ============================================================================
+
+# Catálogos vigentes a partir de cada año fiscal, en orden. Un año usa la
+# última entrada que no lo rebase (los anteriores a la primera usan la
+# primera); para un ejercicio nuevo basta con agregar su renglón.
+CATALOGOS_POR_AÑO = (
+    (2025, {
+        'programas_nombres': PROGRAMAS_NOMBRES_2025,
+        'programas_especificos': PROGRAMAS_ESPECIFICOS_2025,
+        'nombres_especiales': NOMBRES_ESPECIALES_2025,
+        'fusion_programas': FUSION_PROGRAMAS_2025,
+        'denominaciones': DENOMINACIONES_2025,
+        'sector_central': SECTOR_CENTRAL_2025,
+        'oficinas': OFICINAS_2025,
+        'organos_desconcentrados': ORGANOS_DESCONCENTRADOS_2025,
+        'entidades_paraestatales': ENTIDADES_PARAESTATALES_2025,
+        'mapeo_ur': MAPEO_UR_2025,
+        'fusion_urs': {},
+    }),
+    (2026, {
+        'programas_nombres': PROGRAMAS_NOMBRES_2026,
+        'programas_especificos': PROGRAMAS_ESPECIFICOS_2026,
+        'nombres_especiales': NOMBRES_ESPECIALES_2026,
+        'fusion_programas': FUSION_PROGRAMAS_2026,
+        'denominaciones': DENOMINACIONES_2026,
+        'sector_central': SECTOR_CENTRAL_2026,
+        'oficinas': OFICINAS_2026,
+        'organos_desconcentrados': ORGANOS_DESCONCENTRADOS_2026,
+        'entidades_paraestatales': ENTIDADES_PARAESTATALES_2026,
+        'mapeo_ur': MAPEO_UR_2026_BASE,
+        'fusion_urs': FUSION_URS_2026,
+    }),
+)
+
+# Secciones del reporte SICOP en su orden
+SECCIONES_UR = ('sector_central', 'oficinas', 'organos_desconcentrados', 'entidades_paraestatales')
+
+# Reglas de CONTROL_OPERATIVO para el modificado y ejercido de cada UR:
+# paraestatales, RJL y desconcentrados usan CO 0 y 50; el resto 0, 50 y 51
+CO_EJERCIDO_GENERAL = (0, 50, 51)
+CO_EJERCIDO_RESTRINGIDO = (0, 50)
+URS_CO_RESTRINGIDO = frozenset({'RJL'})
+
+# Las claves numéricas de UR tienen tres dígitos
+TAMAÑO_TABLA_UR = 1000
+
+
+@dataclass(frozen=True, eq=False)
+class ConfiguracionAño:
+    """
+    Configuración de un año fiscal, compilada una sola vez por proceso (ver
+    get_config_by_year). Además de los catálogos incluye las tablas
+    derivadas que usan los procesadores. Admite config['clave'] como el
+    diccionario que la precedía. Los catálogos son de solo lectura
+    (MappingProxyType) porque la misma instancia se comparte en el proceso.
+    """
+    año_catalogo: int
+    usar_2026: bool
+    programas_nombres: MappingProxyType
+    programas_especificos: tuple
+    nombres_especiales: MappingProxyType
+    fusion_programas: MappingProxyType
+    denominaciones: MappingProxyType
+    sector_central: tuple
+    oficinas: tuple
+    organos_desconcentrados: tuple
+    entidades_paraestatales: tuple
+    mapeo_ur: MappingProxyType
+    fusion_urs: MappingProxyType
+    # Tablas derivadas
+    urs_validas: tuple
+    seccion_ur: MappingProxyType
+    urs_co_restringido: frozenset
+    co_ejercido_ur: MappingProxyType
+    mapeo_ur_texto: MappingProxyType
+    mapeo_ur_denso: np.ndarray
+    fusion_ur_denso: np.ndarray
+
+    def __getitem__(self, clave):
+        if clave not in _CAMPOS_CONFIGURACION:
+            raise KeyError(clave)
+        return getattr(self, clave)
+
+    def get(self, clave, omision=None):
+        return getattr(self, clave) if clave in _CAMPOS_CONFIGURACION else omision
+
+    def __reduce__(self):
+        # Entre procesos (pools) se envía solo el año: el receptor usa su
+        # propia configuración compilada
+        return (get_config_by_year, (self.año_catalogo,))
+
+
+# Claves que admiten config['clave'] y config.get: solo los campos, no los métodos
+_CAMPOS_CONFIGURACION = frozenset(campo.name for campo in fields(ConfiguracionAño))
+
+
+def _tablas_ur(mapeo_ur, fusion_urs):
+    """
+    Tablas del mapeo de URs ya compuesto con la fusión:
+        - mapeo_ur_texto: clave original (texto) -> UR final, solo las que cambian
+        - mapeo_ur_denso: clave numérica -> clave numérica mapeada (sin fusión)
+        - fusion_ur_denso: clave numérica -> UR final (texto)
+    """
+    mapeo_texto = {}
+    mapeo_denso = np.arange(TAMAÑO_TABLA_UR, dtype=np.int64)
+    for origen, destino in mapeo_ur.items():
+        mapeo_texto[str(origen)] = fusion_urs.get(str(destino), str(destino))
+        if isinstance(origen, int):
+            mapeo_denso[origen] = int(destino)
+    for origen, destino in fusion_urs.items():
+        mapeo_texto.setdefault(origen, destino)
+
+    fusion_denso = np.array([str(clave) for clave in mapeo_denso], dtype=object)
+    for i, clave in enumerate(fusion_denso):
+        fusion_denso[i] = fusion_urs.get(clave, clave)
+
+    mapeo_denso.flags.writeable = False
+    fusion_denso.flags.writeable = False
+    return mapeo_texto, mapeo_denso, fusion_denso
+
+
+@lru_cache(maxsize=None)
 def get_config_by_year(año):
-    """Obtiene la configuración según el año"""
-    if año <= 2025:
-        return {
-            'programas_nombres': PROGRAMAS_NOMBRES_2025,
-            'programas_especificos': PROGRAMAS_ESPECIFICOS_2025,
-            'nombres_especiales': NOMBRES_ESPECIALES_2025,
-            'fusion_programas': FUSION_PROGRAMAS_2025,
-            'denominaciones': DENOMINACIONES_2025,
-            'sector_central': SECTOR_CENTRAL_2025,
-            'oficinas': OFICINAS_2025,
-            'organos_desconcentrados': ORGANOS_DESCONCENTRADOS_2025,
-            'entidades_paraestatales': ENTIDADES_PARAESTATALES_2025,
-            'mapeo_ur': MAPEO_UR_2025,
-            'fusion_urs': {},
-            'usar_2026': False,
-        }
-    else:
-        return {
-            'programas_nombres': PROGRAMAS_NOMBRES_2026,
-            'programas_especificos': PROGRAMAS_ESPECIFICOS_2026,
-            'nombres_especiales': NOMBRES_ESPECIALES_2026,
-            'fusion_programas': FUSION_PROGRAMAS_2026,
-            'denominaciones': DENOMINACIONES_2026,
-            'sector_central': SECTOR_CENTRAL_2026,
-            'oficinas': OFICINAS_2026,
-            'organos_desconcentrados': ORGANOS_DESCONCENTRADOS_2026,
-            'entidades_paraestatales': ENTIDADES_PARAESTATALES_2026,
-            'mapeo_ur': MAPEO_UR_2026_BASE,
-            'fusion_urs': FUSION_URS_2026,
-            'usar_2026': True,
-        }
+    """Obtiene la configuración (compilada e inmutable) según el año"""
+    años_catalogo = [inicio for inicio, _ in CATALOGOS_POR_AÑO]
+    indice = max(bisect_right(años_catalogo, año) - 1, 0)
+    año_catalogo, catalogos = CATALOGOS_POR_AÑO[indice]
+
+    secciones = {seccion: tuple(catalogos[seccion]) for seccion in SECCIONES_UR}
+    urs_validas = tuple(ur for seccion in SECCIONES_UR for ur in secciones[seccion])
+    urs_co_restringido = frozenset(
+        secciones['entidades_paraestatales'] + secciones['organos_desconcentrados']
+    ) | URS_CO_RESTRINGIDO
+    mapeo_texto, mapeo_denso, fusion_denso = _tablas_ur(catalogos['mapeo_ur'], catalogos['fusion_urs'])
+    # UR -> posición de su sección en SECCIONES_UR
+    seccion_ur = {ur: codigo for codigo, seccion in enumerate(SECCIONES_UR) for ur in secciones[seccion]}
+    co_ejercido_ur = {
+        ur: CO_EJERCIDO_RESTRINGIDO if ur in urs_co_restringido else CO_EJERCIDO_GENERAL
+        for ur in urs_validas
+    }
+
+    return ConfiguracionAño(
+        año_catalogo=año_catalogo,
+        usar_2026=año_catalogo >= 2026,
+        programas_nombres=MappingProxyType(catalogos['programas_nombres']),
+        programas_especificos=tuple(catalogos['programas_especificos']),
+        nombres_especiales=MappingProxyType(catalogos['nombres_especiales']),
+        fusion_programas=MappingProxyType(catalogos['fusion_programas']),
+        denominaciones=MappingProxyType(catalogos['denominaciones']),
+        mapeo_ur=MappingProxyType(catalogos['mapeo_ur']),
+        fusion_urs=MappingProxyType(catalogos['fusion_urs']),
+        urs_validas=urs_validas,
+        seccion_ur=MappingProxyType(seccion_ur),
+        urs_co_restringido=urs_co_restringido,
+        co_ejercido_ur=MappingProxyType(co_ejercido_ur),
+        mapeo_ur_texto=MappingProxyType(mapeo_texto),
+        mapeo_ur_denso=mapeo_denso,
+        fusion_ur_denso=fusion_denso,
+        **secciones,
+    )
@@ -0,0 +1,108 @@
+# ============================================================================
+# ESQUEMAS DE COLUMNAS DE LOS ARCHIVOS MAP Y SICOP
+# ============================================================================
+
+import pandas as pd
+
+from config import MONTH_NAMES, obtener_columnas_hasta_mes
+
+
+# Tipos de columna
+ENTERO = 'int64'
+MONTO = 'float64'
+CATEGORIA = 'category'
+TEXTO = 'str'
+
+
+# MAP: UNIDAD admite claves como 'G00'; PARTIDA se convierte con
+# pd.to_numeric en preparar_map (los valores no numéricos cuentan como 0)
+COLUMNAS_MAP = {
+    'UNIDAD': CATEGORIA,
+    'IDEN_PROY': TEXTO,
+    'PROYECTO': TEXTO,
+    'PARTIDA': CATEGORIA,
+}
+
+COLUMNAS_MENSUALES_MAP = {
+    f'{prefix}_{month}': MONTO
+    for prefix in ['ORI', 'AMP', 'RED', 'MOD', 'CONG', 'DESCONG', 'EJE']
+    for month in MONTH_NAMES
+}
+
+# SICOP: CONTROL_OPERATIVO se lee como monto para que los vacíos queden
+# fuera de los filtros por CO en lugar de impedir la lectura. Los componentes
+# de la partida se leen como enteros de 64 bits para que un valor fuera de
+# rango no se trunque al leer; preparar_sicop los valida y compacta a int8.
+COLUMNAS_SICOP = {
+    'ID_UNIDAD': CATEGORIA,
+    'CAPITULO': ENTERO,
+    'CONCEPTO': ENTERO,
+    'PARTIDA_GENERICA': ENTERO,
+    'PARTIDA_ESPECIFICA': ENTERO,
+    'CONTROL_OPERATIVO': MONTO,
+    'PROGRAMA_PRESUPUESTARIO': CATEGORIA,
+    'ORIGINAL': MONTO,
+    'MODIFICADO_AUTORIZADO': MONTO,
+    'RESERVAS': MONTO,
+}
+
+_columnas_mes_sicop = obtener_columnas_hasta_mes(12)
+COLUMNAS_OPCIONALES_SICOP = {
+    col: MONTO
+    for col in (['EJERCIDO', 'DEVENGADO', 'EJERCIDO_TRAMITE'] +
+                _columnas_mes_sicop['modificaciones'] + _columnas_mes_sicop['reservas'])
+}
+
+
+def obtener_esquema(sistema, año):
+    """
+    Columnas obligatorias y opcionales (con su tipo) del archivo de un
+    sistema ('MAP' o 'SICOP') para el año de configuración. Por ahora los
+    layouts de 2025 y 2026 son iguales.
+
+    Returns:
+        tuple (obligatorias, opcionales): dicts columna -> tipo
+    """
+    if sistema == 'MAP':
+        return COLUMNAS_MAP, COLUMNAS_MENSUALES_MAP
+    if sistema == 'SICOP':
+        return COLUMNAS_SICOP, COLUMNAS_OPCIONALES_SICOP
+    raise ValueError(f"Sistema no reconocido: {sistema}")
+
+
+def leer_csv(archivo, sistema, año, **opciones):
+    """
+    Lee un CSV (latin-1) de MAP o SICOP cargando solo las columnas del
+    esquema, con sus tipos. Falla antes de leer los datos si faltan columnas
+    obligatorias.
+
+    Args:
+        archivo: ruta o buffer del CSV
+        sistema: 'MAP' o 'SICOP'
+        año: año de configuración del archivo
+        **opciones: argumentos adicionales para pd.read_csv (p. ej. chunksize)
+
+    Returns:
+        DataFrame (o lector por bloques si se pasa chunksize)
+    """
+    obligatorias, opcionales = obtener_esquema(sistema, año)
+
+    # Validar encabezado
+    posicion = archivo.tell() if hasattr(archivo, 'tell') else None
+    encabezado = pd.read_csv(archivo, encoding='latin-1', nrows=0).columns
+    if posicion is not None:
+        archivo.seek(posicion)
+
+    faltantes = [col for col in obligatorias if col not in encabezado]
+    if faltantes:
+        raise ValueError(
+            f"El archivo no tiene las columnas de {sistema} requeridas: {', '.join(faltantes)}"
+        )
+
+    tipos = dict(obligatorias)
+    tipos.update({col: tipo for col, tipo in opcionales.items() if col in encabezado})
+
+    try:
+        return pd.read_csv(archivo, encoding='latin-1', usecols=list(tipos), dtype=tipos, **opciones)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"El archivo {sistema} tiene valores que no corresponden al tipo de su columna: {e}") from e
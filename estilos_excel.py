@@ -0,0 +1,90 @@
+# ============================================================================
+# ESTILOS CON NOMBRE Y ESCRITURA POR RENGLÓN PARA LOS EXCEL
+# ============================================================================
+"""
+Capa de estilos compartida por los exportadores de MAP y SICOP.
+
+Cada exportador declara sus estilos una vez (fuente, relleno, alineación,
+borde y formato) y los registra en el libro como estilos con nombre; cada
+celda recibe después solo el nombre, en lugar de asignar cuatro o cinco
+objetos de estilo por celda.
+"""
+
+from openpyxl.styles import NamedStyle, Font, Alignment, Border, Side, PatternFill
+from openpyxl.styles.fonts import DEFAULT_FONT
+
+# ============================================================================
+# COLORES Y FORMATOS INSTITUCIONALES
+# ============================================================================
+FUENTE_INSTITUCIONAL = 'Noto Sans'
+
+COLOR_VINO = '9B2247'     # Encabezados
+COLOR_BEIGE = 'E6D194'    # Totales
+COLOR_VERDE = '002F2A'    # Subtotales
+COLOR_GRIS = '98989A'     # Renglones alternos
+COLOR_BLANCO = 'FFFFFF'
+
+FORMATO_MONEDA = '_-* #,##0.00_-;\\-* #,##0.00_-;_-* "-"??_-;_-@_-'
+FORMATO_PORCENTAJE = '0.00%'
+
+BORDE_PUNTEADO = Border(
+    top=Side(style='dotted'),
+    bottom=Side(style='dotted'),
+    left=Side(style='dotted'),
+    right=Side(style='dotted')
+)
+ALINEACION_CENTRO = Alignment(horizontal='center', vertical='center', wrap_text=True)
+
+
+def fuente(tamaño, negrita=None, color=None):
+    """Fuente institucional"""
+    return Font(name=FUENTE_INSTITUCIONAL, size=tamaño, bold=negrita, color=color)
+
+
+def relleno(color):
+    """Relleno sólido"""
+    return PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+
+def estilo(fuente=None, relleno=None, alineacion=None, borde=None, formato='General'):
+    """
+    Atributos de un estilo con nombre; lo que no se indica queda como en
+    una celda sin formato.
+    """
+    return {
+        'font': fuente or DEFAULT_FONT,
+        'fill': relleno or PatternFill(),
+        'alignment': alineacion or Alignment(),
+        'border': borde or Border(),
+        'number_format': formato,
+    }
+
+
+# ============================================================================
+# REGISTRO Y ESCRITURA
+# ============================================================================
+
+def registrar_estilos(wb, estilos):
+    """
+    Registra en el libro los estilos declarados como {nombre: estilo(...)}.
+    Cada libro recibe sus propios NamedStyle (openpyxl los liga al libro).
+    """
+    for nombre, atributos in estilos.items():
+        wb.add_named_style(NamedStyle(name=nombre, **atributos))
+
+
+def escribir_fila(ws, fila, valores, estilos, columna=1):
+    """
+    Escribe un renglón a partir de la columna indicada.
+
+    Args:
+        ws: hoja
+        fila: número de renglón
+        valores: valores de las celdas (None deja la celda sin valor)
+        estilos: nombre del estilo de todo el renglón o lista con uno por celda
+        columna: columna de la primera celda
+    """
+    if isinstance(estilos, str):
+        estilos = [estilos] * len(valores)
+    for col, (valor, nombre) in enumerate(zip(valores, estilos), columna):
+        ws.cell(row=fila, column=col, value=valor).style = nombre
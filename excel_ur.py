@@ -0,0 +1,312 @@
+# ============================================================================
+# GENERADOR DEL PAQUETE DE EXCEL POR UR - DASHBOARD PRESUPUESTO
+# ============================================================================
+"""
+Paquete de Dashboard Presupuesto por UR: un Excel por Unidad Responsable
+con sus indicadores, el estado del ejercicio por capítulo de gasto y las
+partidas con mayor disponible, reunidos en un solo ZIP.
+"""
+
+import io
+import os
+from datetime import date
+from functools import lru_cache
+from zipfile import ZipFile, ZIP_STORED
+from concurrent.futures import ProcessPoolExecutor
+
+from openpyxl import Workbook
+from openpyxl.styles import Alignment
+
+from config import formatear_fecha, obtener_ultimo_dia_habil, nombre_archivo_ur
+from logo import insertar_logo
+from plantillas_excel import PlantillaExcel, campo
+from estilos_excel import (
+    COLOR_VINO, COLOR_BEIGE, COLOR_BLANCO, FORMATO_MONEDA, FORMATO_PORCENTAJE,
+    BORDE_PUNTEADO, ALINEACION_CENTRO, fuente, relleno, estilo, registrar_estilos, escribir_fila
+)
+from excel_sicop import COLUMNAS_DATOS, datos_por_ur
+from sicop_processor import TOP_PARTIDAS, partidas_por_ur_desde_cubo
+
+# ============================================================================
+# ESTILOS DEL DASHBOARD POR UR
+# ============================================================================
+ALINEACION_IZQUIERDA = Alignment(horizontal='left', vertical='center', wrap_text=True)
+
+
+def _estilos_renglon(tipo, fuente_datos, color):
+    """Estilos de texto, montos y porcentajes de un tipo de renglón"""
+    return {
+        f'UR {tipo} texto': estilo(fuente_datos, relleno(color), ALINEACION_IZQUIERDA, BORDE_PUNTEADO),
+        f'UR {tipo} moneda': estilo(
+            fuente_datos, relleno(color), Alignment(vertical='center'), BORDE_PUNTEADO, FORMATO_MONEDA
+        ),
+        f'UR {tipo} porcentaje': estilo(
+            fuente_datos, relleno(color), Alignment(vertical='center'), BORDE_PUNTEADO, FORMATO_PORCENTAJE
+        ),
+    }
+
+
+ESTILOS_UR = {
+    'UR encabezado': estilo(
+        fuente(12, negrita=True), alineacion=Alignment(horizontal='right', vertical='center', wrap_text=True)
+    ),
+    'UR título': estilo(fuente(14, negrita=True), alineacion=ALINEACION_CENTRO),
+    'UR sección': estilo(fuente(12, negrita=True, color=COLOR_VINO), alineacion=ALINEACION_IZQUIERDA),
+    'UR columna': estilo(fuente(11, negrita=True, color=COLOR_BLANCO), relleno(COLOR_VINO), ALINEACION_CENTRO, BORDE_PUNTEADO),
+    'UR nota': estilo(fuente(10), alineacion=ALINEACION_IZQUIERDA),
+    **_estilos_renglon('total', fuente(11, negrita=True), COLOR_BEIGE),
+    **_estilos_renglon('dato', fuente(11), COLOR_BLANCO),
+}
+
+# Indicadores (renglón de encabezados y renglón de valores, columnas A a H)
+TITULOS_INDICADORES = [
+    'Original', 'Modificado anual', 'Modificado al periodo', 'Ejercido acumulado',
+    'Disponible anual', 'Disponible al periodo', 'Porcentaje de avance anual', 'Porcentaje de avance al periodo'
+]
+
+# Capítulos de la tabla por capítulo de gasto y sus columnas de montos (C a H)
+CAPITULOS_UR = [
+    ('2', 'Materiales y suministros'),
+    ('3', 'Servicios generales'),
+    ('4', 'Transferencias, asignaciones, subsidios y otras ayudas'),
+]
+COLUMNAS_CAPITULO = ['Original', 'Modificado_anual', 'Modificado_periodo', 'Ejercido_acumulado',
+                     'Disponible_periodo', 'Pct_avance_periodo']
+
+# Columnas de la tabla de partidas: (campo, estilo); la denominación del programa ocupa D a F
+COLUMNAS_PARTIDA = [('Partida', 'texto'), ('Denominacion', 'texto'), ('Programa', 'texto'),
+                    ('Denom_Programa', 'texto'), ('Disponible', 'moneda'), ('Pct_disponible', 'porcentaje')]
+
+
+def construir_plantilla_ur(top):
+    """
+    Libro con el formato del Dashboard Presupuesto de una UR; el título, los
+    indicadores, los capítulos y las top partidas quedan como campos (ver
+    plantillas_excel).
+    """
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Dashboard Presupuesto"
+
+    registrar_estilos(wb, ESTILOS_UR)
+
+    anchos = {'A': 14, 'B': 48, 'C': 24, 'D': 24, 'E': 24, 'F': 24, 'G': 24, 'H': 24}
+    for col, ancho in anchos.items():
+        ws.column_dimensions[col].width = ancho
+
+    # =========================================================================
+    # ENCABEZADO
+    # =========================================================================
+    insertar_logo(ws, 'A1', ancho_cm=7.33, alto_cm=1.39)
+    ws.merge_cells('A1:H1')
+    ws['A1'] = 'Unidad de Administración y Finanzas\nDirección General de Programación, Presupuesto y Finanzas'
+    ws['A1'].style = 'UR encabezado'
+    ws.row_dimensions[1].height = 44.25
+
+    for fila, nombre in [(3, 'titulo'), (4, 'corte')]:
+        ws.merge_cells(f'A{fila}:H{fila}')
+        ws[f'A{fila}'] = campo(nombre)
+        ws[f'A{fila}'].style = 'UR título'
+        ws.row_dimensions[fila].height = 22.5
+
+    # =========================================================================
+    # INDICADORES
+    # =========================================================================
+    escribir_fila(ws, 6, TITULOS_INDICADORES, 'UR columna')
+    ws.row_dimensions[6].height = 36
+    escribir_fila(
+        ws, 7, [campo(f'indicador.{key}') for key in COLUMNAS_DATOS],
+        ['UR total moneda'] * 6 + ['UR total porcentaje'] * 2
+    )
+    ws.row_dimensions[7].height = 24
+
+    # =========================================================================
+    # ESTADO DEL EJERCICIO POR CAPÍTULO DE GASTO
+    # =========================================================================
+    ws.merge_cells('A9:H9')
+    ws['A9'] = 'Estado del ejercicio por capítulo de gasto'
+    ws['A9'].style = 'UR sección'
+    escribir_fila(ws, 10, [
+        'Capítulo', 'Denominación', 'Original', 'Modificado anual', 'Modificado al periodo',
+        'Ejercido acumulado', 'Disponible al periodo', 'Porcentaje de avance al periodo'
+    ], 'UR columna')
+    ws.row_dimensions[10].height = 36
+
+    fila = 11
+    for clave, capitulo, denominacion, tipo in [('total', 'Total', None, 'total')] + [
+        (cap, f'{cap}000', nombre, 'dato') for cap, nombre in CAPITULOS_UR
+    ]:
+        escribir_fila(
+            ws, fila, [capitulo, denominacion] + [campo(f'capitulo.{clave}.{col}') for col in COLUMNAS_CAPITULO],
+            [f'UR {tipo} texto'] * 2 + [f'UR {tipo} moneda'] * 5 + [f'UR {tipo} porcentaje']
+        )
+        ws.row_dimensions[fila].height = 20
+        fila += 1
+
+    # =========================================================================
+    # PARTIDAS CON MAYOR DISPONIBLE
+    # =========================================================================
+    fila += 1
+    ws.merge_cells(f'A{fila}:H{fila}')
+    ws[f'A{fila}'] = f'Las {top} partidas con el mayor monto de disponible'
+    ws[f'A{fila}'].style = 'UR sección'
+    fila += 1
+    ws.merge_cells(f'D{fila}:F{fila}')
+    escribir_fila(ws, fila, [
+        'Partida', 'Denominación', 'Programa', 'Denominación del programa', None, None,
+        'Disponible', 'Porcentaje del disponible al periodo'
+    ], 'UR columna')
+    ws.row_dimensions[fila].height = 36
+    fila += 1
+
+    for posicion in range(top):
+        ws.merge_cells(f'D{fila}:F{fila}')
+        campos = [campo(f'partida.{posicion}.{col}') for col, _ in COLUMNAS_PARTIDA]
+        estilos = [f'UR dato {tipo}' for _, tipo in COLUMNAS_PARTIDA]
+        escribir_fila(ws, fila, campos[:4] + [None, None] + campos[4:], estilos[:4] + [estilos[3]] * 2 + estilos[4:])
+        ws.row_dimensions[fila].height = 20
+        fila += 1
+
+    # =========================================================================
+    # NOTAS AL PIE
+    # =========================================================================
+    fila += 1
+    for nota in [
+        campo('fuente'),
+        'No incluye el capítulo 1000 "Servicios personales" ni partida 39801 "Impuesto sobre nóminas".',
+    ]:
+        ws.merge_cells(f'A{fila}:H{fila}')
+        ws.cell(row=fila, column=1, value=nota).style = 'UR nota'
+        ws.row_dimensions[fila].height = 20
+        fila += 1
+
+    return wb
+
+
+@lru_cache(maxsize=None)
+def plantilla_ur(top):
+    """Plantilla del Dashboard Presupuesto por UR, armada una vez por número de partidas en cada proceso"""
+    return PlantillaExcel(construir_plantilla_ur(top))
+
+
+def valores_ur(ur, denominacion, datos_ur, capitulos_ur, partidas_ur, top, hoy, fecha_corte):
+    """Valores de los campos de la plantilla de una UR"""
+    valores = {f'indicador.{key}': datos_ur.get(key, 0) for key in COLUMNAS_DATOS}
+
+    # Capítulos y total (como en el dashboard de la aplicación)
+    total = dict.fromkeys(COLUMNAS_CAPITULO[:4], 0)
+    filas_capitulo = {}
+    for cap, _ in CAPITULOS_UR:
+        info = capitulos_ur.get(cap, {})
+        filas_capitulo[cap] = {col: info.get(col, 0) for col in COLUMNAS_CAPITULO[:4]}
+        for col in total:
+            total[col] += filas_capitulo[cap][col]
+    filas_capitulo['total'] = total
+    for clave, datos in filas_capitulo.items():
+        datos['Disponible_periodo'] = datos['Modificado_periodo'] - datos['Ejercido_acumulado']
+        datos['Pct_avance_periodo'] = (
+            datos['Ejercido_acumulado'] / datos['Modificado_periodo'] if datos['Modificado_periodo'] > 0 else 0
+        )
+        valores.update((f'capitulo.{clave}.{col}', datos[col]) for col in COLUMNAS_CAPITULO)
+
+    # Partidas; las posiciones sin partida quedan vacías
+    disponible_ur = datos_ur.get('Disponible_periodo', 0)
+    for posicion in range(top):
+        if posicion < len(partidas_ur):
+            partida = dict(partidas_ur[posicion])
+            partida['Pct_disponible'] = partida['Disponible'] / disponible_ur if disponible_ur > 0 else 0
+        else:
+            partida = {}
+        valores.update((f'partida.{posicion}.{col}', partida.get(col)) for col, _ in COLUMNAS_PARTIDA)
+    if not partidas_ur and top:
+        valores['partida.0.Denominacion'] = 'No hay partidas con disponible para esta UR'
+
+    valores['titulo'] = f'Dashboard Presupuesto - {ur} {denominacion}'
+    valores['corte'] = f'Estado del ejercicio del 1 de enero al {formatear_fecha(hoy)}'
+    valores['fuente'] = f'Fuente: Elaborado con la base extraída del Sistema de Contabilidad y Presupuesto (SICOP), con corte al {formatear_fecha(fecha_corte)}.'
+    return valores
+
+
+# ============================================================================
+# PAQUETE POR UR
+# ============================================================================
+
+def _generar_lote(lote):
+    """
+    Libros de un lote de URs (se ejecuta en un proceso del pool).
+
+    Args:
+        lote: tuple (top, hoy, fecha_corte, urs) con urs como lista de
+            (nombre de archivo, ur, denominación, datos, capítulos, partidas)
+
+    Returns:
+        list de (nombre de archivo, bytes del Excel)
+    """
+    top, hoy, fecha_corte, urs = lote
+    plantilla = plantilla_ur(top)
+    return [
+        (nombre, plantilla.rellenar(valores_ur(ur, denominacion, datos, capitulos, partidas, top, hoy, fecha_corte)))
+        for nombre, ur, denominacion, datos, capitulos, partidas in urs
+    ]
+
+
+def lotes_por_ur(resultados, top=TOP_PARTIDAS, partes=1, hoy=None):
+    """
+    Reparte las URs del resumen, en orden, en lotes con solo los datos que
+    necesita cada libro (sin el cubo ni la configuración del año).
+    """
+    metadata = resultados['metadata']
+    config = metadata['config']
+    if top > TOP_PARTIDAS and 'cubo' in resultados:
+        partidas_por_ur = partidas_por_ur_desde_cubo(resultados['cubo'], config, top)
+    else:
+        partidas_por_ur = resultados['partidas_por_ur']
+    capitulos_por_ur = resultados['capitulos_por_ur']
+
+    urs = [
+        (
+            nombre_archivo_ur(ur, metadata['fecha_archivo']), ur, config['denominaciones'].get(ur, ''),
+            datos, capitulos_por_ur.get(ur, {}), partidas_por_ur.get(ur, [])[:top]
+        )
+        for ur, datos in datos_por_ur(resultados['resumen']).items()
+    ]
+    hoy = hoy or date.today()
+    tamaño = -(-len(urs) // max(1, partes)) or 1
+    return [
+        (top, hoy, obtener_ultimo_dia_habil(hoy), urs[inicio:inicio + tamaño])
+        for inicio in range(0, len(urs), tamaño)
+    ]
+
+
+def generar_paquete_urs(resultados, destino=None, top=TOP_PARTIDAS, procesos=None):
+    """
+    Genera un Excel de Dashboard Presupuesto por UR y los reúne en un ZIP.
+    Las URs se reparten en un pool de procesos y los libros de cada lote
+    se agregan al ZIP en cuanto están listos.
+
+    Args:
+        resultados: dict con los resultados del procesador SICOP
+        destino: ruta o archivo donde escribir el ZIP; por omisión se
+            regresan los bytes
+        top: partidas con mayor disponible por UR
+        procesos: procesos del pool (por omisión, uno por CPU); con 1 se
+            generan en el proceso actual
+
+    Returns:
+        bytes: contenido del ZIP (None si se indicó destino)
+    """
+    procesos = procesos or os.cpu_count() or 1
+    lotes = lotes_por_ur(resultados, top, partes=procesos)
+    salida = io.BytesIO() if destino is None else destino
+    # Los xlsx ya vienen comprimidos: se guardan sin volver a comprimir
+    with ZipFile(salida, 'w', ZIP_STORED) as paquete:
+        if procesos == 1 or len(lotes) <= 1:
+            for lote in map(_generar_lote, lotes):
+                for nombre, contenido in lote:
+                    paquete.writestr(nombre, contenido)
+        else:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                for lote in pool.map(_generar_lote, lotes):
+                    for nombre, contenido in lote:
+                        paquete.writestr(nombre, contenido)
+    return salida.getvalue() if destino is None else None
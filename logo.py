@@ -0,0 +1,60 @@
+# ============================================================================
+# LOGO SADER PARA LOS EXCEL (CACHÉ POR PROCESO)
+# ============================================================================
+"""
+El logo no cambia entre reportes: se decodifica, se redimensiona y se
+codifica en PNG una sola vez por tamaño en cada proceso, y los exportadores
+de MAP y SICOP reciben los bytes listos para insertar.
+"""
+
+import io
+import base64
+from functools import lru_cache
+
+from openpyxl.drawing.image import Image as OpenpyxlImage
+
+from config import LOGO_BASE64
+
+# Conversión aproximada de cm a pixeles
+PIXELES_POR_CM = 37.8
+
+
+def tamaño_en_pixeles(ancho_cm, alto_cm):
+    """(ancho, alto) en pixeles de un tamaño en cm"""
+    return int(ancho_cm * PIXELES_POR_CM), int(alto_cm * PIXELES_POR_CM)
+
+
+@lru_cache(maxsize=None)
+def logo_png(ancho_px, alto_px):
+    """
+    PNG del logo redimensionado. Se calcula una vez por tamaño; si la imagen
+    no se puede generar se guarda None y no se vuelve a intentar.
+    """
+    try:
+        from PIL import Image
+        imagen = Image.open(io.BytesIO(base64.b64decode(LOGO_BASE64.strip())))
+        imagen = imagen.resize((ancho_px, alto_px), Image.Resampling.LANCZOS)
+        salida = io.BytesIO()
+        imagen.save(salida, format="PNG")
+        return salida.getvalue()
+    except Exception:
+        return None
+
+
+def insertar_logo(ws, celda, ancho_cm, alto_cm):
+    """
+    Inserta el logo en la hoja con el tamaño indicado. Si no se puede
+    generar la imagen, el reporte continúa sin logo.
+    """
+    ancho_px, alto_px = tamaño_en_pixeles(ancho_cm, alto_cm)
+    png = logo_png(ancho_px, alto_px)
+    if png is None:
+        return
+    try:
+        # Cada hoja necesita su propio objeto imagen; los bytes se comparten
+        logo_img = OpenpyxlImage(io.BytesIO(png))
+        logo_img.width = ancho_px
+        logo_img.height = alto_px
+        ws.add_image(logo_img, celda)
+    except Exception:
+        pass
@@ -4,48 +4,60 @@
 
 import pandas as pd
 import numpy as np
-from datetime import date
 from config import (
-    MONTH_NAMES, UR_MAP, round_like_excel, detectar_fecha_archivo,
-    get_config_by_year, numero_a_letras_mx
+    MONTH_NAMES, round_like_excel, detectar_fecha_archivo,
+    get_config_by_year, numero_a_letras_mx, es_cierre_año_anterior, fecha_corte_mes
 )
+from redondeo import round_array_like_excel
+from esquemas import leer_csv
+from mapeo_ur import normalizar_ur_map
 
 
-def sum_columns(df, prefix, months_to_use):
-    """Suma las columnas de un prefijo para los meses especificados"""
-    cols = [f'{prefix}_{month}' for month in months_to_use if f'{prefix}_{month}' in df.columns]
-    if not cols:
-        return pd.Series([0] * len(df))
-    result = df[cols].fillna(0).sum(axis=1)
-    return result.apply(lambda x: round_like_excel(x, 2))
+# Categorías del cuadro según capítulo de gasto
+CATEGORIAS_CAPITULO = {
+    'servicios_personales': [1000],
+    'gasto_corriente': [2000, 3000],
+    'otros_programas': [4000],
+    'bienes_muebles': [5000, 7000],
+}
 
+CAPITULO_A_CATEGORIA = {
+    capitulo: categoria
+    for categoria, capitulos in CATEGORIAS_CAPITULO.items()
+    for capitulo in capitulos
+}
 
-def procesar_map(df, filename):
+
+# Conceptos mensuales que alimentan los cálculos del periodo
+CONCEPTOS_MENSUALES = ['ORI', 'MOD', 'CONG', 'DESCONG', 'EJE']
+
+
+def construir_acumulados_mensuales(df, conceptos=CONCEPTOS_MENSUALES):
     """
-    Procesa el archivo MAP y devuelve los resultados calculados.
-    
-    Returns:
-        dict con:
-        - 'resumen': DataFrame con totales por concepto
-        - 'programas': dict con datos por programa
-        - 'congelados': dict con congelados por programa
-        - 'totales': dict con totales generales
-        - 'metadata': información del archivo
+    Arma un bloque filas × concepto × 12 meses con la suma acumulada de enero
+    a cada mes, de modo que cualquier corte "hasta el mes m" es una lectura
+    directa. Los meses sin columna en el archivo cuentan como 0.
     """
-    # Detectar fecha y configuración
-    fecha_archivo, mes_archivo, año_archivo = detectar_fecha_archivo(filename)
-    config = get_config_by_year(año_archivo)
-    
-    current_month_index = mes_archivo - 1
-    months_up_to_current = MONTH_NAMES[0:current_month_index + 1]
-    
-    año_actual = date.today().year
-    es_cierre_año_anterior = (mes_archivo in [1, 2]) and (año_archivo < año_actual)
-    
+    acumulados = np.zeros((len(df), len(conceptos), len(MONTH_NAMES)))
+    for i, prefix in enumerate(conceptos):
+        for j, month in enumerate(MONTH_NAMES):
+            col = f'{prefix}_{month}'
+            if col in df.columns:
+                acumulados[:, i, j] = df[col].fillna(0).to_numpy(dtype=np.float64)
+    np.cumsum(acumulados, axis=2, out=acumulados)
+    return acumulados
+
+
+def suma_hasta_mes(df, acumulados, concepto, mes, conceptos=CONCEPTOS_MENSUALES):
+    """Suma de enero al mes indicado (1-12) de un concepto, redondeada como Excel"""
+    valores = acumulados[:, conceptos.index(concepto), mes - 1]
+    return pd.Series(round_array_like_excel(valores, 2), index=df.index)
+
+
+def preparar_map(df, config):
+    """Mapea URs y programas, calcula el capítulo y redondea los montos mensuales (modifica df)"""
     # Mapear URs
-    df['NuevaUR'] = df['UNIDAD'].apply(
-        lambda x: 811 if x == 'G00' else UR_MAP.get(int(x) if str(x).isdigit() else 0, int(x) if str(x).isdigit() else 0)
-    )
+    df['NuevaUR'] = normalizar_ur_map(df['UNIDAD'], config)
     
     # Calcular Programa Presupuestario
     df['Pp_Original'] = df['IDEN_PROY'].astype(str) + df['PROYECTO'].astype(str).str.zfill(3)
@@ -63,83 +75,59 @@ def procesar_map(df, filename):
         for month in MONTH_NAMES:
             col = f'{prefix}_{month}'
             if col in df.columns:
-                df[col] = df[col].fillna(0).apply(lambda x: round_like_excel(x, 2))
-    
-    # Calcular totales
-    df['Original'] = sum_columns(df, 'ORI', MONTH_NAMES)
-    df['OriginalPeriodo'] = sum_columns(df, 'ORI', months_up_to_current)
-    
-    # Modificado
-    df['ModificadoAnualBruto'] = sum_columns(df, 'MOD', MONTH_NAMES)
-    
-    if es_cierre_año_anterior:
-        df['ModificadoPeriodoBruto'] = sum_columns(df, 'MOD', MONTH_NAMES)
-    else:
-        df['ModificadoPeriodoBruto'] = sum_columns(df, 'MOD', months_up_to_current)
-    
-    # Congelados
-    cong_anual = sum_columns(df, 'CONG', MONTH_NAMES)
-    descong_anual = sum_columns(df, 'DESCONG', MONTH_NAMES)
-    
-    if es_cierre_año_anterior:
-        cong_periodo = sum_columns(df, 'CONG', MONTH_NAMES)
-        descong_periodo = sum_columns(df, 'DESCONG', MONTH_NAMES)
-    else:
-        cong_periodo = sum_columns(df, 'CONG', months_up_to_current)
-        descong_periodo = sum_columns(df, 'DESCONG', months_up_to_current)
-    
-    df['CongeladoAnual'] = (cong_anual - descong_anual).apply(lambda x: round_like_excel(x, 2))
-    df['CongeladoPeriodo'] = (cong_periodo - descong_periodo).apply(lambda x: round_like_excel(x, 2))
-    
-    # Modificado Neto
-    mod_anual_sum = sum_columns(df, 'MOD', MONTH_NAMES)
-    df['ModificadoAnualNeto'] = (mod_anual_sum - df['CongeladoAnual']).apply(lambda x: round_like_excel(x, 2))
-    
-    if es_cierre_año_anterior:
-        df['ModificadoPeriodoNeto'] = df['ModificadoAnualNeto'].copy()
-    else:
-        mod_periodo_sum = sum_columns(df, 'MOD', months_up_to_current)
-        df['ModificadoPeriodoNeto'] = (mod_periodo_sum - df['CongeladoPeriodo']).apply(lambda x: round_like_excel(x, 2))
-    
-    # Ejercido
-    df['Ejercido'] = sum_columns(df, 'EJE', MONTH_NAMES)
-    
-    # Disponibles
-    df['DisponibleAnualNeto'] = (df['ModificadoAnualNeto'] - df['Ejercido']).apply(lambda x: round_like_excel(x, 2))
-    df['DisponiblePeriodoNeto'] = (df['ModificadoPeriodoNeto'] - df['Ejercido']).apply(lambda x: round_like_excel(x, 2))
-    
-    # Crear pivots
+                df[col] = round_array_like_excel(df[col], 2)
+
+
+def agregar_por_categoria_programa(df, valores):
+    """Suma las columnas de valores por (categoría de capítulo, Pp) en una sola pasada"""
+    categoria_capitulo = df['Capitulo'].map(CAPITULO_A_CATEGORIA).fillna('').rename('Categoria')
+    return valores.groupby([categoria_capitulo, df['Pp']], sort=False).sum()
+
+
+def armar_cuadro_map(agregados, config, columna_periodo='ModificadoPeriodoNeto'):
+    """
+    Arma categorías, programas, congelados y totales del cuadro a partir de
+    la agregación por (categoría, Pp). columna_periodo indica de qué columna
+    se toma el modificado neto al periodo.
+    """
     programas_especificos = config['programas_especificos']
+    agregados_categoria = agregados.index.get_level_values('Categoria')
+    agregados_pp = agregados.index.get_level_values('Pp')
     
-    def crear_pivot_suma(filtro_func):
-        filtered = df[filtro_func(df)]
+    def crear_pivot_suma(filtro):
+        filtered = agregados[filtro]
         if len(filtered) == 0:
             return {'Original': 0, 'ModificadoAnualNeto': 0, 'ModificadoPeriodoNeto': 0, 'Ejercido': 0}
         return {
             'Original': round(filtered['Original'].sum(), 2),
             'ModificadoAnualNeto': round(filtered['ModificadoAnualNeto'].sum(), 2),
-            'ModificadoPeriodoNeto': round(filtered['ModificadoPeriodoNeto'].sum(), 2),
+            'ModificadoPeriodoNeto': round(filtered[columna_periodo].sum(), 2),
             'Ejercido': round(filtered['Ejercido'].sum(), 2)
         }
     
-    # Pivots por categoría
-    pivot_cap1000 = crear_pivot_suma(lambda d: (d['Capitulo'] == 1000) & (~d['Pp'].isin(programas_especificos)))
-    pivot_cap2000_3000 = crear_pivot_suma(lambda d: (d['Capitulo'].isin([2000, 3000])) & (~d['Pp'].isin(programas_especificos)))
-    pivot_cap4000 = crear_pivot_suma(lambda d: (d['Capitulo'] == 4000) & (~d['Pp'].isin(programas_especificos)))
-    pivot_cap5000_7000 = crear_pivot_suma(lambda d: (d['Capitulo'].isin([5000, 7000])) & (~d['Pp'].isin(programas_especificos)))
+    # Pivots por categoría (excluye los programas específicos)
+    fuera_de_programas = ~agregados_pp.isin(programas_especificos)
+    pivots_categoria = {
+        categoria: crear_pivot_suma((agregados_categoria == categoria) & fuera_de_programas)
+        for categoria in CATEGORIAS_CAPITULO
+    }
+    pivot_cap1000 = pivots_categoria['servicios_personales']
+    pivot_cap2000_3000 = pivots_categoria['gasto_corriente']
+    pivot_cap4000 = pivots_categoria['otros_programas']
+    pivot_cap5000_7000 = pivots_categoria['bienes_muebles']
     
     # Pivots por programa
     pivot_programas = {}
     for prog in programas_especificos:
-        pivot_programas[prog] = crear_pivot_suma(lambda d, p=prog: d['Pp'] == p)
+        pivot_programas[prog] = crear_pivot_suma(agregados_pp == prog)
     
     # Congelados por programa (para notas)
     programas_con_congelados = ['S263', 'S293', 'S304']
     congelados_programas = {}
     textos_congelados = {}
     for prog in programas_con_congelados:
-        df_prog = df[df['Pp'] == prog]
-        congelados_programas[prog] = round_like_excel(df_prog['CongeladoAnual'].sum(), 2) if len(df_prog) > 0 else 0
+        agregados_prog = agregados[agregados_pp == prog]
+        congelados_programas[prog] = round_like_excel(agregados_prog['CongeladoAnual'].sum(), 2) if len(agregados_prog) > 0 else 0
         textos_congelados[prog] = numero_a_letras_mx(congelados_programas[prog])
     
     # Subtotal subsidios
@@ -180,13 +168,233 @@ def procesar_map(df, filename):
             'textos': textos_congelados,
         },
         'totales': total_datos,
+    }
+
+
+def calcular_columnas_map(df, mes_archivo, es_cierre):
+    """Agrega a df (ya preparado) las columnas de original, modificado, congelado, ejercido y disponible"""
+    # Sumas acumuladas por mes: cada corte es una lectura del bloque
+    acumulados = construir_acumulados_mensuales(df)
+    mes_periodo = 12 if es_cierre else mes_archivo
+    
+    def suma(concepto, mes):
+        return suma_hasta_mes(df, acumulados, concepto, mes)
+    
+    # Calcular totales
+    df['Original'] = suma('ORI', 12)
+    df['OriginalPeriodo'] = suma('ORI', mes_archivo)
+    
+    # Modificado
+    df['ModificadoAnualBruto'] = suma('MOD', 12)
+    df['ModificadoPeriodoBruto'] = suma('MOD', mes_periodo)
+    
+    # Congelados
+    df['CongeladoAnual'] = round_array_like_excel(suma('CONG', 12) - suma('DESCONG', 12), 2)
+    df['CongeladoPeriodo'] = round_array_like_excel(suma('CONG', mes_periodo) - suma('DESCONG', mes_periodo), 2)
+    
+    # Modificado Neto
+    df['ModificadoAnualNeto'] = round_array_like_excel(df['ModificadoAnualBruto'] - df['CongeladoAnual'], 2)
+    df['ModificadoPeriodoNeto'] = round_array_like_excel(df['ModificadoPeriodoBruto'] - df['CongeladoPeriodo'], 2)
+    
+    # Ejercido
+    df['Ejercido'] = suma('EJE', 12)
+    del acumulados
+    
+    # Disponibles
+    df['DisponibleAnualNeto'] = round_array_like_excel(df['ModificadoAnualNeto'] - df['Ejercido'], 2)
+    df['DisponiblePeriodoNeto'] = round_array_like_excel(df['ModificadoPeriodoNeto'] - df['Ejercido'], 2)
+
+
+def procesar_map(df, filename, conservar_detalle=True):
+    """
+    Procesa el archivo MAP y devuelve los resultados calculados.
+    
+    Con conservar_detalle=False no modifica df ni lo copia completo: se
+    procesa por bloques de renglones (ver procesar_map_por_bloques) y
+    'df_procesado' es None.
+    
+    Returns:
+        dict con:
+        - 'categorias': dict con totales por categoría de gasto
+        - 'programas': dict con datos por programa
+        - 'congelados': dict con congelados por programa
+        - 'totales': dict con totales generales
+        - 'metadata': información del archivo
+        - 'df_procesado': DataFrame con las columnas calculadas (o None)
+    """
+    if not conservar_detalle:
+        return procesar_map_por_bloques(None, filename, bloques=dividir_en_bloques(df))
+    
+    # Detectar fecha y configuración
+    fecha_archivo, mes_archivo, año_archivo = detectar_fecha_archivo(filename)
+    config = get_config_by_year(año_archivo)
+    
+    es_cierre = es_cierre_año_anterior(mes_archivo, año_archivo)
+    
+    preparar_map(df, config)
+    calcular_columnas_map(df, mes_archivo, es_cierre)
+    
+    # Crear pivots: una sola agregación por (categoría de capítulo, Pp)
+    agregados = agregar_por_categoria_programa(
+        df, df[['Original', 'ModificadoAnualNeto', 'ModificadoPeriodoNeto', 'Ejercido', 'CongeladoAnual']]
+    )
+    
+    resultados = armar_cuadro_map(agregados, config)
+    resultados['metadata'] = {
+        'fecha_archivo': fecha_archivo,
+        'mes': mes_archivo,
+        'año': año_archivo,
+        'registros': len(df),
+        'es_cierre': es_cierre,
+        'config': config,
+    }
+    resultados['df_procesado'] = df
+    return resultados
+
+
+# Filas por bloque al leer el MAP en modo de memoria acotada
+TAMAÑO_BLOQUE_MAP = 50_000
+
+
+def dividir_en_bloques(df, tamaño_bloque=TAMAÑO_BLOQUE_MAP):
+    """
+    Bloques consecutivos de renglones de df. Son copias superficiales de
+    vistas: las columnas que preparar_map asigna se reemplazan solo en el
+    bloque y df no cambia (sin SettingWithCopyWarning en pandas 2).
+    """
+    # Un archivo vacío produce un bloque vacío
+    for inicio in range(0, max(len(df), 1), tamaño_bloque):
+        yield df.iloc[inicio:inicio + tamaño_bloque].copy(deep=False)
+
+
+def procesar_map_por_bloques(archivo, filename, tamaño_bloque=TAMAÑO_BLOQUE_MAP, bloques=None):
+    """
+    Procesa un CSV de MAP leyéndolo por bloques: cada bloque se prepara y se
+    reduce a sumas parciales por (categoría de capítulo, Pp), y las sumas se
+    combinan al final. La memoria máxima depende del tamaño del bloque y no
+    del archivo. Los resultados son los de procesar_map, salvo que no se
+    conserva el DataFrame procesado ('df_procesado' es None).
+    
+    Args:
+        archivo: ruta o buffer del CSV (latin-1)
+        filename: nombre del archivo (define fecha, mes y configuración)
+        tamaño_bloque: número de filas por bloque
+        bloques: iterable de DataFrames ya leídos con el esquema de MAP
+            (p. ej. de la copia columnar); si se indica, no se lee archivo
+    """
+    fecha_archivo, mes_archivo, año_archivo = detectar_fecha_archivo(filename)
+    config = get_config_by_year(año_archivo)
+    
+    es_cierre = es_cierre_año_anterior(mes_archivo, año_archivo)
+    
+    parciales = []
+    registros = 0
+    if bloques is None:
+        bloques = leer_csv(archivo, 'MAP', año_archivo, chunksize=tamaño_bloque)
+    for bloque in bloques:
+        preparar_map(bloque, config)
+        calcular_columnas_map(bloque, mes_archivo, es_cierre)
+        parciales.append(agregar_por_categoria_programa(
+            bloque, bloque[['Original', 'ModificadoAnualNeto', 'ModificadoPeriodoNeto', 'Ejercido', 'CongeladoAnual']]
+        ))
+        registros += len(bloque)
+    
+    # Combinar las sumas parciales (conserva el orden de primera aparición)
+    agregados = pd.concat(parciales).groupby(level=['Categoria', 'Pp'], sort=False).sum()
+    
+    resultados = armar_cuadro_map(agregados, config)
+    resultados['metadata'] = {
+        'fecha_archivo': fecha_archivo,
+        'mes': mes_archivo,
+        'año': año_archivo,
+        'registros': registros,
+        'es_cierre': es_cierre,
+        'config': config,
+    }
+    resultados['df_procesado'] = None
+    return resultados
+
+
+def procesar_map_todos_los_periodos(df, filename, conservar_detalle=True):
+    """
+    Procesa el archivo MAP una sola vez y calcula el cuadro para cada corte
+    mensual del año. El resultado de cada mes es igual al de procesar_map
+    con el archivo fechado en ese mes (incluido el cierre del año anterior
+    en enero y febrero), por lo que se puede cambiar de periodo sin
+    volver a procesar.
+    
+    Returns:
+        dict con:
+        - 'periodos': dict mes (1-12) -> resultados con la estructura de procesar_map
+        - 'metadata': información del archivo (mes detectado en el nombre)
+        - 'df_procesado': DataFrame con las columnas de preparar_map (None
+          con conservar_detalle=False, que además no modifica df)
+    """
+    fecha_archivo, mes_archivo, año_archivo = detectar_fecha_archivo(filename)
+    config = get_config_by_year(año_archivo)
+    
+    if not conservar_detalle:
+        # Copia superficial: las columnas preparadas no llegan al DataFrame original
+        df = df.copy(deep=False)
+    preparar_map(df, config)
+    acumulados = construir_acumulados_mensuales(df)
+    
+    def suma(concepto, mes):
+        return suma_hasta_mes(df, acumulados, concepto, mes)
+    
+    original = suma('ORI', 12)
+    congelado_anual = round_array_like_excel(suma('CONG', 12) - suma('DESCONG', 12), 2)
+    modificado_anual_neto = round_array_like_excel(suma('MOD', 12) - congelado_anual, 2)
+    ejercido = suma('EJE', 12)
+    
+    # Modificado neto de enero a cada mes, por registro (filas × 12)
+    i_mod, i_cong, i_descong = (CONCEPTOS_MENSUALES.index(c) for c in ['MOD', 'CONG', 'DESCONG'])
+    congelado_mes = round_array_like_excel(
+        round_array_like_excel(acumulados[:, i_cong, :], 2) - round_array_like_excel(acumulados[:, i_descong, :], 2), 2
+    )
+    modificado_neto_mes = round_array_like_excel(
+        round_array_like_excel(acumulados[:, i_mod, :], 2) - congelado_mes, 2
+    )
+    del acumulados, congelado_mes
+    
+    valores = pd.DataFrame({
+        'Original': original,
+        'ModificadoAnualNeto': modificado_anual_neto,
+        'Ejercido': ejercido,
+        'CongeladoAnual': congelado_anual,
+    }, index=df.index)
+    for mes in range(1, 13):
+        valores[f'ModificadoPeriodoNeto_{mes}'] = modificado_neto_mes[:, mes - 1]
+    del modificado_neto_mes
+    
+    agregados = agregar_por_categoria_programa(df, valores)
+    
+    df_procesado = df if conservar_detalle else None
+    periodos = {}
+    for mes in range(1, 13):
+        es_cierre = es_cierre_año_anterior(mes, año_archivo)
+        mes_periodo = 12 if es_cierre else mes
+        resultados = armar_cuadro_map(agregados, config, f'ModificadoPeriodoNeto_{mes_periodo}')
+        resultados['metadata'] = {
+            'fecha_archivo': fecha_corte_mes(fecha_archivo, mes),
+            'mes': mes,
+            'año': año_archivo,
+            'registros': len(df),
+            'es_cierre': es_cierre,
+            'config': config,
+        }
+        resultados['df_procesado'] = df_procesado
+        periodos[mes] = resultados
+    
+    return {
+        'periodos': periodos,
         'metadata': {
             'fecha_archivo': fecha_archivo,
             'mes': mes_archivo,
             'año': año_archivo,
             'registros': len(df),
-            'es_cierre': es_cierre_año_anterior,
+            'es_cierre': es_cierre_año_anterior(mes_archivo, año_archivo),
             'config': config,
         },
-        'df_procesado': df,
+        'df_procesado': df_procesado,
     }
@@ -0,0 +1,76 @@
+# ============================================================================
+# NORMALIZACIÓN DE URs (COMPARTIDA POR MAP Y SICOP)
+# ============================================================================
+"""
+Un archivo trae cientos de miles de renglones pero solo unos cientos de
+claves de unidad distintas: cada clave se mapea una vez y el resultado se
+reparte a los renglones por su código (categoría o factorize).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def mapear_ur_map(id_unidad, config):
+    """
+    UR numérica del MAP: mapeo base del año sin fusión (G00 -> 811); las
+    claves no numéricas sin mapeo quedan en 0.
+    """
+    id_str = str(id_unidad)
+    if id_str.isdigit():
+        numero = int(id_str)
+        tabla = config['mapeo_ur_denso']
+        return int(tabla[numero]) if numero < len(tabla) else numero
+    mapeada = config['mapeo_ur'].get(id_str)
+    return int(mapeada) if mapeada is not None else 0
+
+
+def mapear_ur_sicop(id_unidad, config):
+    """UR de SICOP (texto) según el año: mapeo base y, en 2026, fusión"""
+    id_str = str(id_unidad)
+    mapeada = config['mapeo_ur_texto'].get(id_str)
+    if mapeada is not None:
+        return mapeada
+    # Claves numéricas escritas con otro formato (p. ej. con ceros a la izquierda)
+    if id_str.isdigit() and int(id_str) in config['mapeo_ur']:
+        return config['fusion_ur_denso'][int(id_str)]
+    return id_str
+
+
+def mapear_claves(serie, funcion, categorica=False):
+    """
+    Aplica funcion a cada valor distinto de la serie y reparte el resultado
+    a todos sus renglones.
+
+    Args:
+        serie: claves originales
+        funcion: mapeo de una clave
+        categorica: regresar el resultado como categoría
+
+    Returns:
+        pd.Series con el mismo índice que serie
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos = serie.cat.codes.to_numpy()
+        distintos = serie.cat.categories
+    else:
+        codigos, distintos = pd.factorize(serie)
+    # El código -1 (valor faltante) toma el último elemento
+    mapeados = np.array([funcion(valor) for valor in distintos] + [funcion(np.nan)])
+    if categorica:
+        # Varias claves pueden llegar a la misma UR: se vuelven a codificar
+        codigos_destino, categorias = pd.factorize(mapeados)
+        return pd.Series(
+            pd.Categorical.from_codes(codigos_destino[codigos], categorias), index=serie.index
+        )
+    return pd.Series(mapeados[codigos], index=serie.index)
+
+
+def normalizar_ur_map(unidades, config):
+    """Columna NuevaUR del MAP"""
+    return mapear_claves(unidades, lambda valor: mapear_ur_map(valor, config)).astype(int)
+
+
+def normalizar_ur_sicop(unidades, config):
+    """Columna Nueva UR de SICOP (categórica)"""
+    return mapear_claves(unidades, lambda valor: mapear_ur_sicop(valor, config), categorica=True)
@@ -0,0 +1,317 @@
+# ============================================================================
+# PLANTILLAS DE EXCEL (FORMATO FIJO, SOLO SE ESCRIBEN LOS VALORES)
+# ============================================================================
+"""
+El formato de los reportes (anchos, encabezados, logo, estilos, notas) no
+cambia entre exportaciones del mismo año: solo cambian los montos, las
+fechas y los textos de congelados.
+
+Una plantilla es un libro de openpyxl con todo el formato en el que cada
+valor variable es un campo con nombre (campo('nombre')). Se guarda una vez
+en memoria y cada exportación solo escribe los valores en el XML de la
+hoja y vuelve a comprimir el paquete, sin volver a armar el libro.
+
+Un campo de renglones (campo_renglones('nombre')) ocupa un renglón de la
+plantilla y se sustituye por los renglones de una serie de bloques
+(DataFrames). Cada bloque se convierte a XML por columnas y se comprime en
+cuanto se escribe, sin crear objetos celda: la memoria no depende del
+número de renglones.
+"""
+
+import io
+import re
+import datetime
+from copy import copy
+from zipfile import ZipFile, ZIP_DEFLATED
+
+import numpy as np
+import pandas as pd
+from openpyxl.cell import Cell
+# Escritor interno de celdas de openpyxl (versión fijada en requirements.txt;
+# PlantillaExcel verifica al construirse que reconoce todos los campos)
+from openpyxl.cell._writer import etree_write_cell
+from openpyxl.compat import NUMERIC_TYPES, safe_string
+from openpyxl.styles import Alignment
+from openpyxl.utils import coordinate_to_tuple, get_column_letter
+from openpyxl.xml.functions import tostring
+
+from estilos_excel import (
+    COLOR_VINO, COLOR_BLANCO, BORDE_PUNTEADO, fuente, relleno, estilo, registrar_estilos, escribir_fila
+)
+
+ARCHIVO_PROPIEDADES = 'docProps/core.xml'
+
+# Marcas de los campos dentro de la plantilla
+_MARCA_CAMPO = '«{}»'
+_MARCA_RENGLONES = '«renglones:{}»'
+_PATRON_CAMPO = re.compile(
+    # Renglón completo ocupado por un campo de renglones
+    r'<row r="(?P<fila>[0-9]+)"[^>]*><c r="[A-Z]+[0-9]+"(?: s="[0-9]+")? t="inlineStr">'
+    r'<is><t>«renglones:(?P<renglones>[^«»<]+)»</t></is></c></row>'
+    # Celda con un campo
+    r'|<c r="(?P<celda>[A-Z]+[0-9]+)"(?: s="(?P<estilo>[0-9]+)")? t="inlineStr">'
+    r'<is><t>«(?P<nombre>[^«»<]+)»</t></is></c>'
+)
+# Cualquier marca que quede en el paquete después de partir las hojas
+_PATRON_MARCA = re.compile(r'«[^«»<]+»')
+# Las hojas con renglones variables no declaran su tamaño (es opcional)
+_PATRON_DIMENSION = re.compile(r'<dimension ref="[^"]*" />')
+
+# Caracteres que no se pueden escribir en XML (openpyxl los rechaza)
+_PATRON_NO_XML = r'[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]'
+
+# Renglones de detalle que se convierten a XML de una vez
+TAMAÑO_BLOQUE_DETALLE = 10_000
+
+ESTILOS_DETALLE = {
+    'Detalle encabezado': estilo(
+        fuente(11, negrita=True, color=COLOR_BLANCO), relleno(COLOR_VINO),
+        Alignment(horizontal='center', vertical='center', wrap_text=True), BORDE_PUNTEADO
+    ),
+}
+
+
+def campo(nombre):
+    """Valor de una celda variable de la plantilla"""
+    return _MARCA_CAMPO.format(nombre)
+
+
+def campo_renglones(nombre):
+    """Valor de la primera celda de un renglón que se sustituye por un bloque de renglones"""
+    return _MARCA_RENGLONES.format(nombre)
+
+
+def agregar_hoja_detalle(wb, titulo, columnas, nombre='detalle'):
+    """
+    Agrega a la plantilla una hoja de detalle: encabezado con las columnas
+    y un campo de renglones a partir del renglón 2.
+    """
+    registrar_estilos(wb, ESTILOS_DETALLE)
+    ws = wb.create_sheet(titulo)
+    escribir_fila(ws, 1, list(columnas), 'Detalle encabezado')
+    for col in range(1, len(columnas) + 1):
+        ws.column_dimensions[get_column_letter(col)].width = 16
+    ws.row_dimensions[1].height = 30
+    ws.freeze_panes = 'A2'
+    ws.cell(row=2, column=1, value=campo_renglones(nombre))
+    return ws
+
+
+def bloques_de(df, columnas, tamaño=TAMAÑO_BLOQUE_DETALLE):
+    """Bloques de renglones (vistas) de las columnas indicadas"""
+    for inicio in range(0, len(df), tamaño):
+        yield df.iloc[inicio:inicio + tamaño][list(columnas)]
+
+
+class _Captura:
+    """Recibe el elemento que escribe openpyxl para una celda"""
+
+    def write(self, elemento):
+        self.elemento = elemento
+
+
+class PlantillaExcel:
+    """
+    Libro serializado una vez y partido en fragmentos fijos y campos.
+    Es inmutable: se puede compartir entre hilos.
+
+    Raises:
+        RuntimeError: si alguna marca de campo no se reconoce en el XML que
+            escribió openpyxl (p. ej. si otra versión cambia cómo serializa
+            las celdas); así no se entregan libros con campos sin llenar
+    """
+
+    def __init__(self, wb):
+        salida = io.BytesIO()
+        wb.save(salida)
+        self._hoja = wb.active
+        self.propiedades = copy(wb.properties)
+        self.partes = []
+        self.campos = set()
+        with ZipFile(io.BytesIO(salida.getvalue())) as archivo:
+            for nombre in archivo.namelist():
+                contenido = archivo.read(nombre)
+                if nombre.startswith('xl/worksheets/') and nombre.endswith('.xml'):
+                    contenido = self._partir(contenido.decode('utf-8'))
+                self.partes.append((nombre, contenido))
+        self._verificar_marcas()
+
+    def _verificar_marcas(self):
+        """Verifica que no haya quedado ninguna marca de campo fuera de los campos reconocidos"""
+        sueltas = set()
+        for nombre, contenido in self.partes:
+            if isinstance(contenido, tuple):
+                textos = contenido[0]
+            elif nombre.endswith('.xml'):
+                textos = [contenido.decode('utf-8', errors='replace')]
+            else:
+                continue
+            for texto in textos:
+                sueltas.update(_PATRON_MARCA.findall(texto))
+        if sueltas:
+            raise RuntimeError(
+                f"La plantilla tiene campos que no se reconocieron en el XML de openpyxl: {', '.join(sorted(sueltas))}"
+            )
+
+    def _partir(self, xml):
+        """
+        Fragmentos fijos del XML de una hoja y campos entre ellos: (nombre,
+        celda, estilo) o, para un campo de renglones, (nombre, None, fila).
+        """
+        fragmentos = []
+        campos = []
+        inicio = 0
+        for marca in _PATRON_CAMPO.finditer(xml):
+            fragmentos.append(xml[inicio:marca.start()])
+            if marca['renglones']:
+                campos.append((marca['renglones'], None, int(marca['fila'])))
+            else:
+                campos.append((marca['nombre'], marca['celda'], marca['estilo']))
+            inicio = marca.end()
+        fragmentos.append(xml[inicio:])
+        if any(celda is None for _, celda, _ in campos):
+            fragmentos[0] = _PATRON_DIMENSION.sub('', fragmentos[0], count=1)
+        self.campos.update(nombre for nombre, _, _ in campos)
+        return fragmentos, campos
+
+    def rellenar(self, valores, destino=None):
+        """
+        Libro con los valores de los campos.
+
+        Args:
+            valores: dict nombre de campo -> valor (número, texto, fórmula o
+                texto enriquecido); deben estar todos los campos. Un campo de
+                renglones recibe una serie de DataFrames (ver bloques_de).
+            destino: ruta o archivo donde escribir el libro; por omisión se
+                regresan los bytes
+
+        Returns:
+            bytes del libro, o None si se indicó destino
+        """
+        salida = io.BytesIO() if destino is None else destino
+        with ZipFile(salida, 'w', ZIP_DEFLATED, allowZip64=True) as archivo:
+            for nombre, contenido in self.partes:
+                if nombre == ARCHIVO_PROPIEDADES:
+                    archivo.writestr(nombre, self._propiedades_actuales())
+                elif isinstance(contenido, tuple):
+                    with archivo.open(nombre, 'w', force_zip64=True) as hoja:
+                        for texto in self._xml_hoja(contenido, valores):
+                            hoja.write(texto.encode('utf-8'))
+                else:
+                    archivo.writestr(nombre, contenido)
+        return salida.getvalue() if destino is None else None
+
+    def _xml_hoja(self, contenido, valores):
+        """XML de una hoja por partes: fragmentos fijos, celdas y bloques de renglones"""
+        fragmentos, campos = contenido
+        pendiente = [fragmentos[0]]
+        for (campo_nombre, celda, estilo), fragmento in zip(campos, fragmentos[1:]):
+            if celda is None:
+                yield ''.join(pendiente)
+                pendiente = []
+                fila = estilo
+                for bloque in valores[campo_nombre]:
+                    yield xml_renglones(bloque, fila)
+                    fila += len(bloque)
+            else:
+                pendiente.append(self._xml_celda(celda, estilo, valores[campo_nombre]))
+            pendiente.append(fragmento)
+        yield ''.join(pendiente)
+
+    def _propiedades_actuales(self):
+        """core.xml con la fecha de creación y modificación de esta exportación"""
+        propiedades = copy(self.propiedades)
+        ahora = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+        propiedades.created = propiedades.modified = ahora
+        return tostring(propiedades.to_tree())
+
+    def _xml_celda(self, celda, estilo, valor):
+        """XML de una celda como lo escribe openpyxl"""
+        atributos = f'r="{celda}" s="{estilo}"' if estilo else f'r="{celda}"'
+        # Los montos son casi todas las celdas: se escriben directamente
+        if isinstance(valor, NUMERIC_TYPES) and not isinstance(valor, bool):
+            texto = safe_string(valor)
+            return f'<c {atributos} t="n"><v>{texto}</v></c>' if texto else f'<c {atributos} t="n"><v /></c>'
+
+        # Textos, fórmulas y texto enriquecido: el escritor de openpyxl
+        fila, columna = coordinate_to_tuple(celda)
+        captura = _Captura()
+        etree_write_cell(captura, self._hoja, Cell(self._hoja, row=fila, column=columna, value=valor))
+        if estilo:
+            # Mismo orden de atributos que openpyxl: r, s, t
+            atributos = dict(captura.elemento.attrib)
+            captura.elemento.attrib = {'r': atributos.pop('r'), 's': estilo, **atributos}
+        return tostring(captura.elemento).decode('utf-8')
+
+
+# ============================================================================
+# RENGLONES DE DETALLE
+# ============================================================================
+
+def _escapar(textos):
+    """Escapa texto para XML (arreglo de objetos str)"""
+    textos = pd.Series(textos, dtype=object)
+    for caracter, entidad in (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;')):
+        textos = textos.str.replace(caracter, entidad, regex=False)
+    # Caracteres que no admite XML: de control, sustitutos sueltos y U+FFFE/U+FFFF
+    textos = textos.str.replace(_PATRON_NO_XML, '', regex=True)
+    return textos.to_numpy(dtype=object)
+
+
+def _xml_columna(referencias, serie):
+    """
+    XML de las celdas de una columna; las celdas vacías quedan como ''.
+
+    Args:
+        referencias: arreglo de objetos con la referencia de cada celda
+        serie: valores de la columna
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype) and pd.api.types.is_numeric_dtype(serie.cat.categories.dtype):
+        serie = serie.astype(np.float64 if serie.hasnans else serie.cat.categories.dtype)
+
+    if pd.api.types.is_bool_dtype(serie.dtype) or pd.api.types.is_numeric_dtype(serie.dtype):
+        valores = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+        vacias = ~np.isfinite(valores)
+        if pd.api.types.is_float_dtype(serie.dtype):
+            textos = valores.astype(str).astype(object)
+        else:
+            # Enteros y booleanos sin decimales (0/1 para booleanos)
+            textos = np.where(vacias, 0, valores).astype(np.int64).astype(str).astype(object)
+        celdas = '<c r="' + referencias + '" t="n"><v>' + textos + '</v></c>'
+        celdas[vacias] = ''
+        return celdas
+
+    # Texto: cada valor distinto se escapa una vez y se reparte por su código
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos, distintos = serie.cat.codes.to_numpy(), serie.cat.categories
+    else:
+        codigos, distintos = pd.factorize(serie)
+    # El código -1 (valor faltante) toma el último elemento
+    textos = np.append(_escapar(np.asarray(distintos, dtype=object).astype(str)), None)
+    return _xml_textos(referencias, textos[codigos])
+
+
+def _xml_textos(referencias, textos):
+    """Celdas de texto en línea; None o '' quedan vacías"""
+    vacias = pd.isna(textos) | (textos == '')
+    textos = np.where(vacias, '', textos).astype(object)
+    # Espacios al inicio o al final: se conservan como los escribe openpyxl
+    con_espacios = pd.Series(textos).str.strip().to_numpy(dtype=object) != textos
+    etiqueta = np.where(con_espacios, '<t xml:space="preserve">', '<t>').astype(object)
+    celdas = '<c r="' + referencias + '" t="inlineStr"><is>' + etiqueta + textos + '</t></is></c>'
+    celdas[vacias] = ''
+    return celdas
+
+
+def xml_renglones(bloque, fila_inicial):
+    """
+    XML de los renglones de un DataFrame a partir de fila_inicial,
+    generado por columnas (sin objetos celda).
+    """
+    if bloque.empty:
+        return ''
+    filas = np.arange(fila_inicial, fila_inicial + len(bloque)).astype(str).astype(object)
+    contenido = np.full(len(bloque), '', dtype=object)
+    for col, nombre in enumerate(bloque.columns, 1):
+        contenido = contenido + _xml_columna(get_column_letter(col) + filas, bloque[nombre])
+    return ''.join('<row r="' + filas + '">' + contenido + '</row>')
@@ -0,0 +1,210 @@
+# ============================================================================
+# PROCESAMIENTO POR LOTES (SIN STREAMLIT)
+# ============================================================================
+"""
+Genera los Excel de MAP y SICOP desde la línea de comandos.
+
+Uso:
+    python procesamiento_lote.py ARCHIVO_O_CARPETA [...] [-o SALIDA] [-j PROCESOS] [--detalle] [--por-ur]
+
+Cada CSV se envía a procesar_map o procesar_sicop según su nombre (o, si
+el nombre no lo indica, según sus columnas) y los archivos se reparten en
+un pool de procesos. Con --detalle cada Excel incluye además la hoja
+"Detalle" con los renglones procesados, escrita por bloques. Con --por-ur
+cada corte de SICOP deja además un ZIP con un Dashboard Presupuesto por UR.
+"""
+
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from config import detectar_fecha_archivo, nombre_archivo_excel, nombre_paquete_urs
+from esquemas import leer_csv, COLUMNAS_MAP, COLUMNAS_SICOP
+from cache_columnar import SNAPSHOTS
+from map_processor import procesar_map, procesar_map_por_bloques, TAMAÑO_BLOQUE_MAP
+from sicop_processor import procesar_sicop
+from excel_map import generar_excel_map
+from excel_sicop import generar_excel_sicop
+from excel_ur import generar_paquete_urs
+
+
+def detectar_sistema(ruta):
+    """'MAP' o 'SICOP' según el nombre del archivo o sus columnas; None si no se reconoce"""
+    nombre = os.path.basename(ruta).upper()
+    if 'SICOP' in nombre:
+        return 'SICOP'
+    if 'MAP' in nombre:
+        return 'MAP'
+
+    encabezado = set(pd.read_csv(ruta, encoding='latin-1', nrows=0).columns)
+    if set(COLUMNAS_SICOP) <= encabezado:
+        return 'SICOP'
+    if set(COLUMNAS_MAP) <= encabezado:
+        return 'MAP'
+    return None
+
+
+def expandir_rutas(rutas):
+    """Lista de CSV a procesar: los archivos indicados y los CSV de cada carpeta"""
+    archivos = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            archivos.extend(
+                os.path.join(ruta, nombre) for nombre in sorted(os.listdir(ruta))
+                if nombre.lower().endswith('.csv')
+            )
+        else:
+            archivos.append(ruta)
+    return archivos
+
+
+def procesar_contenido(archivo, filename, sistema, detalle=False):
+    """
+    Procesa un CSV (ruta o buffer) del sistema indicado.
+
+    Args:
+        detalle: conservar los renglones procesados (df_procesado) para la
+            hoja de detalle; el MAP se lee completo en lugar de por bloques
+
+    Returns:
+        tuple (resultados, registros leídos del archivo), como procesar_bytes
+    """
+    _, _, año_archivo = detectar_fecha_archivo(filename)
+    if sistema == 'MAP':
+        if detalle:
+            resultados = procesar_map(leer_csv(archivo, 'MAP', año_archivo), filename)
+        else:
+            resultados = procesar_map_por_bloques(archivo, filename)
+        return resultados, resultados['metadata']['registros']
+    df = leer_csv(archivo, 'SICOP', año_archivo)
+    registros = len(df)
+    return procesar_sicop(df, filename, conservar_detalle=detalle), registros
+
+
+def procesar_bytes(contenido, filename, sistema):
+    """
+    Procesa el contenido de un CSV cargado, leyéndolo de su copia columnar
+    si ya existe (ver cache_columnar).
+
+    Returns:
+        tuple (resultados, registros leídos del archivo)
+    """
+    _, _, año_archivo = detectar_fecha_archivo(filename)
+    if sistema == 'MAP':
+        # El MAP se lee por bloques: no se conserva el DataFrame completo
+        bloques = SNAPSHOTS.leer_bloques(contenido, 'MAP', año_archivo, TAMAÑO_BLOQUE_MAP)
+        resultados = procesar_map_por_bloques(None, filename, bloques=bloques)
+        return resultados, resultados['metadata']['registros']
+    df = SNAPSHOTS.leer(contenido, 'SICOP', año_archivo)
+    registros = len(df)
+    return procesar_sicop(df, filename, conservar_detalle=False), registros
+
+
+def generar_excel(resultados, sistema, detalle=False, destino=None):
+    """Bytes del Excel del reporte (o None si se escribe en destino)"""
+    if sistema == 'MAP':
+        return generar_excel_map(resultados, detalle, destino)
+    return generar_excel_sicop(resultados, detalle, destino)
+
+
+def procesar_archivo(ruta, directorio_salida=None, detalle=False, por_ur=False, procesos_ur=None):
+    """
+    Procesa un CSV y escribe su Excel. Por omisión el Excel queda junto al
+    CSV, nombrado con la fecha del archivo para distinguir los cortes.
+
+    Args:
+        por_ur: en SICOP, escribir también el ZIP con un Excel por UR
+        procesos_ur: procesos para generar el ZIP (ver generar_paquete_urs)
+
+    Returns:
+        dict con 'archivo', 'sistema', 'salida', 'paquete' (ruta del ZIP o
+        None) y 'registros' (renglones del archivo, como en el vigilante y
+        el servicio HTTP)
+    """
+    sistema = detectar_sistema(ruta)
+    if sistema is None:
+        raise ValueError("No se reconoce si el archivo es de MAP o de SICOP")
+
+    filename = os.path.basename(ruta)
+    resultados, registros = procesar_contenido(ruta, filename, sistema, detalle)
+    metadata = resultados['metadata']
+
+    if directorio_salida is None:
+        directorio_salida = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(directorio_salida, exist_ok=True)
+    salida = os.path.join(
+        directorio_salida, nombre_archivo_excel(sistema, metadata['config'], metadata['fecha_archivo'])
+    )
+    generar_excel(resultados, sistema, detalle, destino=salida)
+
+    paquete = None
+    if por_ur and sistema == 'SICOP':
+        paquete = os.path.join(directorio_salida, nombre_paquete_urs(metadata['config'], metadata['fecha_archivo']))
+        generar_paquete_urs(resultados, destino=paquete, procesos=procesos_ur)
+
+    return {
+        'archivo': ruta, 'sistema': sistema, 'salida': salida, 'paquete': paquete,
+        'registros': registros,
+    }
+
+
+def procesar_lote(rutas, directorio_salida=None, procesos=None, detalle=False, por_ur=False):
+    """
+    Procesa los archivos en un pool de procesos y devuelve, conforme
+    terminan, tuplas (ruta, resultado, error). Con un solo archivo el pool
+    se usa para los libros por UR.
+    """
+    if procesos == 1 or len(rutas) <= 1:
+        for ruta in rutas:
+            try:
+                yield ruta, procesar_archivo(ruta, directorio_salida, detalle, por_ur, procesos), None
+            except Exception as e:
+                yield ruta, None, e
+        return
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = {pool.submit(procesar_archivo, ruta, directorio_salida, detalle, por_ur, 1): ruta for ruta in rutas}
+        for futuro in as_completed(futuros):
+            ruta = futuros[futuro]
+            try:
+                yield ruta, futuro.result(), None
+            except Exception as e:
+                yield ruta, None, e
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera los Excel de MAP y SICOP sin abrir la aplicación")
+    parser.add_argument('rutas', nargs='+', help="Archivos CSV o carpetas con CSV")
+    parser.add_argument('-o', '--salida', help="Carpeta de salida (por omisión, junto a cada CSV)")
+    parser.add_argument('-j', '--procesos', type=int, default=None,
+                        help="Número de procesos (por omisión, uno por CPU)")
+    parser.add_argument('--detalle', action='store_true',
+                        help="Agregar a cada Excel la hoja con los renglones procesados")
+    parser.add_argument('--por-ur', action='store_true',
+                        help="En SICOP, generar también un ZIP con un Excel por UR")
+    args = parser.parse_args(argv)
+
+    archivos = expandir_rutas(args.rutas)
+    if not archivos:
+        print("No se encontraron archivos CSV", file=sys.stderr)
+        return 1
+
+    errores = 0
+    for ruta, resultado, error in procesar_lote(archivos, args.salida, args.procesos, args.detalle, args.por_ur):
+        if error is not None:
+            errores += 1
+            print(f"ERROR {ruta}: {error}", file=sys.stderr)
+        else:
+            print(f"{resultado['sistema']:5} {ruta} -> {resultado['salida']} ({resultado['registros']:,} registros)")
+            if resultado['paquete']:
+                print(f"      {' ' * len(ruta)} -> {resultado['paquete']}")
+
+    print(f"{len(archivos) - errores} de {len(archivos)} archivos procesados")
+    return 1 if errores else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
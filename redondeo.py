@@ -0,0 +1,112 @@
+# ============================================================================
+# REDONDEO VECTORIZADO TIPO EXCEL
+# ============================================================================
+
+import numpy as np
+import pandas as pd
+
+
+def round_array_like_excel(values, decimals=2):
+    """
+    Redondea un arreglo o Series completo como Excel (ROUND_HALF_UP).
+
+    Reproduce a nivel de centavo el resultado de config.round_like_excel,
+    que redondea la representación decimal más corta de cada valor (str):
+    un valor sube si es mayor o igual al punto medio decimal (k + 0.5)
+    convertido a float. Los NaN se convierten en 0.
+
+    Args:
+        values: Series, ndarray o lista de valores numéricos
+        decimals: número de decimales
+
+    Returns:
+        Series (conservando el índice) o ndarray de float64
+    """
+    es_serie = isinstance(values, pd.Series)
+    arr = np.asarray(values, dtype=np.float64)
+
+    escala = 10.0 ** decimals
+    absoluto = np.abs(np.nan_to_num(arr, nan=0.0))
+
+    # Entero inferior a la escala pedida y punto medio decimal más cercano
+    base = np.floor(absoluto * escala)
+    punto_medio = (2 * base + 1) / (2 * escala)
+    redondeado = (base + (absoluto >= punto_medio)) / escala
+
+    resultado = np.copysign(redondeado, arr)
+    resultado[np.isnan(arr)] = 0.0
+
+    if es_serie:
+        return pd.Series(resultado, index=values.index, name=values.name)
+    return resultado
+
+
+# ============================================================================
+# SUMAS EXACTAS DE MONTOS
+# ============================================================================
+
+# Decimales con los que se intenta llevar los montos a enteros
+MAX_DECIMALES_EXACTOS = 6
+
+
+def _decimales_exactos(arr, max_decimales):
+    """Menos decimales con los que todos los valores de arr son exactos, o None"""
+    pendientes = arr
+    for decimales in range(max_decimales + 1):
+        escala = 10.0 ** decimales
+        pendientes = pendientes[np.rint(pendientes * escala) / escala != pendientes]
+        if pendientes.size == 0:
+            return decimales
+    return None
+
+
+def escala_exacta(columnas, max_decimales=MAX_DECIMALES_EXACTOS):
+    """
+    Menor potencia de 10 (hasta 10**max_decimales) que convierte todos los
+    valores de las columnas (Series o arreglos) en enteros sin perder
+    decimales, con la suma de sus valores absolutos por debajo de 2**53 para
+    que cualquier suma o resta entre ellos sea exacta en float64. Los NaN
+    cuentan como 0.
+
+    Sumar los montos así escalados como int64 da la suma decimal exacta sin
+    importar el orden o el agrupamiento, de modo que los puntos medios
+    (x.xx5) se redondean como con Decimal.
+
+    Returns:
+        float con la escala, o None si ninguna cumple
+    """
+    decimales = 0
+    total = 0.0
+    for valores in columnas:
+        arr = np.asarray(valores, dtype=np.float64)
+        arr = arr[(arr != 0) & ~np.isnan(arr)]
+        if not np.isfinite(arr).all():
+            return None
+        decimales_columna = _decimales_exactos(arr, max_decimales)
+        if decimales_columna is None:
+            return None
+        decimales = max(decimales, decimales_columna)
+        total += np.abs(arr).sum()
+    escala = 10.0 ** decimales
+    return escala if total * escala < 2.0 ** 53 else None
+
+
+def a_enteros(values, escala):
+    """Montos (Series o DataFrame) multiplicados por escala como int64, NaN como 0"""
+    return np.rint(values.fillna(0) * escala).astype(np.int64)
+
+
+def sumar_por_grupos(df, llaves=None, **opciones):
+    """
+    df.groupby(llaves, **opciones).sum() (o por level=) con las columnas
+    float64 sumadas como enteros de escala_exacta: cada suma es el float más
+    cercano a la suma decimal exacta. Si los montos no tienen escala, suma
+    en float.
+    """
+    montos = [col for col in df.columns if df[col].dtype == np.float64]
+    escala = escala_exacta([df[col] for col in montos])
+    if escala is None:
+        return df.groupby(llaves, **opciones).sum()
+    enteros = df.assign(**{col: a_enteros(df[col], escala) for col in montos})
+    suma = enteros.groupby(llaves, **opciones).sum()
+    return suma.assign(**{col: suma[col] / escala for col in montos})
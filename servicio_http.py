@@ -0,0 +1,276 @@
+# ============================================================================
+# SERVICIO HTTP LOCAL PARA GENERAR REPORTES
+# ============================================================================
+"""
+API HTTP mínima (solo biblioteca estándar) para obtener los reportes de MAP
+y SICOP como JSON o como Excel sin usar la aplicación Streamlit.
+
+Rutas:
+    GET  /salud
+    POST /reporte?nombre=15-MAR-2026_MAP.csv[&sistema=MAP][&formato=json|xlsx]
+         cuerpo: contenido del CSV
+    GET  /reporte?ruta=/carpeta/15-MAR-2026_MAP.csv[&formato=json|xlsx]
+         (solo rutas dentro de la carpeta raíz indicada al iniciar)
+
+El procesamiento corre en un pool de procesos y los resultados se guardan
+en el caché compartido (cache_resultados), por lo que las solicitudes
+repetidas del mismo archivo no se vuelven a procesar.
+
+Uso:
+    python servicio_http.py [--puerto 8502] [--raiz CARPETA] [-j PROCESOS]
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import threading
+import unicodedata
+from datetime import date
+from urllib.parse import urlparse, parse_qs, quote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cache_resultados import CACHE, clave_archivo, buscar_entrada, nueva_entrada
+from procesamiento_lote import detectar_sistema, procesar_bytes, generar_excel
+
+HOST = '127.0.0.1'
+PUERTO = 8502
+MAX_PROCESOS = 2
+
+TIPO_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def calcular_entrada(contenido, filename, sistema):
+    """Procesa el archivo en un proceso del pool y devuelve la entrada del caché"""
+    resultados, registros = procesar_bytes(contenido, filename, sistema)
+    return nueva_entrada(resultados, registros)
+
+
+def resultados_a_json(resultados, registros):
+    """Resultados en tipos de JSON (sin la configuración del año, el cubo ni el detalle)"""
+    def convertir(valor):
+        if isinstance(valor, pd.DataFrame):
+            return [{k: convertir(v) for k, v in fila.items()} for fila in valor.to_dict('records')]
+        if isinstance(valor, dict):
+            return {str(k): convertir(v) for k, v in valor.items()}
+        if isinstance(valor, (list, tuple)):
+            return [convertir(v) for v in valor]
+        if isinstance(valor, np.generic):
+            return valor.item()
+        if isinstance(valor, date):
+            return valor.isoformat()
+        return valor
+
+    datos = {k: v for k, v in resultados.items() if k not in ('df_procesado', 'cubo')}
+    datos['metadata'] = {k: v for k, v in resultados['metadata'].items() if k != 'config'}
+    datos['metadata']['registros_archivo'] = registros
+    return convertir(datos)
+
+
+class ServicioReportes:
+    """Pool de procesos, caché de resultados y solicitudes en curso"""
+
+    def __init__(self, procesos=MAX_PROCESOS, raiz=None):
+        self.pool = ProcessPoolExecutor(max_workers=procesos)
+        self.raiz = os.path.realpath(raiz) if raiz else None
+        self._en_curso = {}
+        self._lock = threading.Lock()
+
+    def obtener_entrada(self, contenido, filename, sistema):
+        """
+        Entrada del caché para el archivo; si no existe se calcula en el
+        pool. Las solicitudes simultáneas del mismo archivo comparten el
+        mismo cálculo.
+        """
+        clave = clave_archivo(contenido, sistema, filename)
+        entrada = buscar_entrada(clave)
+        if entrada is not None:
+            return clave, entrada
+
+        entrada = self._calcular_una_vez(
+            clave, lambda entrada: CACHE.guardar(clave, entrada),
+            calcular_entrada, contenido, filename, sistema
+        )
+        return clave, entrada
+
+    def obtener_excel(self, clave, entrada, sistema):
+        """
+        Excel de la entrada (se genera en el pool una sola vez, aunque
+        lleguen varias solicitudes a la vez)
+        """
+        excel = entrada['excel']
+        if excel is None:
+            def publicar(excel):
+                entrada['excel'] = excel
+                CACHE.actualizar_tamaño(clave)
+            excel = self._calcular_una_vez(
+                ('excel',) + clave, publicar, generar_excel, entrada['resultados'], sistema
+            )
+        return excel
+
+    def _calcular_una_vez(self, llave, publicar, funcion, *args):
+        """
+        Ejecuta funcion(*args) en el pool. Las solicitudes simultáneas con la
+        misma llave esperan el mismo cálculo; quien lo lanzó entrega el
+        resultado a publicar (que lo deja en el caché) antes de liberar la
+        llave, para que las solicitudes posteriores ya lo encuentren.
+        """
+        with self._lock:
+            futuro = self._en_curso.get(llave)
+            propio = futuro is None
+            if propio:
+                futuro = self.pool.submit(funcion, *args)
+                self._en_curso[llave] = futuro
+        try:
+            resultado = futuro.result()
+            if propio:
+                publicar(resultado)
+        finally:
+            if propio:
+                with self._lock:
+                    del self._en_curso[llave]
+        return resultado
+
+    def ruta_permitida(self, ruta):
+        """Ruta real del archivo si está dentro de la carpeta raíz; si no, None"""
+        if self.raiz is None:
+            return None
+        real = os.path.realpath(ruta)
+        if os.path.commonpath([real, self.raiz]) != self.raiz or not os.path.isfile(real):
+            return None
+        return real
+
+    def cerrar(self):
+        self.pool.shutdown(wait=True)
+
+
+class ManejadorReportes(BaseHTTPRequestHandler):
+    servicio = None
+
+    def log_message(self, formato, *args):
+        sys.stderr.write(f"{self.address_string()} {formato % args}\n")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parametros = parse_qs(url.query)
+        if url.path == '/salud':
+            return self._responder_json(200, {'estado': 'ok'})
+        if url.path != '/reporte':
+            return self._responder_json(404, {'error': 'Ruta no encontrada'})
+
+        ruta = self.servicio.ruta_permitida(_parametro(parametros, 'ruta', ''))
+        if ruta is None:
+            return self._responder_json(403, {'error': 'Ruta no permitida o inexistente'})
+        try:
+            sistema = detectar_sistema(ruta)
+        except ValueError as e:
+            return self._responder_json(400, {'error': str(e)})
+        with open(ruta, 'rb') as f:
+            contenido = f.read()
+        self._generar(contenido, os.path.basename(ruta), sistema, parametros)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        parametros = parse_qs(url.query)
+        if url.path != '/reporte':
+            return self._responder_json(404, {'error': 'Ruta no encontrada'})
+
+        filename = _parametro(parametros, 'nombre')
+        if not filename:
+            return self._responder_json(400, {'error': "Falta el parámetro 'nombre' (define la fecha del archivo)"})
+        longitud = int(self.headers.get('Content-Length', 0))
+        contenido = self.rfile.read(longitud)
+
+        sistema = _parametro(parametros, 'sistema', '').upper() or None
+        if sistema is None:
+            nombre = filename.upper()
+            sistema = 'SICOP' if 'SICOP' in nombre else 'MAP' if 'MAP' in nombre else None
+        self._generar(contenido, filename, sistema, parametros)
+
+    def _generar(self, contenido, filename, sistema, parametros):
+        formato = _parametro(parametros, 'formato', 'json').lower()
+        if sistema not in ('MAP', 'SICOP'):
+            return self._responder_json(400, {'error': "Indica sistema=MAP o sistema=SICOP"})
+        if formato not in ('json', 'xlsx'):
+            return self._responder_json(400, {'error': "formato debe ser json o xlsx"})
+
+        try:
+            clave, entrada = self.servicio.obtener_entrada(contenido, filename, sistema)
+            if formato == 'xlsx':
+                excel = self.servicio.obtener_excel(clave, entrada, sistema)
+                return self._responder(200, excel, TIPO_XLSX, filename.rsplit('.', 1)[0] + '.xlsx')
+            return self._responder_json(200, resultados_a_json(entrada['resultados'], entrada['registros']))
+        except ValueError as e:
+            return self._responder_json(400, {'error': str(e)})
+        except Exception as e:
+            return self._responder_json(500, {'error': f"Error al procesar el archivo: {e}"})
+
+    def _responder_json(self, estado, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+        self._responder(estado, cuerpo, 'application/json; charset=utf-8')
+
+    def _responder(self, estado, cuerpo, tipo, nombre_descarga=None):
+        self.send_response(estado)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        if nombre_descarga:
+            self.send_header('Content-Disposition', _disposicion_descarga(nombre_descarga))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+def _parametro(parametros, nombre, omision=None):
+    valores = parametros.get(nombre)
+    return valores[0] if valores else omision
+
+
+def _disposicion_descarga(nombre):
+    """
+    Content-Disposition de una descarga: filename= solo con caracteres
+    ASCII seguros (sin comillas, separadores ni saltos de línea) y
+    filename*= con el nombre completo en UTF-8 (RFC 5987)
+    """
+    simple = ''.join(c for c in unicodedata.normalize('NFKD', nombre) if not unicodedata.combining(c))
+    simple = re.sub(r'[^A-Za-z0-9._() -]', '_', simple).strip().lstrip('.') or 'reporte.xlsx'
+    return f"attachment; filename=\"{simple}\"; filename*=UTF-8''{quote(nombre, safe='')}"
+
+
+def crear_servidor(host=HOST, puerto=PUERTO, procesos=MAX_PROCESOS, raiz=None):
+    """
+    Crea el servidor (sin iniciarlo). Para pruebas locales se puede usar
+    puerto=0 y leer el puerto asignado en servidor.server_address.
+    """
+    servicio = ServicioReportes(procesos, raiz)
+    manejador = type('Manejador', (ManejadorReportes,), {'servicio': servicio})
+    servidor = ThreadingHTTPServer((host, puerto), manejador)
+    servidor.servicio = servicio
+    return servidor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio HTTP local para generar reportes de MAP y SICOP")
+    parser.add_argument('--host', default=HOST, help="Dirección de escucha (por omisión solo local)")
+    parser.add_argument('--puerto', type=int, default=PUERTO)
+    parser.add_argument('--raiz', help="Carpeta de la que se permite leer archivos por ruta")
+    parser.add_argument('-j', '--procesos', type=int, default=MAX_PROCESOS)
+    args = parser.parse_args(argv)
+
+    servidor = crear_servidor(args.host, args.puerto, args.procesos, args.raiz)
+    print(f"Servicio de reportes en http://{args.host}:{servidor.server_address[1]}", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servidor.servicio.cerrar()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
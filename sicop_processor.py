@@ -4,92 +4,127 @@
 
 import pandas as pd
 import numpy as np
-from datetime import date
 from config import (
     MONTH_NAMES, round_like_excel, detectar_fecha_archivo,
-    get_config_by_year, numero_a_letras_mx
+    get_config_by_year, numero_a_letras_mx, es_cierre_año_anterior, fecha_corte_mes,
+    obtener_columnas_hasta_mes, CO_EJERCIDO_GENERAL, SECCIONES_UR
 )
+from redondeo import round_array_like_excel, escala_exacta, a_enteros, sumar_por_grupos
+from mapeo_ur import normalizar_ur_sicop
 
 
-def obtener_columnas_hasta_mes(mes_numero):
-    """Obtiene las columnas de modificaciones y reservas hasta el mes indicado"""
-    todos_los_meses = [
-        ('EN', 'ENE'), ('FE', 'FEB'), ('MR', 'MZO'), ('AB', 'ABR'),
-        ('MY', 'MAY'), ('JN', 'JUN'), ('JL', 'JUL'), ('AG', 'AGO'),
-        ('SE', 'SEP'), ('OC', 'OCT'), ('NO', 'NOV'), ('DI', 'DIC')
-    ]
-    meses_usar = todos_los_meses[:mes_numero]
-    return {
-        'modificaciones': [f'MO{abrev}' for abrev, _ in meses_usar],
-        'reservas': [f'RESERVA_{completo}' for _, completo in meses_usar],
-    }
-
-
-def calcular_congelado_anual(df):
-    """Calcula el total de recursos congelados en el año"""
-    todos_meses = ['ENE', 'FEB', 'MZO', 'ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC']
-    cols = [f'RESERVA_{mes}' for mes in todos_meses if f'RESERVA_{mes}' in df.columns]
-    if cols:
-        return round_like_excel(df[cols].sum(axis=1).sum(), 2)
-    return 0
+# Catalogo de partidas (denominaciones) para el dashboard presupuesto
+CATALOGO_PARTIDAS = {
+    21101: 'Materiales y utiles de oficina',
+    21401: 'Materiales y utiles consumibles para el procesamiento en equipos y bienes informaticos',
+    21501: 'Material de apoyo informativo',
+    22102: 'Productos alimenticios para personas derivado de la prestacion de servicios publicos',
+    22103: 'Productos alimenticios para el personal que realiza labores en campo o de supervision',
+    22104: 'Productos alimenticios para el personal en las instalaciones de las dependencias y entidades',
+    22106: 'Productos alimenticios para el personal derivado de actividades extraordinarias',
+    22301: 'Utensilios para el servicio de alimentacion',
+    26102: 'Combustibles, lubricantes y aditivos para vehiculos destinados a servicios publicos',
+    26103: 'Combustibles, lubricantes y aditivos para vehiculos destinados a servicios administrativos',
+    26104: 'Combustibles, lubricantes y aditivos para vehiculos asignados a servidores publicos',
+    26105: 'Combustibles, lubricantes y aditivos para maquinaria y equipo de produccion',
+    31701: 'Servicios de conduccion de senales analogicas y digitales',
+    33104: 'Otras asesorias para la operacion de programas',
+    33302: 'Servicios estadisticos y geograficos',
+    33401: 'Servicios para capacitacion a servidores publicos',
+    33602: 'Otros servicios comerciales',
+    33801: 'Servicios de vigilancia',
+    33901: 'Subcontratacion de servicios con terceros',
+    35101: 'Mantenimiento y conservacion de inmuebles para la prestacion de servicios administrativos',
+    35201: 'Mantenimiento y conservacion de mobiliario y equipo de administracion',
+    35801: 'Servicios de lavanderia, limpieza e higiene',
+    35901: 'Servicios de jardineria y fumigacion',
+    37101: 'Pasajes aereos nacionales para labores en campo y de supervision',
+    37104: 'Pasajes aereos nacionales para servidores publicos de mando',
+    37106: 'Pasajes aereos internacionales para servidores publicos',
+    37201: 'Pasajes terrestres nacionales para labores en campo y de supervision',
+    37204: 'Pasajes terrestres nacionales para servidores publicos de mando',
+    37206: 'Pasajes terrestres internacionales para servidores publicos',
+    37501: 'Viaticos nacionales para labores en campo y de supervision',
+    37504: 'Viaticos nacionales para servidores publicos en el desempeno de funciones oficiales',
+    37602: 'Viaticos en el extranjero para servidores publicos',
+    37901: 'Cuotas para congresos, convenciones, exposiciones, seminarios y similares',
+    38301: 'Congresos y convenciones',
+    38401: 'Exposiciones',
+    38501: 'Gastos de representacion',
+}
 
 
-def calcular_congelado_periodo(df, mes_numero):
-    """Calcula el total de recursos congelados hasta el mes indicado"""
-    cols_a_usar = obtener_columnas_hasta_mes(mes_numero)
-    cols = [col for col in cols_a_usar['reservas'] if col in df.columns]
-    if cols:
-        return round_like_excel(df[cols].sum(axis=1).sum(), 2)
-    return 0
+# CONTROL_OPERATIVO de los renglones que no lo traen (no entra en ningún filtro)
+SIN_CONTROL_OPERATIVO = -1
 
 
-def mapear_ur(id_unidad, config):
-    """Mapea una UR original a la UR correspondiente según el año"""
-    id_str = str(id_unidad)
-    mapeo_base = config['mapeo_ur']
-    fusion_urs = config.get('fusion_urs', {})
-    
-    # Primero aplicar mapeo base
-    if id_unidad in mapeo_base:
-        id_str = str(mapeo_base[id_unidad])
-    elif id_str.isdigit() and int(id_str) in mapeo_base:
-        id_str = str(mapeo_base[int(id_str)])
+def calcular_congelados_por_mes(df, meses):
+    """
+    Calcula el total de recursos congelados en el año y hasta cada uno de
+    los meses indicados, con una sola suma por columna de reserva.
     
-    # Luego aplicar fusión si es 2026
-    if config['usar_2026'] and id_str in fusion_urs:
-        return fusion_urs[id_str]
+    Returns:
+        tuple (congelado_anual, dict mes -> congelado_periodo)
+    """
+    cols_anual = obtener_columnas_hasta_mes(12)['reservas']
+    hay_columna = [col in df.columns for col in cols_anual]
+    reservas = df[[col for col in cols_anual if col in df.columns]]
+    # Sumas exactas en enteros cuando los montos lo permiten
+    escala = escala_exacta([reservas[col] for col in reservas.columns])
+    if escala is None:
+        totales = reservas.sum()
+    else:
+        totales = a_enteros(reservas, escala).sum()
+    totales_mes = [totales[col] if col in totales.index else 0 for col in cols_anual]
+    acumulado = np.cumsum(totales_mes) / (escala or 1.0)
     
-    return id_str
+    congelado_anual = round_like_excel(acumulado[-1], 2) if any(hay_columna) else 0
+    congelado_periodo = {
+        mes: round_like_excel(acumulado[mes - 1], 2) if any(hay_columna[:mes]) else 0
+        for mes in meses
+    }
+    return congelado_anual, congelado_periodo
 
 
-def procesar_sicop(df, filename):
+def compactar_tipos_sicop(df):
     """
-    Procesa el archivo SICOP y devuelve los resultados calculados.
-    
-    Returns:
-        dict con:
-        - 'resumen': DataFrame con totales por UR
-        - 'subtotales': dict con subtotales por sección
-        - 'congelados': dict con congelados anual y periodo
-        - 'totales': dict con totales generales
-        - 'metadata': información del archivo
+    Claves como categorías y columnas de clasificación como enteros cortos
+    (modifica df). Los componentes de la partida deben ser enteros de un
+    dígito (ValueError si no). Los CONTROL_OPERATIVO vacíos, no enteros o
+    fuera del rango de int8 quedan como SIN_CONTROL_OPERATIVO: no coinciden
+    con ninguna clave de los filtros, igual que con su valor original.
     """
-    # Detectar fecha y configuración
-    fecha_archivo, mes_archivo, año_archivo = detectar_fecha_archivo(filename)
-    config = get_config_by_year(año_archivo)
-    
-    año_actual = date.today().year
-    es_cierre_año_anterior = (mes_archivo in [1, 2]) and (año_archivo < año_actual)
+    for col in ['ID_UNIDAD', 'PROGRAMA_PRESUPUESTARIO']:
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(str).astype('category')
+    for col in ['CAPITULO', 'CONCEPTO', 'PARTIDA_GENERICA', 'PARTIDA_ESPECIFICA']:
+        if df[col].dtype != np.int8:
+            valores = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            invalidos = ~((valores >= 0) & (valores <= 9) & (valores == np.floor(valores)))
+            if invalidos.any():
+                ejemplos = ', '.join(str(v) for v in pd.unique(valores[invalidos])[:5])
+                raise ValueError(f"La columna {col} del archivo SICOP debe tener enteros de 0 a 9: {ejemplos}")
+            df[col] = valores.astype(np.int8)
+    control = df['CONTROL_OPERATIVO']
+    if control.dtype != np.int8:
+        valores = control.to_numpy(dtype=np.float64, na_value=np.nan)
+        info = np.iinfo(np.int8)
+        validos = (valores >= info.min) & (valores <= info.max) & (valores == np.floor(valores))
+        df['CONTROL_OPERATIVO'] = np.where(validos, valores, SIN_CONTROL_OPERATIVO).astype(np.int8)
+
+
+def preparar_sicop(df, config):
+    """Mapea URs y calcula Partida y EJERCIDO_REAL (modifica df)"""
+    compactar_tipos_sicop(df)
     
     # Aplicar mapeo de URs
-    df['ID_UNIDAD'] = df['ID_UNIDAD'].astype(str)
-    df['Nueva UR'] = df['ID_UNIDAD'].apply(lambda x: mapear_ur(x, config))
+    df['Nueva UR'] = normalizar_ur_sicop(df['ID_UNIDAD'], config)
     
-    # Calcular Partida
+    # Calcular Partida (int8 no alcanza para la clave de cinco dígitos)
     df['Partida'] = (
-        df['CAPITULO'] * 10000 + df['CONCEPTO'] * 1000 +
-        df['PARTIDA_GENERICA'] * 100 + df['PARTIDA_ESPECIFICA'] * 10
-    ).astype(int)
+        df['CAPITULO'].astype(np.int32) * 10000 + df['CONCEPTO'].astype(np.int32) * 1000 +
+        df['PARTIDA_GENERICA'].astype(np.int32) * 100 + df['PARTIDA_ESPECIFICA'].astype(np.int32) * 10
+    )
     
     # Calcular EJERCIDO_REAL
     for col in ['EJERCIDO', 'DEVENGADO', 'EJERCIDO_TRAMITE']:
@@ -99,100 +134,40 @@ def procesar_sicop(df, filename):
             df[col] = df[col].fillna(0)
     
     df['EJERCIDO_REAL'] = df['EJERCIDO'] + df['DEVENGADO'] + df['EJERCIDO_TRAMITE']
+
+
+def obtener_urs_validas(config):
+    """URs del reporte en el orden de sus secciones (precalculadas en la configuración)"""
+    return config['urs_validas']
+
+
+def calcular_resumen_y_subtotales(resumen, config):
+    """
+    Completa disponibles y porcentajes del resumen por UR (modifica resumen)
+    y calcula los subtotales por sección y el total general.
     
-    # URs válidas
-    urs_validas = (config['sector_central'] + config['oficinas'] + 
-                   config['organos_desconcentrados'] + config['entidades_paraestatales'])
-    
-    # Guardar copia para congelados antes de filtrar
-    df_para_congelados = df.copy()
-    
-    # Aplicar filtros
-    df = df[df['Nueva UR'].astype(str).isin(urs_validas)].copy()
-    df = df[~df['Partida'].isin([39801, 39810])].copy()
-    df = df[~df['CAPITULO'].isin([1, 7])].copy()
-    df = df[df['CONTROL_OPERATIVO'].isin([0, 10, 40, 50, 51])].copy()
-    
-    # Calcular por UR
-    resultados_ur = {}
-    
-    for ur in urs_validas:
-        df_ur = df[df['Nueva UR'].astype(str) == ur].copy()
-        
-        if len(df_ur) == 0:
-            resultados_ur[ur] = {
-                'Original': 0, 'Modificado_anual': 0, 'Modificado_periodo': 0, 'Ejercido': 0
-            }
-            continue
-        
-        # Calcular Modificado neto
-        df_ur['Modificado_neto'] = df_ur['MODIFICADO_AUTORIZADO'] - df_ur['RESERVAS']
-        
-        # ORIGINAL: Suma donde CO=0
-        df_co0 = df_ur[df_ur['CONTROL_OPERATIVO'] == 0]
-        original = round_like_excel(df_co0['ORIGINAL'].sum(), 2)
-        
-        # MODIFICADO: Filtros de CO según tipo de UR
-        if ur in config['entidades_paraestatales'] or ur == 'RJL':
-            df_modificado = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50])]
-        elif ur in config['organos_desconcentrados']:
-            df_modificado = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50])]
-        else:
-            df_modificado = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50, 51])]
-        
-        # MODIFICADO ANUAL
-        modificado_anual = round_like_excel(df_modificado['Modificado_neto'].sum(), 2)
-        
-        # MODIFICADO PERIODO
-        if es_cierre_año_anterior or mes_archivo == 12:
-            modificado_periodo = modificado_anual
-        else:
-            cols_a_usar = obtener_columnas_hasta_mes(mes_archivo)
-            cols_mod = [col for col in cols_a_usar['modificaciones'] if col in df_modificado.columns]
-            cols_res = [col for col in cols_a_usar['reservas'] if col in df_modificado.columns]
-            
-            mod_bruto = df_modificado[cols_mod].sum(axis=1).sum() if cols_mod else 0
-            cong_periodo = df_modificado[cols_res].sum(axis=1).sum() if cols_res else 0
-            modificado_periodo = round_like_excel(mod_bruto - cong_periodo, 2)
-        
-        # EJERCIDO
-        if ur in config['entidades_paraestatales'] or ur == 'RJL':
-            df_ejercido = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50])]
-        elif ur in config['organos_desconcentrados']:
-            df_ejercido = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50])]
-        else:
-            df_ejercido = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50, 51])]
-        
-        ejercido = round_like_excel(df_ejercido['EJERCIDO_REAL'].sum(), 2)
-        
-        resultados_ur[ur] = {
-            'Original': original,
-            'Modificado_anual': modificado_anual,
-            'Modificado_periodo': modificado_periodo,
-            'Ejercido': ejercido
-        }
-    
-    # Crear DataFrame de resumen
-    resumen = pd.DataFrame.from_dict(resultados_ur, orient='index').reset_index()
-    resumen.columns = ['UR', 'Original', 'Modificado_anual', 'Modificado_periodo', 'Ejercido_acumulado']
-    
+    Returns:
+        tuple (subtotales, total_general)
+    """
     # Calcular disponibles y porcentajes
-    resumen['Disponible_anual'] = resumen.apply(
-        lambda row: round_like_excel(row['Modificado_anual'] - row['Ejercido_acumulado'], 2), axis=1
-    )
-    resumen['Disponible_periodo'] = resumen.apply(
-        lambda row: round_like_excel(row['Modificado_periodo'] - row['Ejercido_acumulado'], 2), axis=1
+    resumen['Disponible_anual'] = round_array_like_excel(
+        resumen['Modificado_anual'] - resumen['Ejercido_acumulado'], 2
     )
-    resumen['Pct_avance_anual'] = resumen.apply(
-        lambda row: row['Ejercido_acumulado'] / row['Modificado_anual'] if row['Modificado_anual'] != 0 else 0, axis=1
-    )
-    resumen['Pct_avance_periodo'] = resumen.apply(
-        lambda row: row['Ejercido_acumulado'] / row['Modificado_periodo'] if row['Modificado_periodo'] != 0 else 0, axis=1
+    resumen['Disponible_periodo'] = round_array_like_excel(
+        resumen['Modificado_periodo'] - resumen['Ejercido_acumulado'], 2
     )
+    ejercido = resumen['Ejercido_acumulado'].to_numpy()
+    modificado_anual = resumen['Modificado_anual'].to_numpy()
+    modificado_periodo = resumen['Modificado_periodo'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        resumen['Pct_avance_anual'] = np.where(modificado_anual != 0, ejercido / modificado_anual, 0)
+        resumen['Pct_avance_periodo'] = np.where(modificado_periodo != 0, ejercido / modificado_periodo, 0)
+    
+    # Calcular subtotales por sección (código de sección de cada UR)
+    seccion = resumen['UR'].map(config['seccion_ur']).to_numpy()
     
-    # Calcular subtotales por sección
-    def calcular_subtotal(urs_lista):
-        df_seccion = resumen[resumen['UR'].isin(urs_lista)]
+    def calcular_subtotal(codigo):
+        df_seccion = resumen[seccion == codigo]
         subtotal = {
             'Original': df_seccion['Original'].sum(),
             'Modificado_anual': df_seccion['Modificado_anual'].sum(),
@@ -205,10 +180,9 @@ def procesar_sicop(df, filename):
         subtotal['Pct_avance_periodo'] = subtotal['Ejercido_acumulado'] / subtotal['Modificado_periodo'] if subtotal['Modificado_periodo'] != 0 else 0
         return subtotal
     
-    subtotal_sc = calcular_subtotal(config['sector_central'])
-    subtotal_of = calcular_subtotal(config['oficinas'])
-    subtotal_od = calcular_subtotal(config['organos_desconcentrados'])
-    subtotal_ep = calcular_subtotal(config['entidades_paraestatales'])
+    subtotal_sc, subtotal_of, subtotal_od, subtotal_ep = (
+        calcular_subtotal(codigo) for codigo in range(len(SECCIONES_UR))
+    )
     
     # Total general
     total_general = {
@@ -222,168 +196,396 @@ def procesar_sicop(df, filename):
     total_general['Pct_avance_anual'] = total_general['Ejercido_acumulado'] / total_general['Modificado_anual'] if total_general['Modificado_anual'] != 0 else 0
     total_general['Pct_avance_periodo'] = total_general['Ejercido_acumulado'] / total_general['Modificado_periodo'] if total_general['Modificado_periodo'] != 0 else 0
     
-    # Congelados
-    df_para_congelados = df_para_congelados[df_para_congelados['Nueva UR'].astype(str).isin(urs_validas)]
-    df_para_congelados = df_para_congelados[~df_para_congelados['Partida'].isin([39801, 39810])]
-    df_para_congelados = df_para_congelados[df_para_congelados['CAPITULO'] != 1]
+    subtotales = {
+        'sector_central': subtotal_sc,
+        'oficinas': subtotal_of,
+        'organos_desconcentrados': subtotal_od,
+        'entidades_paraestatales': subtotal_ep,
+    }
+    return subtotales, total_general
+
+
+# Niveles del cubo de agregados de SICOP
+NIVELES_CUBO = ['UR', 'CO', 'Capitulo', 'Partida', 'Pp']
+
+# Claves de CONTROL_OPERATIVO que entran en el resumen, capítulos y partidas
+CO_REPORTE = [0, 10, 40, 50, 51]
+
+# Partidas con mayor disponible que se guardan por UR
+TOP_PARTIDAS = 5
+
+
+def construir_cubo_sicop(df, urs_validas):
+    """
+    Cubo de agregados por (UR, CO, capítulo, partida, Pp) de un archivo ya
+    preparado con preparar_sicop. Contiene los renglones del reporte (URs
+    válidas, sin las partidas 39801/39810 ni el capítulo 1) con cualquier
+    CONTROL_OPERATIVO, de modo que de él salen tanto los congelados como el
+    resumen, los capítulos y las partidas de cualquier corte mensual.
+    
+    Returns:
+        DataFrame indexado por NIVELES_CUBO con los montos (ORIGINAL,
+        MODIFICADO_AUTORIZADO, RESERVAS, MODIFICADO_NETO, EJERCIDO_REAL y
+        las columnas mensuales MO*/RESERVA_* del archivo) y 'Registros'
+        por celda
+    """
+    incluidos = (
+        df['Nueva UR'].isin(urs_validas) & ~df['Partida'].isin([39801, 39810]) & (df['CAPITULO'] != 1)
+    ).to_numpy()
+    
+    cols_mes = obtener_columnas_hasta_mes(12)
+    columnas_mes = [col for col in cols_mes['modificaciones'] + cols_mes['reservas'] if col in df.columns]
+    columnas = ['ORIGINAL', 'MODIFICADO_AUTORIZADO', 'RESERVAS', 'EJERCIDO', 'DEVENGADO', 'EJERCIDO_TRAMITE'] + columnas_mes
+    
+    # Montos como enteros en la escala de sus decimales: las sumas del cubo
+    # son la suma decimal exacta de los renglones, sin importar el orden
+    escala = escala_exacta([df[col] for col in columnas])
+    if escala is None:
+        montos = {col: df[col] for col in columnas}
+        montos['EJERCIDO_REAL'] = df['EJERCIDO_REAL']
+        modificado_neto = df['MODIFICADO_AUTORIZADO'] - df['RESERVAS']
+    else:
+        montos = {col: a_enteros(df[col], escala) for col in columnas}
+        montos['EJERCIDO_REAL'] = montos['EJERCIDO'] + montos['DEVENGADO'] + montos['EJERCIDO_TRAMITE']
+        modificado_neto = (montos['MODIFICADO_AUTORIZADO'] - montos['RESERVAS']).where(
+            df['MODIFICADO_AUTORIZADO'].notna() & df['RESERVAS'].notna(), 0
+        )
+    
+    # Sin copiar el archivo: solo las columnas del cubo, y los renglones
+    # excluidos quedan con UR vacía, que groupby descarta
+    columnas_cubo = ['ORIGINAL', 'MODIFICADO_AUTORIZADO', 'RESERVAS', 'MODIFICADO_NETO', 'EJERCIDO_REAL'] + columnas_mes
+    valores = pd.DataFrame({
+        'ORIGINAL': montos['ORIGINAL'],
+        'MODIFICADO_AUTORIZADO': montos['MODIFICADO_AUTORIZADO'],
+        'RESERVAS': montos['RESERVAS'],
+        # Por renglón: un renglón sin RESERVAS no aporta al modificado neto
+        'MODIFICADO_NETO': modificado_neto,
+        'EJERCIDO_REAL': montos['EJERCIDO_REAL'],
+        **{col: montos[col] for col in columnas_mes},
+        'Registros': np.ones(len(df), dtype=np.int64),
+    }, index=df.index)
+    del montos, modificado_neto
+    
+    nueva_ur = df['Nueva UR']
+    llaves = [pd.Series(
+        pd.Categorical.from_codes(np.where(incluidos, nueva_ur.cat.codes, -1), nueva_ur.cat.categories),
+        index=df.index, name='UR'
+    )] + [
+        df[col].rename(nivel)
+        for col, nivel in zip(['CONTROL_OPERATIVO', 'CAPITULO', 'Partida', 'PROGRAMA_PRESUPUESTARIO'], NIVELES_CUBO[1:])
+    ]
+    cubo = valores.groupby(llaves, observed=True).sum()
+    if escala is not None:
+        cubo[columnas_cubo] = cubo[columnas_cubo] / escala
+    return cubo
+
+
+def celdas_reporte(cubo):
+    """Celdas del cubo que entran en el resumen, los capítulos y las partidas"""
+    co = cubo.index.get_level_values('CO')
+    return cubo[co.isin(CO_REPORTE) & (cubo.index.get_level_values('Capitulo') != 7)]
+
+
+def clasificar_co(cubo_reporte, config):
+    """
+    Máscaras (es_co_ejercido, es_co0, es_co10) de las celdas según su
+    CONTROL_OPERATIVO. Las claves que cuentan para el modificado y el
+    ejercido salen de config['co_ejercido_ur'] (CO_EJERCIDO_GENERAL para
+    una UR fuera de la tabla): se arma una tabla categoría de UR × clave de
+    CO (int8) y cada celda se clasifica con una lectura de la tabla.
+    """
+    ur = cubo_reporte.index.get_level_values('UR')
+    control_operativo = cubo_reporte.index.get_level_values('CO')
+    co_ejercido_ur = config['co_ejercido_ur']
+    desplazamiento = -np.iinfo(np.int8).min
+    cuenta_para_ejercido = np.zeros((len(ur.categories), 2 * desplazamiento), dtype=bool)
+    for i, clave in enumerate(ur.categories):
+        claves_co = np.asarray(co_ejercido_ur.get(clave, CO_EJERCIDO_GENERAL))
+        cuenta_para_ejercido[i, claves_co + desplazamiento] = True
+    es_co_ejercido = cuenta_para_ejercido[ur.codes, control_operativo.to_numpy(dtype=np.int16) + desplazamiento]
+    return es_co_ejercido, control_operativo == 0, control_operativo == 10
+
+
+def calcular_partidas_por_ur(cubo, es_co10, es_co_ejercido, config, urs_validas, top=TOP_PARTIDAS):
+    """
+    Las top partidas con mayor disponible de cada UR, para todas las URs en
+    una sola pasada: una agregación, un ordenamiento estable por UR y
+    disponible, y los primeros top renglones de cada UR.
+    """
+    catalogo_programas = config.get('programas_nombres', {})
+    
+    # Calcular top partidas con mayor disponible
+    llaves_partida = ['UR', 'Partida', 'Pp']
+    df_partidas = sumar_por_grupos(
+        cubo.loc[es_co10, ['ORIGINAL', 'MODIFICADO_AUTORIZADO']], level=llaves_partida, observed=True
+    ).reset_index()
+    
+    # Agregar ejercido
+    df_eje_partidas = sumar_por_grupos(
+        cubo.loc[es_co_ejercido, ['EJERCIDO_REAL']], level=llaves_partida, observed=True
+    ).reset_index()
+    
+    df_partidas = df_partidas.merge(df_eje_partidas, on=llaves_partida, how='left')
+    df_partidas['EJERCIDO_REAL'] = df_partidas['EJERCIDO_REAL'].fillna(0)
+    df_partidas['Disponible'] = df_partidas['MODIFICADO_AUTORIZADO'] - df_partidas['EJERCIDO_REAL']
+    
+    # Filtrar solo partidas con disponible > 0 y quedarse con las top de cada UR
+    df_partidas = df_partidas[df_partidas['Disponible'] > 0].sort_values(
+        ['UR', 'Disponible'], ascending=[True, False], kind='stable'
+    )
+    df_partidas = df_partidas[df_partidas.groupby('UR', observed=True).cumcount() < top]
+    
+    partidas = df_partidas['Partida'].astype(int).tolist()
+    programas = df_partidas['Pp'].tolist()
+    montos = zip(*(
+        round_array_like_excel(df_partidas[col], 2).tolist()
+        for col in ['ORIGINAL', 'MODIFICADO_AUTORIZADO', 'EJERCIDO_REAL', 'Disponible']
+    ))
+    
+    partidas_por_ur = {ur: [] for ur in urs_validas}
+    for ur, partida, programa, (original, modificado, ejercido, disponible) in zip(
+        df_partidas['UR'].tolist(), partidas, programas, montos
+    ):
+        partidas_por_ur[ur].append({
+            'Partida': partida,
+            'Denominacion': CATALOGO_PARTIDAS.get(partida, ''),
+            'Programa': programa,
+            'Denom_Programa': catalogo_programas.get(programa, ''),
+            'Original': original,
+            'Modificado': modificado,
+            'Ejercido': ejercido,
+            'Disponible': disponible,
+        })
+    
+    return partidas_por_ur
+
+
+def partidas_por_ur_desde_cubo(cubo, config, top=TOP_PARTIDAS):
+    """
+    partidas_por_ur con otro número de partidas por UR, a partir del cubo
+    de resultados['cubo'] (sin volver a procesar el archivo)
+    """
+    cubo_reporte = celdas_reporte(cubo)
+    es_co_ejercido, _, es_co10 = clasificar_co(cubo_reporte, config)
+    return calcular_partidas_por_ur(cubo_reporte, es_co10, es_co_ejercido, config, config['urs_validas'], top)
+
+
+def calcular_sicop(df, filename, meses=None, conservar_detalle=True, top_partidas=TOP_PARTIDAS):
+    """
+    Motor común de procesar_sicop y procesar_sicop_todos_los_periodos:
+    agrega el archivo una sola vez y arma los resultados de cada corte
+    mensual solicitado (por omisión, el mes detectado en el nombre).
+    
+    Con conservar_detalle=False no modifica df ni copia el archivo
+    completo: solo se extraen los renglones y columnas que entran en el
+    cubo de agregados, y 'df_procesado' es None.
+    
+    Returns:
+        dict mes -> resultados con la estructura de procesar_sicop
+    """
+    # Detectar fecha y configuración
+    fecha_archivo, mes_archivo, año_archivo = detectar_fecha_archivo(filename)
+    config = get_config_by_year(año_archivo)
+    if meses is None:
+        meses = [mes_archivo]
+    
+    if not conservar_detalle:
+        # Copia superficial: las columnas calculadas no llegan al DataFrame original
+        df = df.copy(deep=False)
+    preparar_sicop(df, config)
+    urs_validas = obtener_urs_validas(config)
+    
+    # Cubo de agregados: todo lo demás se deriva de él
+    cubo = construir_cubo_sicop(df, urs_validas)
+    
+    if conservar_detalle:
+        filas = np.flatnonzero(
+            df['Nueva UR'].isin(urs_validas) & ~df['Partida'].isin([39801, 39810]) &
+            ~df['CAPITULO'].isin([1, 7]) & df['CONTROL_OPERATIVO'].isin(CO_REPORTE)
+        )
+        df_procesado = df.iloc[filas]
+    else:
+        df_procesado = None
+    del df
+    
+    # Congelados (todas las claves de control operativo)
+    congelado_anual, congelados_periodo = calcular_congelados_por_mes(cubo, meses)
     
-    congelado_anual = calcular_congelado_anual(df_para_congelados)
-    congelado_periodo = calcular_congelado_periodo(df_para_congelados, mes_archivo)
+    # Celdas del resumen, capítulos y partidas
+    cubo_reporte = celdas_reporte(cubo)
+    registros = int(cubo_reporte['Registros'].sum())
+    
+    # Modificaciones y reservas mensuales hasta el último mes solicitado
+    cols_a_usar = obtener_columnas_hasta_mes(max(meses))
+    columnas_mes = [
+        col for col in cols_a_usar['modificaciones'] + cols_a_usar['reservas'] if col in cubo_reporte.columns
+    ]
     
     # =========================================================================
-    # CALCULOS ADICIONALES PARA DASHBOARD PRESUPUESTO
+    # AGREGACIÓN POR UR Y CAPÍTULO
     # =========================================================================
     
-    # Catalogo de partidas (denominaciones)
-    catalogo_partidas = {
-        21101: 'Materiales y utiles de oficina',
-        21401: 'Materiales y utiles consumibles para el procesamiento en equipos y bienes informaticos',
-        21501: 'Material de apoyo informativo',
-        22102: 'Productos alimenticios para personas derivado de la prestacion de servicios publicos',
-        22103: 'Productos alimenticios para el personal que realiza labores en campo o de supervision',
-        22104: 'Productos alimenticios para el personal en las instalaciones de las dependencias y entidades',
-        22106: 'Productos alimenticios para el personal derivado de actividades extraordinarias',
-        22301: 'Utensilios para el servicio de alimentacion',
-        26102: 'Combustibles, lubricantes y aditivos para vehiculos destinados a servicios publicos',
-        26103: 'Combustibles, lubricantes y aditivos para vehiculos destinados a servicios administrativos',
-        26104: 'Combustibles, lubricantes y aditivos para vehiculos asignados a servidores publicos',
-        26105: 'Combustibles, lubricantes y aditivos para maquinaria y equipo de produccion',
-        31701: 'Servicios de conduccion de senales analogicas y digitales',
-        33104: 'Otras asesorias para la operacion de programas',
-        33302: 'Servicios estadisticos y geograficos',
-        33401: 'Servicios para capacitacion a servidores publicos',
-        33602: 'Otros servicios comerciales',
-        33801: 'Servicios de vigilancia',
-        33901: 'Subcontratacion de servicios con terceros',
-        35101: 'Mantenimiento y conservacion de inmuebles para la prestacion de servicios administrativos',
-        35201: 'Mantenimiento y conservacion de mobiliario y equipo de administracion',
-        35801: 'Servicios de lavanderia, limpieza e higiene',
-        35901: 'Servicios de jardineria y fumigacion',
-        37101: 'Pasajes aereos nacionales para labores en campo y de supervision',
-        37104: 'Pasajes aereos nacionales para servidores publicos de mando',
-        37106: 'Pasajes aereos internacionales para servidores publicos',
-        37201: 'Pasajes terrestres nacionales para labores en campo y de supervision',
-        37204: 'Pasajes terrestres nacionales para servidores publicos de mando',
-        37206: 'Pasajes terrestres internacionales para servidores publicos',
-        37501: 'Viaticos nacionales para labores en campo y de supervision',
-        37504: 'Viaticos nacionales para servidores publicos en el desempeno de funciones oficiales',
-        37602: 'Viaticos en el extranjero para servidores publicos',
-        37901: 'Cuotas para congresos, convenciones, exposiciones, seminarios y similares',
-        38301: 'Congresos y convenciones',
-        38401: 'Exposiciones',
-        38501: 'Gastos de representacion',
-    }
+    # Reglas de CONTROL_OPERATIVO según tipo de UR
+    es_co_ejercido, es_co0, es_co10 = clasificar_co(cubo_reporte, config)
     
-    # Catalogo de programas
-    catalogo_programas = config.get('programas_nombres', {})
+    # Montos como enteros en la escala de sus decimales: las sumas por UR y
+    # capítulo son la suma decimal exacta sin importar el agrupamiento, y los
+    # puntos medios se redondean como la suma renglón por renglón con Decimal
+    columnas_montos = ['ORIGINAL', 'MODIFICADO_AUTORIZADO', 'MODIFICADO_NETO', 'EJERCIDO_REAL'] + columnas_mes
+    escala = escala_exacta([cubo_reporte[col] for col in columnas_montos])
+    if escala is None:
+        escala = 1.0
+        montos = cubo_reporte[columnas_montos]
+    else:
+        montos = a_enteros(cubo_reporte[columnas_montos], escala)
     
-    # Calcular datos por capitulo para cada UR
-    capitulos_por_ur = {}
-    partidas_por_ur = {}
+    aportes = pd.DataFrame({
+        # Resumen por UR
+        'Original': montos['ORIGINAL'].where(es_co0, 0),
+        'Modificado_neto': montos['MODIFICADO_NETO'].where(es_co_ejercido, 0),
+        'Ejercido': montos['EJERCIDO_REAL'].where(es_co_ejercido, 0),
+        # Dashboard por capítulo (CONTROL_OPERATIVO = 10 para modificado)
+        'Cap_original': montos['ORIGINAL'].where(es_co10, 0),
+        'Cap_mod_anual': montos['MODIFICADO_AUTORIZADO'].where(es_co10, 0),
+    }, index=cubo_reporte.index)
     
-    for ur in urs_validas:
-        df_ur = df[df['Nueva UR'] == ur]
-        
-        # Filtrar para calculos (CONTROL_OPERATIVO = 10 para modificado)
-        df_ur_mod = df_ur[df_ur['CONTROL_OPERATIVO'] == 10]
+    for col in columnas_mes:
+        aportes[col] = montos[col].where(es_co_ejercido, 0)
+        aportes[f'Cap_{col}'] = montos[col].where(es_co10, 0)
+    del montos
+    
+    por_ur_capitulo = aportes.groupby(level=['UR', 'Capitulo'], sort=False, observed=True).sum()
+    del aportes
+    por_ur = por_ur_capitulo.groupby(level=0, sort=False, observed=True).sum().reindex(urs_validas, fill_value=0)
+    
+    indice_caps = pd.MultiIndex.from_product([urs_validas, [2, 3, 4]])
+    por_caps = por_ur_capitulo.reindex(indice_caps, fill_value=0)
+    
+    def modificado_neto_hasta_mes(agregado, mes, prefijo=''):
+        """Modificado bruto menos reservas de enero al mes, ya agregados"""
+        cols_mes = obtener_columnas_hasta_mes(mes)
+        cols_mod = [f'{prefijo}{col}' for col in cols_mes['modificaciones'] if col in columnas_mes]
+        cols_res = [f'{prefijo}{col}' for col in cols_mes['reservas'] if col in columnas_mes]
+        return (agregado[cols_mod].sum(axis=1) - agregado[cols_res].sum(axis=1)) / escala
+    
+    # Valores del resumen que no dependen del mes
+    original = round_array_like_excel(por_ur['Original'] / escala, 2).to_numpy()
+    modificado_anual = round_array_like_excel(por_ur['Modificado_neto'] / escala, 2).to_numpy()
+    ejercido = round_array_like_excel(por_ur['Ejercido'] / escala, 2).to_numpy()
+    
+    caps_original = round_array_like_excel(por_caps['Cap_original'] / escala, 2).tolist()
+    caps_mod_anual = round_array_like_excel(por_caps['Cap_mod_anual'] / escala, 2).tolist()
+    caps_ejercido = round_array_like_excel(por_caps['Ejercido'] / escala, 2)
+    
+    partidas_por_ur = calcular_partidas_por_ur(
+        cubo_reporte, es_co10, es_co_ejercido, config, urs_validas, top_partidas
+    )
+    
+    resultados_por_mes = {}
+    for mes in meses:
+        es_cierre = es_cierre_año_anterior(mes, año_archivo)
         
-        # Filtrar para ejercido segun tipo de UR
-        if ur in config['entidades_paraestatales'] or ur == 'RJL':
-            df_ur_eje = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50])]
-        elif ur in config['organos_desconcentrados']:
-            df_ur_eje = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50])]
+        # MODIFICADO PERIODO
+        if es_cierre or mes == 12:
+            modificado_periodo = modificado_anual
         else:
-            df_ur_eje = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50, 51])]
+            modificado_periodo = round_array_like_excel(modificado_neto_hasta_mes(por_ur, mes), 2).to_numpy()
         
-        # Calcular por capitulo (2, 3, 4)
-        caps_ur = {}
-        for cap in [2, 3, 4]:
-            df_cap_mod = df_ur_mod[df_ur_mod['CAPITULO'] == cap]
-            df_cap_eje = df_ur_eje[df_ur_eje['CAPITULO'] == cap]
-            
-            original = round_like_excel(df_cap_mod['ORIGINAL'].sum(), 2)
-            mod_anual = round_like_excel(df_cap_mod['MODIFICADO_AUTORIZADO'].sum(), 2)
-            
-            # Modificado periodo
-            cols_a_usar = obtener_columnas_hasta_mes(mes_archivo)
-            cols_mod = [col for col in cols_a_usar['modificaciones'] if col in df_cap_mod.columns]
-            cols_res = [col for col in cols_a_usar['reservas'] if col in df_cap_mod.columns]
-            
-            mod_bruto = df_cap_mod[cols_mod].sum(axis=1).sum() if cols_mod else 0
-            cong_periodo = df_cap_mod[cols_res].sum(axis=1).sum() if cols_res else 0
-            mod_periodo = round_like_excel(mod_bruto - cong_periodo, 2)
-            
-            ejercido = round_like_excel(df_cap_eje['EJERCIDO_REAL'].sum(), 2)
-            
-            caps_ur[str(cap)] = {
-                'Original': original,
-                'Modificado_anual': mod_anual,
-                'Modificado_periodo': mod_periodo,
-                'Ejercido_acumulado': ejercido,
-                'Disponible_periodo': round_like_excel(mod_periodo - ejercido, 2),
-            }
-        
-        capitulos_por_ur[ur] = caps_ur
-        
-        # Calcular top partidas con mayor disponible
-        df_partidas = df_ur_mod.groupby(['Partida', 'PROGRAMA_PRESUPUESTARIO']).agg({
-            'ORIGINAL': 'sum',
-            'MODIFICADO_AUTORIZADO': 'sum',
-        }).reset_index()
-        
-        # Agregar ejercido
-        df_eje_partidas = df_ur_eje.groupby(['Partida', 'PROGRAMA_PRESUPUESTARIO']).agg({
-            'EJERCIDO_REAL': 'sum',
-        }).reset_index()
-        
-        df_partidas = df_partidas.merge(df_eje_partidas, on=['Partida', 'PROGRAMA_PRESUPUESTARIO'], how='left')
-        df_partidas['EJERCIDO_REAL'] = df_partidas['EJERCIDO_REAL'].fillna(0)
-        df_partidas['Disponible'] = df_partidas['MODIFICADO_AUTORIZADO'] - df_partidas['EJERCIDO_REAL']
+        # Crear DataFrame de resumen
+        resumen = pd.DataFrame({
+            'UR': urs_validas,
+            'Original': original,
+            'Modificado_anual': modificado_anual,
+            'Modificado_periodo': modificado_periodo,
+            'Ejercido_acumulado': ejercido,
+        })
+        subtotales, total_general = calcular_resumen_y_subtotales(resumen, config)
         
-        # Filtrar solo partidas con disponible > 0 y ordenar
-        df_partidas = df_partidas[df_partidas['Disponible'] > 0].sort_values('Disponible', ascending=False).head(5)
+        # Calcular datos por capitulo (2, 3, 4) para cada UR
+        caps_mod_periodo = round_array_like_excel(modificado_neto_hasta_mes(por_caps, mes, 'Cap_'), 2)
+        caps_disponible = round_array_like_excel(caps_mod_periodo - caps_ejercido, 2)
         
-        partidas_list = []
-        for _, row in df_partidas.iterrows():
-            partida = int(row['Partida'])
-            programa = row['PROGRAMA_PRESUPUESTARIO']
-            partidas_list.append({
-                'Partida': partida,
-                'Denominacion': catalogo_partidas.get(partida, ''),
-                'Programa': programa,
-                'Denom_Programa': catalogo_programas.get(programa, ''),
-                'Original': round_like_excel(row['ORIGINAL'], 2),
-                'Modificado': round_like_excel(row['MODIFICADO_AUTORIZADO'], 2),
-                'Ejercido': round_like_excel(row['EJERCIDO_REAL'], 2),
-                'Disponible': round_like_excel(row['Disponible'], 2),
-            })
+        capitulos_por_ur = {ur: {} for ur in urs_validas}
+        for (ur, cap), orig, mod_a, mod_p, eje, disp in zip(
+            indice_caps, caps_original, caps_mod_anual, caps_mod_periodo.tolist(),
+            caps_ejercido.tolist(), caps_disponible.tolist()
+        ):
+            capitulos_por_ur[ur][str(cap)] = {
+                'Original': orig,
+                'Modificado_anual': mod_a,
+                'Modificado_periodo': mod_p,
+                'Ejercido_acumulado': eje,
+                'Disponible_periodo': disp,
+            }
         
-        partidas_por_ur[ur] = partidas_list
+        congelado_periodo = congelados_periodo[mes]
+        resultados_por_mes[mes] = {
+            'resumen': resumen,
+            'subtotales': subtotales,
+            'congelados': {
+                'anual': congelado_anual,
+                'periodo': congelado_periodo,
+                'texto_anual': numero_a_letras_mx(congelado_anual),
+                'texto_periodo': numero_a_letras_mx(congelado_periodo),
+            },
+            'totales': total_general,
+            'capitulos_por_ur': capitulos_por_ur,
+            'partidas_por_ur': partidas_por_ur,
+            'metadata': {
+                'fecha_archivo': fecha_corte_mes(fecha_archivo, mes),
+                'mes': mes,
+                'año': año_archivo,
+                'registros': registros,
+                'es_cierre': es_cierre,
+                'config': config,
+            },
+            'cubo': cubo,
+            'df_procesado': df_procesado,
+        }
     
+    return resultados_por_mes
+
+
+def procesar_sicop(df, filename, conservar_detalle=True, top_partidas=TOP_PARTIDAS):
+    """
+    Procesa el archivo SICOP y devuelve los resultados calculados. Con
+    conservar_detalle=False no modifica df y no incluye el DataFrame
+    procesado (ver calcular_sicop).
+    
+    Returns:
+        dict con:
+        - 'resumen': DataFrame con totales por UR
+        - 'subtotales': dict con subtotales por sección
+        - 'congelados': dict con congelados anual y periodo
+        - 'totales': dict con totales generales
+        - 'capitulos_por_ur': dict con capítulos 2000-4000 por UR
+        - 'partidas_por_ur': dict con las top_partidas partidas de mayor disponible por UR
+        - 'metadata': información del archivo
+        - 'cubo': cubo de agregados (ver construir_cubo_sicop)
+        - 'df_procesado': registros filtrados con las columnas calculadas (o None)
+    """
+    _, mes_archivo, _ = detectar_fecha_archivo(filename)
+    return calcular_sicop(df, filename, conservar_detalle=conservar_detalle, top_partidas=top_partidas)[mes_archivo]
+
+
+def procesar_sicop_todos_los_periodos(df, filename, conservar_detalle=True, top_partidas=TOP_PARTIDAS):
+    """
+    Procesa el archivo SICOP una sola vez y calcula los resultados para cada
+    corte mensual del año. El resultado de cada mes es igual al de
+    procesar_sicop con el archivo fechado en ese mes (incluido el cierre del
+    año anterior en enero y febrero).
+    
+    Returns:
+        dict con:
+        - 'periodos': dict mes (1-12) -> resultados con la estructura de procesar_sicop
+        - 'metadata': información del archivo (mes detectado en el nombre)
+    """
+    _, mes_archivo, _ = detectar_fecha_archivo(filename)
+    periodos = calcular_sicop(
+        df, filename, meses=list(range(1, 13)), conservar_detalle=conservar_detalle, top_partidas=top_partidas
+    )
     return {
-        'resumen': resumen,
-        'subtotales': {
-            'sector_central': subtotal_sc,
-            'oficinas': subtotal_of,
-            'organos_desconcentrados': subtotal_od,
-            'entidades_paraestatales': subtotal_ep,
-        },
-        'congelados': {
-            'anual': congelado_anual,
-            'periodo': congelado_periodo,
-            'texto_anual': numero_a_letras_mx(congelado_anual),
-            'texto_periodo': numero_a_letras_mx(congelado_periodo),
-        },
-        'totales': total_general,
-        'capitulos_por_ur': capitulos_por_ur,
-        'partidas_por_ur': partidas_por_ur,
-        'metadata': {
-            'fecha_archivo': fecha_archivo,
-            'mes': mes_archivo,
-            'año': año_archivo,
-            'registros': len(df),
-            'es_cierre': es_cierre_año_anterior,
-            'config': config,
-        },
-        'df_procesado': df,
+        'periodos': periodos,
+        'metadata': periodos[mes_archivo]['metadata'],
+        'df_procesado': periodos[mes_archivo]['df_procesado'],
     }
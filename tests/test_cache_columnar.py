@@ -0,0 +1,80 @@
+"""
+Copias columnares: una copia que desaparece (desalojada por otro proceso) o
+que no se puede leer cuenta como ausente y el archivo se lee del CSV.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+import cache_columnar
+from cache_columnar import AlmacenSnapshots
+from cache_resultados import hash_contenido
+
+CSV_SICOP = (
+    'ID_UNIDAD,CAPITULO,CONCEPTO,PARTIDA_GENERICA,PARTIDA_ESPECIFICA,CONTROL_OPERATIVO,'
+    'PROGRAMA_PRESUPUESTARIO,ORIGINAL,MODIFICADO_AUTORIZADO,RESERVAS\n'
+    '100,2,1,1,1,0,M001,10.5,20.25,0\n'
+    'B00,3,3,9,1,50,S263,1.125,-3,4\n'
+    '100,4,3,8,1,51,M001,0,7,0\n'
+).encode('latin-1')
+
+
+def _almacen(tmp_path):
+    return AlmacenSnapshots(directorio=str(tmp_path))
+
+
+def _ruta(almacen):
+    return almacen.ruta(hash_contenido(CSV_SICOP), 'SICOP', 2026)
+
+
+def _bloques(almacen):
+    return pd.concat(list(almacen.leer_bloques(CSV_SICOP, 'SICOP', 2026, 2)), ignore_index=True)
+
+
+def _igual(df, esperado):
+    # Al unir bloques con categorías distintas se pierde el tipo categórico
+    categoricas = {col: 'str' for col in esperado.columns if isinstance(esperado[col].dtype, pd.CategoricalDtype)}
+    pd.testing.assert_frame_equal(df.astype(categoricas), esperado.astype(categoricas))
+
+
+def test_lee_de_la_copia(tmp_path):
+    almacen = _almacen(tmp_path)
+    del_csv = almacen.leer(CSV_SICOP, 'SICOP', 2026)
+    assert os.path.exists(_ruta(almacen))
+    _igual(almacen.leer(CSV_SICOP, 'SICOP', 2026), del_csv)
+    _igual(_bloques(almacen), del_csv)
+
+
+@pytest.mark.parametrize('lectura', ['leer', 'leer_bloques'])
+def test_copia_desalojada_al_abrir(tmp_path, monkeypatch, lectura):
+    almacen = _almacen(tmp_path)
+    esperado = almacen.leer(CSV_SICOP, 'SICOP', 2026)
+
+    # Otro proceso borra la copia justo antes de que se mapee
+    memory_map = pa.memory_map
+
+    def mapear_despues_de_borrar(ruta, *args):
+        os.remove(ruta)
+        return memory_map(ruta, *args)
+    monkeypatch.setattr(cache_columnar.pa, 'memory_map', mapear_despues_de_borrar)
+
+    if lectura == 'leer':
+        df = almacen.leer(CSV_SICOP, 'SICOP', 2026)
+    else:
+        df = _bloques(almacen)
+    _igual(df, esperado)
+
+
+def test_copia_dañada(tmp_path):
+    almacen = _almacen(tmp_path)
+    esperado = almacen.leer(CSV_SICOP, 'SICOP', 2026)
+    with open(_ruta(almacen), 'wb') as f:
+        f.write(b'no es arrow')
+
+    _igual(almacen.leer(CSV_SICOP, 'SICOP', 2026), esperado)
+    # La lectura del CSV vuelve a publicar una copia válida
+    _igual(_bloques(almacen), esperado)
@@ -0,0 +1,169 @@
+"""
+Caché de resultados: la clave no cambia de un día a otro, las partes que
+dependen de la fecha de hoy se revisan al usar la entrada y las entradas en
+disco se guardan sin pickle y con límite de tamaño.
+"""
+
+import os
+import pickle
+import datetime
+from zipfile import ZipFile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cache_resultados
+import config
+from cache_resultados import (
+    clave_archivo, nueva_entrada, entrada_vigente, buscar_entrada, CacheResultados,
+    guardar_entrada, cargar_entrada, ruta_entrada,
+)
+
+
+class _Fecha(datetime.date):
+    """date con today() fijo (se asigna en hoy)"""
+    hoy = None
+
+    @classmethod
+    def today(cls):
+        return cls.hoy
+
+
+@pytest.fixture
+def hoy(monkeypatch):
+    """Fija la fecha de hoy para el caché y la configuración"""
+    monkeypatch.setattr(cache_resultados, 'date', _Fecha)
+    monkeypatch.setattr(config, 'date', _Fecha)
+
+    def fijar(año, mes, dia):
+        _Fecha.hoy = datetime.date(año, mes, dia)
+    return fijar
+
+
+def _entrada(mes, año, excel=b'xlsx'):
+    metadata = {'mes': mes, 'año': año, 'es_cierre': config.es_cierre_año_anterior(mes, año)}
+    return nueva_entrada({'metadata': metadata}, 10, excel)
+
+
+def test_clave_sin_fecha_de_hoy(hoy):
+    hoy(2026, 3, 16)
+    clave = clave_archivo(b'contenido', 'SICOP', '15-MAR-2026_SICOP.csv')
+    hoy(2026, 3, 17)
+    assert clave_archivo(b'contenido', 'SICOP', '15-MAR-2026_SICOP.csv') == clave
+    assert clave[1:] == ('SICOP', '2026-03-15')
+
+
+def test_excel_de_otro_dia_se_descarta(hoy):
+    hoy(2026, 3, 16)
+    entrada = _entrada(3, 2026)
+    entrada['paquetes_ur'] = {5: b'zip'}
+    assert entrada_vigente(entrada)
+    assert entrada['excel'] == b'xlsx'
+
+    hoy(2026, 3, 17)
+    assert entrada_vigente(entrada)
+    assert entrada['excel'] is None
+    assert 'paquetes_ur' not in entrada
+    assert entrada['fecha_excel'] == datetime.date(2026, 3, 17)
+
+
+def test_cambio_de_cierre_invalida_los_resultados(hoy):
+    # Un corte de enero se calcula como cierre solo cuando ya pasó su año
+    hoy(2025, 12, 31)
+    entrada = _entrada(1, 2025)
+    assert entrada_vigente(entrada)
+    hoy(2026, 1, 1)
+    assert not entrada_vigente(entrada)
+
+
+def test_buscar_entrada(hoy, monkeypatch):
+    monkeypatch.setattr(cache_resultados, 'CACHE', CacheResultados())
+    hoy(2025, 12, 31)
+    clave = ('hash', 'MAP', '2025-01-10')
+    entrada = _entrada(1, 2025)
+    cache_resultados.CACHE.guardar(clave, entrada)
+    assert buscar_entrada(clave, directorio=None) is entrada
+    assert buscar_entrada(('otro', 'MAP', '2025-01-10'), directorio=None) is None
+    hoy(2026, 1, 2)
+    assert buscar_entrada(clave, directorio=None) is None
+
+
+# ============================================================================
+# RESULTADOS PRECALCULADOS EN DISCO
+# ============================================================================
+
+def _resultados():
+    cubo = pd.DataFrame(
+        {'ORIGINAL': [1.5, -0.0, np.nan], 'PARTIDA': np.array([21101, 33901, 44101], dtype=np.int64)},
+        index=pd.MultiIndex.from_tuples([('100', 2), ('100', 3), ('B00', 4)], names=['UR', 'CAPITULO']),
+    )
+    return {
+        'resumen': pd.DataFrame({'UR': pd.Series(['100', 'Maíz 🌽'], dtype='str'), 'Original': [1.0, 2.675]}),
+        'totales': {'Original': np.float64(3.675), 'Pct': 0.1},
+        'partidas_por_ur': {'100': [{'Partida': 21101, 'Denominacion': 'Materiales & "útiles"'}]},
+        'metadata': {
+            'fecha_archivo': datetime.date(2026, 3, 15), 'mes': 3, 'año': 2026,
+            'registros': 3, 'es_cierre': False, 'config': config.get_config_by_year(2026),
+        },
+        'cubo': cubo,
+        'df_procesado': None,
+    }
+
+
+def test_guardar_y_cargar(tmp_path):
+    resultados = _resultados()
+    entrada = nueva_entrada(resultados, 3, b'PK excel')
+    clave = ('hash', 'SICOP', '2026-03-15')
+    ruta = guardar_entrada(str(tmp_path), clave, entrada)
+
+    # Solo datos: JSON, tablas Arrow y el Excel
+    with ZipFile(ruta) as archivo:
+        assert sorted(archivo.namelist()) == ['entrada.json', 'reporte.xlsx', 'tablas/0.arrow', 'tablas/1.arrow']
+
+    cargada = cargar_entrada(str(tmp_path), clave)
+    assert cargada['excel'] == b'PK excel'
+    assert cargada['registros'] == 3
+    assert cargada['fecha_excel'] == entrada['fecha_excel']
+    leidos = cargada['resultados']
+    pd.testing.assert_frame_equal(leidos['resumen'], resultados['resumen'])
+    pd.testing.assert_frame_equal(leidos['cubo'], resultados['cubo'])
+    assert leidos['metadata']['config'] is resultados['metadata']['config']
+    for nombre in ('totales', 'partidas_por_ur', 'metadata', 'df_procesado'):
+        assert leidos[nombre] == resultados[nombre]
+
+
+def test_archivo_ajeno_o_inexistente(tmp_path):
+    clave = ('hash', 'MAP', '2026-03-15')
+    assert cargar_entrada(str(tmp_path), clave) is None
+
+    # Un pickle con el nombre de la entrada no se ejecuta: no es un ZIP válido
+    with open(ruta_entrada(str(tmp_path), clave), 'wb') as f:
+        f.write(pickle.dumps(_Ejecutable(str(tmp_path / 'ejecutado'))))
+    assert cargar_entrada(str(tmp_path), clave) is None
+    assert not (tmp_path / 'ejecutado').exists()
+
+
+class _Ejecutable:
+    """Al deserializarse con pickle crea el archivo ruta"""
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def __reduce__(self):
+        return (open, (self.ruta, 'w'))
+
+
+def test_desalojo_por_tamaño(tmp_path):
+    directorio = str(tmp_path)
+    claves = [(f'hash{i}', 'SICOP', '2026-03-15') for i in range(4)]
+    entrada = nueva_entrada(_resultados(), 3, b'x' * 10_000)
+    tamaño = os.path.getsize(guardar_entrada(directorio, claves[0], entrada))
+    for i, clave in enumerate(claves[1:3], 1):
+        guardar_entrada(directorio, clave, entrada)
+        os.utime(ruta_entrada(directorio, clave), (i, i))
+    os.utime(ruta_entrada(directorio, claves[0]), (10, 10))
+
+    # Caben tres entradas: se descarta la usada hace más tiempo (claves[1])
+    guardar_entrada(directorio, claves[3], entrada, max_bytes=3 * tamaño + tamaño // 2)
+    presentes = [cargar_entrada(directorio, clave) is not None for clave in claves]
+    assert presentes == [True, False, True, True]
@@ -0,0 +1,65 @@
+"""
+Configuración por año: se comparte en el proceso, así que sus catálogos no
+se pueden modificar, y entre procesos viaja como el año del catálogo.
+"""
+
+import pickle
+
+import pandas as pd
+import pytest
+
+from config import get_config_by_year, CO_EJERCIDO_GENERAL, CO_EJERCIDO_RESTRINGIDO, SECCIONES_UR
+from sicop_processor import clasificar_co
+
+
+@pytest.mark.parametrize('año', [2025, 2026])
+def test_catalogos_de_solo_lectura(año):
+    config = get_config_by_year(año)
+    for nombre in ('denominaciones', 'programas_nombres', 'nombres_especiales', 'fusion_programas',
+                   'mapeo_ur', 'fusion_urs', 'mapeo_ur_texto'):
+        with pytest.raises(TypeError):
+            config[nombre]['nueva'] = 'valor'
+    with pytest.raises(ValueError):
+        config['mapeo_ur_denso'][0] = 1
+
+
+def test_solo_campos_como_claves():
+    config = get_config_by_year(2026)
+    assert config['urs_validas'] is config.urs_validas
+    for clave in ('no_existe', 'get', '__reduce__', '__class__'):
+        with pytest.raises(KeyError):
+            config[clave]
+        assert config.get(clave) is None
+    assert config.get('no_existe', {}) == {}
+
+
+@pytest.mark.parametrize('año', [2025, 2026])
+def test_tablas_por_ur(año):
+    config = get_config_by_year(año)
+    for codigo, seccion in enumerate(SECCIONES_UR):
+        assert [ur for ur in config['urs_validas'] if config['seccion_ur'][ur] == codigo] == list(config[seccion])
+    for ur in config['urs_validas']:
+        regla = CO_EJERCIDO_RESTRINGIDO if ur in config['urs_co_restringido'] else CO_EJERCIDO_GENERAL
+        assert config['co_ejercido_ur'][ur] == regla
+
+
+def test_pickle_usa_la_configuracion_compilada():
+    config = get_config_by_year(2026)
+    assert pickle.loads(pickle.dumps(config)) is config
+
+
+def test_clasificar_co_por_ur():
+    config = get_config_by_year(2026)
+    restringida = sorted(config['urs_co_restringido'])[0]
+    general = next(ur for ur in config['urs_validas'] if ur not in config['urs_co_restringido'])
+    codigos = [0, 10, 50, 51, 60]
+    urs = [restringida] * len(codigos) + [general] * len(codigos)
+    indice = pd.MultiIndex.from_arrays(
+        [pd.CategoricalIndex(urs), codigos * 2], names=['UR', 'CO']
+    )
+    es_co_ejercido, es_co0, es_co10 = clasificar_co(pd.DataFrame(index=indice), config)
+
+    esperado = [co in CO_EJERCIDO_RESTRINGIDO for co in codigos] + [co in CO_EJERCIDO_GENERAL for co in codigos]
+    assert list(es_co_ejercido) == esperado
+    assert list(es_co0) == [co == 0 for co in codigos] * 2
+    assert list(es_co10) == [co == 10 for co in codigos] * 2
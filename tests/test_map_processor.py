@@ -0,0 +1,180 @@
+"""
+Procesador de MAP con un archivo sintético: el cuadro es igual al calculado
+renglón por renglón con Decimal como el procesador original, por bloques y
+para todos los periodos da lo mismo que procesar_map, y el modo de memoria
+acotada no modifica el archivo ni emite avisos de pandas.
+"""
+
+import io
+import datetime
+import warnings
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+from config import MONTH_NAMES, get_config_by_year
+from esquemas import leer_csv
+from map_processor import (
+    procesar_map, procesar_map_por_bloques, procesar_map_todos_los_periodos, CATEGORIAS_CAPITULO,
+)
+
+PREFIJOS = ['ORI', 'AMP', 'RED', 'MOD', 'CONG', 'DESCONG', 'EJE']
+
+# (IDEN_PROY, PROYECTO): programas específicos de 2025 y 2026, B004 (fusionado
+# en B006 en 2026) y programas fuera del cuadro de subsidios
+PROGRAMAS = [('S', 263), ('S', 293), ('S', 304), ('S', 52), ('B', 4), ('B', 6), ('E', 1), ('M', 1)]
+PARTIDAS = ['11301', '21101', '33104', '39801', '43101', '51101', '71101', 'X']
+
+
+def _csv_map(n=400, semilla=20260319):
+    """CSV de MAP con montos de dos y tres decimales y partidas no numéricas"""
+    generador = np.random.default_rng(semilla)
+    programas = generador.integers(len(PROGRAMAS), size=n)
+    df = pd.DataFrame({
+        'UNIDAD': generador.choice(['100', '113', '215', 'B00', 'G00'], size=n),
+        'IDEN_PROY': [PROGRAMAS[i][0] for i in programas],
+        'PROYECTO': [PROGRAMAS[i][1] for i in programas],
+        'PARTIDA': generador.choice(PARTIDAS, size=n),
+    })
+    for prefijo in PREFIJOS:
+        for mes in MONTH_NAMES:
+            montos = generador.integers(-10**7, 10**7, size=n) / generador.choice([100, 1000], size=n)
+            df[f'{prefijo}_{mes}'] = np.where(generador.random(n) < 0.2, 0, montos)
+    return df.to_csv(index=False).encode('latin-1')
+
+
+def _leer(contenido, año):
+    return leer_csv(io.BytesIO(contenido), 'MAP', año)
+
+
+def test_memoria_acotada_no_modifica_ni_avisa():
+    df = _leer(_csv_map(), 2026)
+    original = df.copy()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        # Las columnas calculadas fragmentan el bloque igual que en el modo completo
+        warnings.simplefilter('ignore', pd.errors.PerformanceWarning)
+        resultados = procesar_map(df, '15-MAR-2026_MAP.csv', conservar_detalle=False)
+    pd.testing.assert_frame_equal(df, original)
+    assert resultados['df_procesado'] is None
+
+
+# ============================================================================
+# CUADRO CONTRA LA REFERENCIA RENGLÓN POR RENGLÓN
+# ============================================================================
+
+class _Fecha(datetime.date):
+    """date con today() fijo: enero y febrero de 2025 son cierre, los de 2026 no"""
+    @classmethod
+    def today(cls):
+        return cls(2026, 3, 17)
+
+
+@pytest.fixture(autouse=True)
+def hoy(monkeypatch):
+    monkeypatch.setattr(config, 'date', _Fecha)
+
+
+def _excel(valor):
+    return valor.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _referencia(df, año, mes):
+    """
+    Cuadro de MAP calculado renglón por renglón con Decimal, con las reglas
+    del procesador original: montos mensuales redondeados, sumas de enero al
+    mes redondeadas y pivots por filtros sobre los renglones
+    """
+    cfg = get_config_by_year(año)
+    especificos = cfg['programas_especificos']
+    mes_periodo = 12 if config.es_cierre_año_anterior(mes, año) else mes
+
+    renglones = []
+    for fila in df.to_dict('records'):
+        def suma(prefijo, hasta):
+            return _excel(sum(_excel(Decimal(repr(fila[f'{prefijo}_{m}']))) for m in MONTH_NAMES[:hasta]))
+        pp = f"{fila['IDEN_PROY']}{str(fila['PROYECTO']).zfill(3)}"
+        partida = int(fila['PARTIDA']) if str(fila['PARTIDA']).isdigit() else 0
+        congelado_anual = _excel(suma('CONG', 12) - suma('DESCONG', 12))
+        congelado_periodo = _excel(suma('CONG', mes_periodo) - suma('DESCONG', mes_periodo))
+        renglones.append({
+            'Pp': cfg['fusion_programas'].get(pp, pp),
+            'Capitulo': partida // 10000 * 1000,
+            'Original': suma('ORI', 12),
+            'ModificadoAnualNeto': _excel(suma('MOD', 12) - congelado_anual),
+            'ModificadoPeriodoNeto': _excel(suma('MOD', mes_periodo) - congelado_periodo),
+            'Ejercido': suma('EJE', 12),
+            'CongeladoAnual': congelado_anual,
+        })
+
+    def pivot(filtro):
+        return {
+            col: float(sum((r[col] for r in renglones if filtro(r)), Decimal(0)))
+            for col in ['Original', 'ModificadoAnualNeto', 'ModificadoPeriodoNeto', 'Ejercido']
+        }
+    categorias = {
+        categoria: pivot(lambda r, caps=capitulos: r['Capitulo'] in caps and r['Pp'] not in especificos)
+        for categoria, capitulos in CATEGORIAS_CAPITULO.items()
+    }
+    programas = {prog: pivot(lambda r, p=prog: r['Pp'] == p) for prog in especificos}
+    congelados = {
+        prog: float(sum((r['CongeladoAnual'] for r in renglones if r['Pp'] == prog), Decimal(0)))
+        for prog in ['S263', 'S293', 'S304']
+    }
+    return categorias, programas, congelados
+
+
+@pytest.mark.parametrize('año, mes, nombre', [
+    (2026, 3, '15-MAR-2026_MAP.csv'),
+    (2025, 10, '31-OCT-2025_MAP.csv'),
+    (2025, 1, '10-ENE-2025_MAP.csv'),
+    (2026, 1, '10-ENE-2026_MAP.csv'),
+])
+def test_cuadro_igual_a_referencia(año, mes, nombre):
+    contenido = _csv_map()
+    resultados = procesar_map(_leer(contenido, año), nombre)
+    categorias, programas, congelados = _referencia(_leer(contenido, año), año, mes)
+
+    assert resultados['metadata']['es_cierre'] == (mes == 1 and año == 2025)
+    for categoria, esperado in categorias.items():
+        assert resultados['categorias'][categoria] == esperado, categoria
+    assert resultados['programas'] == programas
+    assert resultados['congelados']['valores'] == congelados
+
+    subsidios = resultados['categorias']['subsidios']
+    for col, total in resultados['totales'].items():
+        assert subsidios[col] == sum(programas[p][col] for p in programas)
+        assert total == pytest.approx(sum(c[col] for c in resultados['categorias'].values()), abs=1e-6)
+
+
+# ============================================================================
+# BLOQUES Y TODOS LOS PERIODOS CONTRA procesar_map
+# ============================================================================
+
+def _cuadro(resultados):
+    """Partes de los resultados que no dependen de cómo se procesó el archivo"""
+    metadata = {clave: valor for clave, valor in resultados['metadata'].items() if clave != 'config'}
+    return {clave: resultados[clave] for clave in ('categorias', 'programas', 'congelados', 'totales')}, metadata
+
+
+@pytest.mark.parametrize('tamaño_bloque', [37, 10_000])
+def test_por_bloques_igual_a_procesar_map(tamaño_bloque):
+    contenido = _csv_map()
+    esperado = procesar_map(_leer(contenido, 2026), '15-MAR-2026_MAP.csv')
+    por_bloques = procesar_map_por_bloques(io.BytesIO(contenido), '15-MAR-2026_MAP.csv', tamaño_bloque=tamaño_bloque)
+    assert _cuadro(por_bloques) == _cuadro(esperado)
+    assert por_bloques['df_procesado'] is None
+
+
+@pytest.mark.parametrize('año', [2025, 2026])
+def test_todos_los_periodos_igual_a_doce_cortes(año):
+    contenido = _csv_map()
+    todos = procesar_map_todos_los_periodos(_leer(contenido, año), f'15-MAR-{año}_MAP.csv')
+    for mes, abreviatura in enumerate(['ENE', 'FEB', 'MAR', 'ABR', 'MAY', 'JUN',
+                                       'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC'], 1):
+        esperado = procesar_map(_leer(contenido, año), f'15-{abreviatura}-{año}_MAP.csv')
+        assert _cuadro(todos['periodos'][mes]) == _cuadro(esperado), mes
+    assert todos['periodos'][1]['metadata']['es_cierre'] == (año == 2025)
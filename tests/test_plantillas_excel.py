@@ -0,0 +1,209 @@
+"""
+Ida y vuelta del motor de plantillas: el libro rellenado se vuelve a leer
+con openpyxl y debe ser igual al que openpyxl escribe directamente, sin
+ninguna marca de campo sin llenar. Protege la dependencia del motor con la
+forma en que openpyxl serializa las celdas.
+"""
+
+import io
+import re
+import datetime
+from zipfile import ZipFile
+from xml.etree import ElementTree
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+
+from config import get_config_by_year
+from estilos_excel import estilo, fuente, registrar_estilos, FORMATO_MONEDA
+from plantillas_excel import PlantillaExcel, campo, agregar_hoja_detalle, bloques_de
+from excel_map import construir_plantilla_map
+from excel_sicop import construir_plantilla_sicop
+from excel_ur import construir_plantilla_ur
+
+PATRON_MARCA = re.compile(r'«[^«»]+»')
+
+VALORES = {
+    'entero': 1234,
+    'monto': -98765.4321,
+    'pequeño': 1e-7,
+    'texto': 'Año & <UR> "100" \'S263\'',
+    'espacios': '  con espacios  ',
+    'no_bmp': 'Maíz 🌽 𝔸',
+    'saltos': 'Primera línea\nSegunda línea',
+    'formula': '=SUM(A1:A2)',
+    'enriquecido': CellRichText(TextBlock(InlineFont(b=True), 'Fuente:'), ' con corte'),
+    'vacio': None,
+}
+
+
+def _libro(valor_de):
+    """Libro de prueba con un estilo con nombre; valor_de da el valor de cada celda"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Prueba'
+    registrar_estilos(wb, {'Prueba monto': estilo(fuente(12, negrita=True), formato=FORMATO_MONEDA)})
+    ws['A1'] = 'Encabezado fijo'
+    for fila, nombre in enumerate(VALORES, 2):
+        ws.cell(row=fila, column=1, value=nombre)
+        celda = ws.cell(row=fila, column=2, value=valor_de(nombre))
+        celda.style = 'Prueba monto'
+    ws.merge_cells('C2:D2')
+    return wb
+
+
+def _celdas(contenido):
+    """(hoja, coordenada, valor, estilo, formato) de todas las celdas con valor o estilo"""
+    wb = openpyxl.load_workbook(io.BytesIO(contenido), rich_text=True)
+    celdas = []
+    for ws in wb:
+        for renglon in ws.iter_rows():
+            for celda in renglon:
+                if celda.value is not None or celda.has_style:
+                    celdas.append((ws.title, celda.coordinate, str(celda.value), celda.style, celda.number_format))
+    return celdas
+
+
+def _marcas(contenido):
+    return [celda for celda in _celdas(contenido) if PATRON_MARCA.search(celda[2])]
+
+
+def test_igual_a_openpyxl_directo():
+    plantilla = PlantillaExcel(_libro(campo))
+    assert plantilla.campos == set(VALORES)
+
+    rellenado = plantilla.rellenar(VALORES)
+
+    directo = io.BytesIO()
+    _libro(VALORES.get).save(directo)
+    assert _celdas(rellenado) == _celdas(directo.getvalue())
+    assert not _marcas(rellenado)
+
+
+def test_propiedades_con_fecha_actual():
+    antes = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None, microsecond=0)
+    contenido = PlantillaExcel(_libro(campo)).rellenar(VALORES)
+    assert openpyxl.load_workbook(io.BytesIO(contenido)).properties.modified >= antes
+
+
+def test_marca_no_reconocida_falla_al_construir():
+    wb = _libro(campo)
+    # Una marca dentro de un texto no es un campo: no se puede llenar
+    wb.active['E1'] = f"Texto con {campo('incrustado')}"
+    with pytest.raises(RuntimeError, match='incrustado'):
+        PlantillaExcel(wb)
+
+
+def test_falta_un_valor():
+    plantilla = PlantillaExcel(_libro(campo))
+    valores = dict(VALORES)
+    del valores['monto']
+    with pytest.raises(KeyError):
+        plantilla.rellenar(valores)
+
+
+def _plantillas_reales():
+    for año in (2025, 2026):
+        config = get_config_by_year(año)
+        yield f'MAP {año}', construir_plantilla_map(config)
+        yield f'SICOP {año}', construir_plantilla_sicop(config, frozenset(config['urs_validas']))
+    yield 'UR 5', construir_plantilla_ur(5)
+    yield 'UR 20', construir_plantilla_ur(20)
+
+
+@pytest.mark.parametrize('nombre,wb', list(_plantillas_reales()), ids=lambda valor: valor if isinstance(valor, str) else '')
+def test_plantillas_de_los_reportes(nombre, wb):
+    marcas = {
+        celda.value for ws in wb for renglon in ws.iter_rows() for celda in renglon
+        if isinstance(celda.value, str) and PATRON_MARCA.fullmatch(celda.value)
+    }
+    plantilla = PlantillaExcel(wb)
+    assert {campo(nombre_campo) for nombre_campo in plantilla.campos} == marcas
+
+    # Cada campo recibe un valor distinto para detectar campos cruzados
+    valores = {nombre_campo: float(i) + 0.25 for i, nombre_campo in enumerate(sorted(plantilla.campos))}
+    contenido = plantilla.rellenar(valores)
+    assert not _marcas(contenido)
+
+    leido = openpyxl.load_workbook(io.BytesIO(contenido)).active
+    for ws_plantilla in [wb.active]:
+        for renglon in ws_plantilla.iter_rows():
+            for celda in renglon:
+                if isinstance(celda.value, str) and PATRON_MARCA.fullmatch(celda.value):
+                    assert leido[celda.coordinate].value == valores[celda.value[1:-1]]
+                    assert leido[celda.coordinate].style == celda.style
+
+
+# ============================================================================
+# HOJA DE DETALLE (RENGLONES POR BLOQUES)
+# ============================================================================
+
+TEXTOS_DIFICILES = [
+    'Proyecto & <UR> "100" \'S263\'', ' espacio al inicio', 'espacio al final ',
+    'control\x01\x0b\x1f fin', 'Maíz 🌽 𝔸 ñ', 'no carácter \ufffe\uffff',
+    'salto\nde línea', None, '', 'último',
+]
+
+
+def _detalle():
+    n = len(TEXTOS_DIFICILES)
+    return pd.DataFrame({
+        'PROYECTO': pd.Series(TEXTOS_DIFICILES, dtype='str'),
+        # Las cadenas de Arrow no admiten sustitutos sueltos: solo en object
+        'IDEN_PROY': pd.Series(['sustituto \ud800 suelto'] + TEXTOS_DIFICILES[1:], dtype=object),
+        'UNIDAD': pd.Categorical(list(reversed(TEXTOS_DIFICILES))),
+        'PARTIDA': np.arange(n, dtype=np.int64) * 11111,
+        'CONTROL': pd.Categorical([10, None] * (n // 2)),
+        'Original': [1.5, np.nan, -0.0, 1e-7, 123456789.125, np.inf, -2.675, 0.1, 1e20, 3.0],
+        'Activo': [True, False] * (n // 2),
+    })
+
+
+def _esperado(valor):
+    """Valor que debe leerse de una celda del detalle"""
+    if isinstance(valor, (bool, np.bool_)):
+        return int(valor)
+    if valor is None or (isinstance(valor, float) and not np.isfinite(valor)):
+        return None
+    if isinstance(valor, str):
+        limpio = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]', '', valor)
+        return limpio or None
+    return valor
+
+
+@pytest.mark.parametrize('tamaño', [3, 100])
+def test_detalle_con_textos_dificiles(tamaño):
+    df = _detalle()
+    wb = Workbook()
+    agregar_hoja_detalle(wb, 'Detalle', list(df.columns))
+    contenido = PlantillaExcel(wb).rellenar({'detalle': bloques_de(df, df.columns, tamaño)})
+
+    # Todas las partes son XML válido y el libro abre completo en openpyxl
+    with ZipFile(io.BytesIO(contenido)) as archivo:
+        for nombre in archivo.namelist():
+            if nombre.endswith(('.xml', '.rels')):
+                ElementTree.fromstring(archivo.read(nombre))
+    ws = openpyxl.load_workbook(io.BytesIO(contenido))['Detalle']
+    assert ws.freeze_panes == 'A2'
+
+    filas = list(ws.iter_rows(values_only=True))
+    assert list(filas[0]) == list(df.columns)
+    assert len(filas) == len(df) + 1
+    esperado = [
+        tuple(_esperado(valor) for valor in renglon)
+        for renglon in df.astype(object).where(df.notna(), None).itertuples(index=False)
+    ]
+    assert [tuple(renglon) for renglon in filas[1:]] == esperado
+
+
+def test_detalle_vacio():
+    wb = Workbook()
+    agregar_hoja_detalle(wb, 'Detalle', ['A', 'B'])
+    contenido = PlantillaExcel(wb).rellenar({'detalle': bloques_de(pd.DataFrame({'A': [], 'B': []}), ['A', 'B'])})
+    filas = list(openpyxl.load_workbook(io.BytesIO(contenido))['Detalle'].iter_rows(values_only=True))
+    assert filas == [('A', 'B')]
@@ -0,0 +1,84 @@
+"""
+Prueba diferencial de round_array_like_excel contra config.round_like_excel
+(Decimal, ROUND_HALF_UP) valor por valor, y escala de las sumas exactas.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import round_like_excel
+from redondeo import round_array_like_excel, escala_exacta, a_enteros
+
+PUNTOS_MEDIOS = [0.125, 2.675, 1.005, 0.005, 0.015, 0.045, 1.115, 8.345, 1234.565, 99999.995]
+CASOS_LIMITE = (
+    PUNTOS_MEDIOS
+    + [-valor for valor in PUNTOS_MEDIOS]
+    + [0.0, -0.0, 1e12 + 0.005, -(1e12 + 0.005), 1e12 + 0.015, 123456789.125, 1e15, np.nan]
+)
+
+
+def _esperado(valores, decimales):
+    return np.array([round_like_excel(valor, decimales) for valor in valores], dtype=np.float64)
+
+
+def _muestra_aleatoria():
+    generador = np.random.default_rng(20260317)
+    montos = generador.uniform(-1e9, 1e9, 5000)
+    # Valores con exactamente tres decimales: muchos caen en puntos medios
+    milesimos = generador.integers(-10**9, 10**9, 5000) / 1000
+    return np.concatenate([montos, milesimos])
+
+
+@pytest.mark.parametrize('decimales', [0, 1, 2])
+@pytest.mark.parametrize('como_serie', [False, True])
+@pytest.mark.parametrize('valores', [CASOS_LIMITE, _muestra_aleatoria()], ids=['limite', 'aleatorios'])
+def test_coincide_con_decimal(valores, decimales, como_serie):
+    valores = np.asarray(valores, dtype=np.float64)
+    entrada = pd.Series(valores, index=np.arange(len(valores)) * 3) if como_serie else valores
+
+    resultado = round_array_like_excel(entrada, decimales)
+
+    if como_serie:
+        assert isinstance(resultado, pd.Series)
+        assert resultado.index.equals(entrada.index)
+        resultado = resultado.to_numpy()
+    else:
+        assert isinstance(resultado, np.ndarray)
+    esperado = _esperado(valores, decimales)
+    distintos = np.flatnonzero(resultado != esperado)
+    assert distintos.size == 0, [(valores[i], resultado[i], esperado[i]) for i in distintos[:10]]
+
+
+def test_nan_se_convierte_en_cero():
+    resultado = round_array_like_excel(np.array([np.nan, 1.005]))
+    assert resultado.tolist() == [0.0, 1.01]
+    assert round_like_excel(np.nan) == 0
+
+
+def test_signo_de_cero():
+    resultado = round_array_like_excel(np.array([-0.0, -0.004]))
+    esperado = _esperado([-0.0, -0.004], 2)
+    assert np.array_equal(np.signbit(resultado), np.signbit(esperado))
+
+
+@pytest.mark.parametrize('columnas, escala', [
+    ([[1.0, -3.0, np.nan]], 1.0),
+    ([[0.1, 2.5], [1.005]], 1000.0),
+    ([[0.1 + 0.2]], None),
+    ([[1e12, 1e12]], 1.0),
+    ([[1e12 + 0.005]], 1000.0),
+    ([[1e13 + 0.005]], None),
+    ([[np.inf]], None),
+    ([[]], 1.0),
+])
+def test_escala_exacta(columnas, escala):
+    assert escala_exacta([np.array(valores, dtype=np.float64) for valores in columnas]) == escala
+
+
+def test_suma_en_enteros_exacta():
+    # En float la suma depende del orden; en enteros es la suma decimal
+    valores = pd.Series([0.1, 0.2, 375558.085, 0.01])
+    escala = escala_exacta([valores])
+    assert a_enteros(valores, escala).sum() / escala == 375558.395
+    assert round_array_like_excel(np.array([375558.395]))[0] == 375558.4
@@ -0,0 +1,142 @@
+"""
+Servicio HTTP: nombre de descarga seguro en Content-Disposition, un solo
+Excel por entrada aunque lleguen varias solicitudes a la vez y un servidor
+local que atiende archivos cargados y rutas dentro de la carpeta raíz.
+"""
+
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import unquote, urlencode
+from urllib.request import Request, urlopen
+
+import pytest
+
+import cache_resultados
+import procesamiento_lote
+import servicio_http
+from cache_columnar import AlmacenSnapshots
+from cache_resultados import CacheResultados
+from servicio_http import ServicioReportes, crear_servidor, _disposicion_descarga, TIPO_XLSX
+
+CSV_SICOP = (
+    'ID_UNIDAD,CAPITULO,CONCEPTO,PARTIDA_GENERICA,PARTIDA_ESPECIFICA,CONTROL_OPERATIVO,'
+    'PROGRAMA_PRESUPUESTARIO,ORIGINAL,MODIFICADO_AUTORIZADO,RESERVAS\n'
+    '100,2,1,1,1,0,M001,10.5,20.25,0\n'
+    'B00,3,3,9,1,50,S263,1.125,-3,4\n'
+    '100,4,3,8,1,51,M001,0,7,0\n'
+).encode('latin-1')
+
+
+@pytest.mark.parametrize('nombre', [
+    '15-MAR-2026_SICOP.xlsx',
+    'Año de "cierre".xlsx',
+    'corte\r\nSet-Cookie: x=1.xlsx',
+    'Maíz 🌽;\\.xlsx',
+    '../../etc/passwd.xlsx',
+])
+def test_disposicion_descarga(nombre):
+    valor = _disposicion_descarga(nombre)
+    assert valor.isascii()
+    assert '\r' not in valor and '\n' not in valor
+
+    simple = valor.split('"')[1]
+    assert simple and not set(simple) & set('"\\/;') and not simple.startswith('.')
+    assert simple.endswith('.xlsx')
+    # filename*= conserva el nombre completo (RFC 5987)
+    assert unquote(valor.split("; filename*=UTF-8''")[1]) == nombre
+
+
+def test_excel_una_sola_vez(monkeypatch):
+    llamadas = []
+
+    def generar_excel(resultados, sistema):
+        llamadas.append(sistema)
+        time.sleep(0.2)
+        return b'xlsx'
+
+    monkeypatch.setattr(servicio_http, 'generar_excel', generar_excel)
+    servicio = ServicioReportes(procesos=1)
+    servicio.pool.shutdown()
+    servicio.pool = ThreadPoolExecutor(max_workers=4)
+
+    entrada = {'resultados': {}, 'registros': 0, 'excel': None}
+    clave = ('hash', 'SICOP', '2026-03-15')
+    obtenidos = []
+    hilos = [
+        threading.Thread(target=lambda: obtenidos.append(servicio.obtener_excel(clave, entrada, 'SICOP')))
+        for _ in range(8)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    servicio.cerrar()
+
+    assert obtenidos == [b'xlsx'] * 8
+    assert llamadas == ['SICOP']
+    assert entrada['excel'] == b'xlsx'
+    assert not servicio._en_curso
+
+
+# ============================================================================
+# SERVIDOR LOCAL
+# ============================================================================
+
+@pytest.fixture
+def servidor(tmp_path, monkeypatch):
+    """Servidor en un puerto libre con caché y copias columnares propios"""
+    cache = CacheResultados()
+    monkeypatch.setattr(cache_resultados, 'CACHE', cache)
+    monkeypatch.setattr(servicio_http, 'CACHE', cache)
+    monkeypatch.setattr(procesamiento_lote, 'SNAPSHOTS', AlmacenSnapshots(directorio=str(tmp_path / 'snapshots')))
+
+    (tmp_path / 'raiz').mkdir()
+    servidor = crear_servidor(host='127.0.0.1', puerto=0, procesos=1, raiz=str(tmp_path / 'raiz'))
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+    servidor.servicio.cerrar()
+    hilo.join()
+
+
+def _solicitar(servidor, parametros, contenido=None):
+    """Estado, tipo y cuerpo de una solicitud a /reporte"""
+    url = f'http://127.0.0.1:{servidor.server_address[1]}/reporte?{urlencode(parametros)}'
+    try:
+        with urlopen(Request(url, data=contenido), timeout=60) as respuesta:
+            return respuesta.status, respuesta.headers['Content-Type'], respuesta.read()
+    except HTTPError as e:
+        return e.code, e.headers['Content-Type'], e.read()
+
+
+def test_servidor_local(servidor, tmp_path):
+    estado, tipo, cuerpo = _solicitar(servidor, {'nombre': '15-MAR-2026_SICOP.csv'}, CSV_SICOP)
+    assert estado == 200 and tipo.startswith('application/json')
+    cargado = json.loads(cuerpo)
+    assert cargado['metadata']['registros_archivo'] == 3
+    assert {'resumen', 'totales'} <= set(cargado)
+
+    estado, tipo, cuerpo = _solicitar(servidor, {'nombre': '15-MAR-2026_SICOP.csv', 'formato': 'xlsx'}, CSV_SICOP)
+    assert estado == 200 and tipo == TIPO_XLSX
+    assert cuerpo.startswith(b'PK')
+
+    # Por ruta dentro de la raíz da lo mismo que el archivo cargado
+    ruta = tmp_path / 'raiz' / '15-MAR-2026_SICOP.csv'
+    ruta.write_bytes(CSV_SICOP)
+    estado, _, cuerpo = _solicitar(servidor, {'ruta': str(ruta)})
+    assert estado == 200
+    assert json.loads(cuerpo) == cargado
+
+    # Fuera de la raíz (directamente o con ..) no se lee
+    fuera = tmp_path / 'fuera' / '15-MAR-2026_SICOP.csv'
+    fuera.parent.mkdir()
+    fuera.write_bytes(CSV_SICOP)
+    for ruta_fuera in (str(fuera), str(tmp_path / 'raiz' / '..' / 'fuera' / fuera.name)):
+        estado, _, cuerpo = _solicitar(servidor, {'ruta': ruta_fuera})
+        assert estado == 403
+        assert json.loads(cuerpo) == {'error': 'Ruta no permitida o inexistente'}
@@ -0,0 +1,212 @@
+"""
+Resumen por UR de SICOP: porcentajes de avance vectorizados, iguales a la
+división renglón por renglón (0 cuando el modificado es 0), sumas por UR y
+capítulo iguales a la suma decimal exacta con montos de tres decimales,
+todos los periodos iguales a doce cortes separados, y claves de
+CONTROL_OPERATIVO o de partida que no caben en int8.
+"""
+
+import io
+import datetime
+import warnings
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+from config import get_config_by_year
+from esquemas import leer_csv
+from sicop_processor import calcular_resumen_y_subtotales, procesar_sicop, procesar_sicop_todos_los_periodos
+
+
+def _resumen(config, n_ceros=3):
+    urs = list(config['urs_validas'])
+    generador = np.random.default_rng(20260317)
+    montos = np.round(generador.normal(0, 1e6, size=(len(urs), 4)), 2)
+    resumen = pd.DataFrame(montos, columns=['Original', 'Modificado_anual', 'Modificado_periodo', 'Ejercido_acumulado'])
+    resumen.insert(0, 'UR', pd.Series(urs, dtype='str'))
+    # Modificados en cero (con y sin ejercido) y un cero negativo
+    resumen.loc[:n_ceros - 1, ['Modificado_anual', 'Modificado_periodo']] = 0.0
+    resumen.loc[0, 'Ejercido_acumulado'] = 0.0
+    resumen.loc[n_ceros, 'Modificado_periodo'] = -0.0
+    return resumen
+
+
+def _avance(ejercido, modificado):
+    return ejercido / modificado if modificado != 0 else 0
+
+
+def test_porcentajes_de_avance():
+    config = get_config_by_year(2026)
+    resumen = _resumen(config)
+    calcular_resumen_y_subtotales(resumen, config)
+
+    for columna, modificado in (('Pct_avance_anual', 'Modificado_anual'), ('Pct_avance_periodo', 'Modificado_periodo')):
+        esperado = [_avance(fila['Ejercido_acumulado'], fila[modificado]) for _, fila in resumen.iterrows()]
+        assert resumen[columna].dtype == np.float64
+        assert resumen[columna].tolist() == esperado
+    assert (resumen.loc[:3, 'Pct_avance_periodo'] == 0).all()
+
+
+
+# ============================================================================
+# SUMAS EXACTAS POR UR Y CAPÍTULO
+# ============================================================================
+
+COLUMNAS_MONTOS = ['ORIGINAL', 'MODIFICADO_AUTORIZADO', 'RESERVAS', 'EJERCIDO', 'DEVENGADO',
+                   'EJERCIDO_TRAMITE', 'MOEN', 'MOFE', 'MOMR', 'RESERVA_ENE', 'RESERVA_FEB', 'RESERVA_MZO']
+
+
+def _renglones_tres_decimales(urs, n=4000):
+    """Renglones con montos de tres decimales, la mitad terminados en 5 (puntos medios)"""
+    generador = np.random.default_rng(20260318)
+    milesimos = generador.integers(-10**11, 10**11, size=(n, len(COLUMNAS_MONTOS))) // 10 * 10
+    milesimos += generador.choice([0, 5], size=milesimos.shape)
+    renglones = []
+    for i, fila in enumerate(milesimos):
+        montos = [f'{m // 1000}.{m % 1000:03d}' if m >= 0 else f'-{-m // 1000}.{-m % 1000:03d}' for m in fila]
+        renglones.append({
+            'ID_UNIDAD': urs[i % len(urs)], 'CAPITULO': 2 + i % 3, 'CONCEPTO': 1 + i % 7,
+            'PARTIDA_GENERICA': i % 10, 'PARTIDA_ESPECIFICA': 1, 'CONTROL_OPERATIVO': [0, 10, 50, 51][i % 4],
+            'PROGRAMA_PRESUPUESTARIO': 'M001', **dict(zip(COLUMNAS_MONTOS, montos)),
+        })
+    return renglones
+
+
+def _redondear(valor):
+    return float(valor.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+
+
+def _referencia_por_ur(renglones, config):
+    """Resumen y capítulos renglón por renglón con Decimal, como el cálculo por UR original"""
+    resumen, capitulos = {}, {}
+    for ur in {r['ID_UNIDAD'] for r in renglones}:
+        del_ur = [r for r in renglones if r['ID_UNIDAD'] == ur]
+        cos = [0, 50] if ur in config['urs_co_restringido'] else [0, 50, 51]
+        ejercicio = [r for r in del_ur if r['CONTROL_OPERATIVO'] in cos]
+
+        def suma(filas, *columnas):
+            return sum((Decimal(r[col]) for r in filas for col in columnas), Decimal(0))
+        resumen[ur] = [_redondear(valor) for valor in (
+            suma([r for r in del_ur if r['CONTROL_OPERATIVO'] == 0], 'ORIGINAL'),
+            suma(ejercicio, 'MODIFICADO_AUTORIZADO') - suma(ejercicio, 'RESERVAS'),
+            suma(ejercicio, 'MOEN', 'MOFE', 'MOMR') - suma(ejercicio, 'RESERVA_ENE', 'RESERVA_FEB', 'RESERVA_MZO'),
+            suma(ejercicio, 'EJERCIDO', 'DEVENGADO', 'EJERCIDO_TRAMITE'),
+        )]
+        for cap in (2, 3, 4):
+            co10 = [r for r in del_ur if r['CONTROL_OPERATIVO'] == 10 and r['CAPITULO'] == cap]
+            eje = [r for r in ejercicio if r['CAPITULO'] == cap]
+            capitulos[ur, str(cap)] = [_redondear(valor) for valor in (
+                suma(co10, 'ORIGINAL'),
+                suma(co10, 'MODIFICADO_AUTORIZADO'),
+                suma(co10, 'MOEN', 'MOFE', 'MOMR') - suma(co10, 'RESERVA_ENE', 'RESERVA_FEB', 'RESERVA_MZO'),
+                suma(eje, 'EJERCIDO', 'DEVENGADO', 'EJERCIDO_TRAMITE'),
+            )]
+    return resumen, capitulos
+
+
+def test_sumas_exactas_con_tres_decimales():
+    config = get_config_by_year(2026)
+    renglones = _renglones_tres_decimales(list(config['urs_validas'])[:40] + ['RJL'])
+    csv = pd.DataFrame(renglones).to_csv(index=False).encode('latin-1')
+    resultados = procesar_sicop(leer_csv(io.BytesIO(csv), 'SICOP', 2026), '15-MAR-2026_SICOP.csv')
+    resumen, capitulos = _referencia_por_ur(renglones, config)
+
+    columnas = ['Original', 'Modificado_anual', 'Modificado_periodo', 'Ejercido_acumulado']
+    obtenido = resultados['resumen'].set_index('UR').loc[list(resumen), columnas]
+    assert obtenido.to_numpy().tolist() == list(resumen.values())
+    for (ur, cap), esperado in capitulos.items():
+        celda = resultados['capitulos_por_ur'][ur][cap]
+        assert [celda[col] for col in columnas] == esperado, (ur, cap)
+
+
+def test_memoria_acotada_no_modifica_ni_avisa():
+    config = get_config_by_year(2026)
+    csv = pd.DataFrame(_renglones_tres_decimales(list(config['urs_validas'])[:10], n=200)).to_csv(index=False)
+    df = leer_csv(io.BytesIO(csv.encode('latin-1')), 'SICOP', 2026)
+    original = df.copy()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        procesar_sicop(df, '15-MAR-2026_SICOP.csv', conservar_detalle=False)
+    pd.testing.assert_frame_equal(df, original)
+
+
+# ============================================================================
+# TODOS LOS PERIODOS CONTRA DOCE CORTES
+# ============================================================================
+
+class _Fecha(datetime.date):
+    """date con today() fijo: enero y febrero de 2025 son cierre, los de 2026 no"""
+    @classmethod
+    def today(cls):
+        return cls(2026, 3, 17)
+
+
+@pytest.mark.parametrize('año', [2025, 2026])
+def test_todos_los_periodos_igual_a_doce_cortes(año, monkeypatch):
+    monkeypatch.setattr(config, 'date', _Fecha)
+    urs = list(get_config_by_year(año)['urs_validas'])[:12]
+    renglones = _renglones_tres_decimales(urs, n=500)
+    for renglon, co in zip(renglones, [0, 10, 40, 50, 51, 60, 1.5, 300] * len(renglones)):
+        renglon['CONTROL_OPERATIVO'] = co
+    csv = pd.DataFrame(renglones).to_csv(index=False).encode('latin-1')
+
+    def leer():
+        return leer_csv(io.BytesIO(csv), 'SICOP', año)
+    todos = procesar_sicop_todos_los_periodos(leer(), f'15-MAR-{año}_SICOP.csv')
+    for mes, abreviatura in enumerate(['ENE', 'FEB', 'MAR', 'ABR', 'MAY', 'JUN',
+                                       'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC'], 1):
+        esperado = procesar_sicop(leer(), f'15-{abreviatura}-{año}_SICOP.csv')
+        periodo = todos['periodos'][mes]
+        pd.testing.assert_frame_equal(periodo['resumen'], esperado['resumen'])
+        for clave in ('subtotales', 'congelados', 'totales', 'capitulos_por_ur', 'partidas_por_ur', 'metadata'):
+            assert periodo[clave] == esperado[clave], (mes, clave)
+    assert todos['periodos'][1]['metadata']['es_cierre'] == (año == 2025)
+    assert todos['periodos'][1]['resumen']['Modificado_periodo'].equals(
+        todos['periodos'][1]['resumen']['Modificado_anual']) == (año == 2025)
+
+
+# ============================================================================
+# CLAVES FUERA DE RANGO
+# ============================================================================
+
+ENCABEZADO_SICOP = (
+    'ID_UNIDAD,CAPITULO,CONCEPTO,PARTIDA_GENERICA,PARTIDA_ESPECIFICA,CONTROL_OPERATIVO,'
+    'PROGRAMA_PRESUPUESTARIO,ORIGINAL,MODIFICADO_AUTORIZADO,RESERVAS,EJERCIDO\n'
+)
+RENGLONES_SICOP = (
+    '100,2,1,1,1,0,M001,10.5,20.25,0,3\n'
+    '100,3,3,9,1,50,S263,1.125,-3,4,2.5\n'
+    '100,4,3,8,1,51,M001,0,7,0,1\n'
+)
+
+
+def _procesar(renglones):
+    csv = io.BytesIO((ENCABEZADO_SICOP + renglones).encode('latin-1'))
+    return procesar_sicop(leer_csv(csv, 'SICOP', 2026), '15-MAR-2026_SICOP.csv')
+
+
+def test_control_operativo_fuera_de_int8():
+    # Claves que al pasar a int8 se confundirían con 50, 0, -126 y 1
+    fuera = ''.join(f'100,2,1,1,1,{co},M001,1000,2000,0,500\n' for co in (306, 256, 130, 1.5, -129))
+    esperado = _procesar(RENGLONES_SICOP)
+    obtenido = _procesar(RENGLONES_SICOP + fuera)
+
+    assert obtenido['totales'] == esperado['totales']
+    pd.testing.assert_frame_equal(obtenido['resumen'], esperado['resumen'])
+    assert obtenido['metadata']['registros'] == esperado['metadata']['registros']
+
+
+@pytest.mark.parametrize('columna, valor', [('CAPITULO', '300'), ('CONCEPTO', '-1'), ('PARTIDA_GENERICA', '10')])
+def test_componente_de_partida_fuera_de_rango(columna, valor):
+    renglon = dict(zip(ENCABEZADO_SICOP.strip().split(','), '100,2,1,1,1,0,M001,1,1,0,0'.split(',')))
+    renglon[columna] = valor
+    with pytest.raises(ValueError, match=columna):
+        _procesar(RENGLONES_SICOP + ','.join(renglon.values()) + '\n')
+
+
+def test_componente_de_partida_no_entero():
+    with pytest.raises(ValueError, match='tipo de su columna'):
+        _procesar(RENGLONES_SICOP + '100,2.5,1,1,1,0,M001,1,1,0,0\n')
@@ -0,0 +1,198 @@
+# ============================================================================
+# VIGILANTE DE CARPETA (PROCESA LOS ARCHIVOS CONFORME LLEGAN)
+# ============================================================================
+"""
+Servicio que revisa periódicamente una carpeta compartida y procesa cada
+CSV nuevo o modificado de MAP o SICOP en un pool acotado de procesos.
+
+Por cada archivo escribe junto a él:
+    - el Excel del reporte (nombrado con la fecha del archivo)
+    - los resultados calculados en la subcarpeta .resultados, por hash de
+      contenido, para que la aplicación los cargue sin volver a procesar
+      (definir SADER_RESULTADOS con esa ruta al ejecutar la aplicación).
+      Se guardan como datos (JSON y tablas Arrow, ver cache_resultados) y
+      la subcarpeta se limita a MAX_BYTES_DISCO
+Además deja la copia columnar del archivo en cache_columnar.
+
+Uso:
+    python vigilante_carpeta.py CARPETA [-j PROCESOS] [-i SEGUNDOS]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from config import nombre_archivo_excel
+from cache_resultados import clave_archivo, guardar_entrada, nueva_entrada
+from procesamiento_lote import detectar_sistema, procesar_bytes, generar_excel
+
+# Subcarpeta con los resultados precalculados y el registro de huellas
+SUBCARPETA_RESULTADOS = '.resultados'
+ARCHIVO_REGISTRO = 'procesados.json'
+
+INTERVALO_SEGUNDOS = 10
+MAX_PROCESOS = 2
+
+
+def huella_archivo(ruta):
+    """Tamaño y fecha de modificación: identifican la versión de un archivo sin leerlo"""
+    info = os.stat(ruta)
+    return [info.st_size, info.st_mtime_ns]
+
+
+def procesar_archivo_vigilado(ruta, directorio_resultados):
+    """
+    Procesa un CSV de la carpeta: escribe su Excel junto a él y guarda la
+    entrada de resultados (con el Excel) bajo la clave que usa la aplicación.
+
+    Returns:
+        dict con 'archivo', 'sistema', 'salida' y 'registros'
+    """
+    sistema = detectar_sistema(ruta)
+    if sistema is None:
+        raise ValueError("No se reconoce si el archivo es de MAP o de SICOP")
+
+    filename = os.path.basename(ruta)
+    with open(ruta, 'rb') as f:
+        contenido = f.read()
+
+    resultados, registros = procesar_bytes(contenido, filename, sistema)
+    excel = generar_excel(resultados, sistema)
+
+    metadata = resultados['metadata']
+    salida = os.path.join(
+        os.path.dirname(os.path.abspath(ruta)),
+        nombre_archivo_excel(sistema, metadata['config'], metadata['fecha_archivo'])
+    )
+    with open(salida, 'wb') as f:
+        f.write(excel)
+
+    guardar_entrada(
+        directorio_resultados, clave_archivo(contenido, sistema, filename),
+        nueva_entrada(resultados, registros, excel)
+    )
+    return {'archivo': ruta, 'sistema': sistema, 'salida': salida, 'registros': registros}
+
+
+class VigilanteCarpeta:
+    """
+    Revisa la carpeta cada intervalo. Un archivo se procesa cuando su huella
+    es nueva y no cambió desde la revisión anterior (ya terminó de copiarse).
+    Las huellas procesadas se guardan en disco para no repetir trabajo al
+    reiniciar el servicio.
+    """
+
+    def __init__(self, carpeta, procesos=MAX_PROCESOS, intervalo=INTERVALO_SEGUNDOS):
+        self.carpeta = carpeta
+        self.procesos = procesos
+        self.intervalo = intervalo
+        self.directorio_resultados = os.path.join(carpeta, SUBCARPETA_RESULTADOS)
+        self.ruta_registro = os.path.join(self.directorio_resultados, ARCHIVO_REGISTRO)
+        self.procesados = self._cargar_registro()
+        self._vistos = {}
+        self._pendientes = {}
+
+    def _cargar_registro(self):
+        if not os.path.exists(self.ruta_registro):
+            return {}
+        with open(self.ruta_registro, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _guardar_registro(self):
+        os.makedirs(self.directorio_resultados, exist_ok=True)
+        temporal = f'{self.ruta_registro}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(self.procesados, f, indent=1)
+        os.replace(temporal, self.ruta_registro)
+
+    def _ya_procesado(self, nombre, huella):
+        """La versión del archivo ya se procesó (con éxito o con error)"""
+        registro = self.procesados.get(nombre)
+        return registro == huella or registro == ['error'] + huella
+
+    def archivos_listos(self):
+        """
+        CSV nuevos o modificados cuya huella no cambió desde la revisión
+        anterior, como tuplas (ruta, huella)
+        """
+        en_proceso = {ruta for ruta, _ in self._pendientes.values()}
+        listos = []
+        vistos = {}
+        for nombre in sorted(os.listdir(self.carpeta)):
+            if not nombre.lower().endswith('.csv'):
+                continue
+            ruta = os.path.join(self.carpeta, nombre)
+            try:
+                huella = huella_archivo(ruta)
+            except OSError:
+                continue
+            vistos[nombre] = huella
+            if self._ya_procesado(nombre, huella) or ruta in en_proceso:
+                continue
+            if self._vistos.get(nombre) == huella:
+                listos.append((ruta, huella))
+        self._vistos = vistos
+        return listos
+
+    def ejecutar(self, una_vez=False):
+        """Ciclo principal; con una_vez=True termina cuando no queda trabajo"""
+        with ProcessPoolExecutor(max_workers=self.procesos) as pool:
+            while True:
+                for ruta, huella in self.archivos_listos():
+                    # El pool es acotado: se espera si ya está lleno
+                    while len(self._pendientes) >= self.procesos:
+                        self._recoger(wait(self._pendientes, return_when=FIRST_COMPLETED).done)
+                    futuro = pool.submit(procesar_archivo_vigilado, ruta, self.directorio_resultados)
+                    self._pendientes[futuro] = (ruta, huella)
+
+                self._recoger([futuro for futuro in self._pendientes if futuro.done()])
+
+                sin_trabajo = not self._pendientes and all(
+                    self._ya_procesado(nombre, huella) for nombre, huella in self._vistos.items()
+                )
+                if una_vez and sin_trabajo:
+                    return
+                time.sleep(self.intervalo)
+
+    def _recoger(self, futuros):
+        """Registra los archivos terminados"""
+        for futuro in list(futuros):
+            ruta, huella = self._pendientes.pop(futuro)
+            nombre = os.path.basename(ruta)
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                print(f"ERROR {ruta}: {e}", file=sys.stderr, flush=True)
+                # No se reintenta hasta que el archivo cambie
+                self.procesados[nombre] = ['error'] + huella
+            else:
+                print(f"{resultado['sistema']:5} {ruta} -> {resultado['salida']} "
+                      f"({resultado['registros']:,} registros)", flush=True)
+                self.procesados[nombre] = huella
+            self._guardar_registro()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Procesa los CSV de MAP y SICOP conforme llegan a una carpeta")
+    parser.add_argument('carpeta', help="Carpeta a vigilar")
+    parser.add_argument('-j', '--procesos', type=int, default=MAX_PROCESOS, help="Procesos simultáneos")
+    parser.add_argument('-i', '--intervalo', type=float, default=INTERVALO_SEGUNDOS,
+                        help="Segundos entre revisiones de la carpeta")
+    parser.add_argument('--una-vez', action='store_true',
+                        help="Procesar lo que haya en la carpeta y terminar")
+    args = parser.parse_args(argv)
+
+    vigilante = VigilanteCarpeta(args.carpeta, args.procesos, args.intervalo)
+    print(f"Vigilando {args.carpeta} (resultados en {vigilante.directorio_resultados})", flush=True)
+    try:
+        vigilante.ejecutar(una_vez=args.una_vez)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())